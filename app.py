@@ -1,14 +1,26 @@
 import os
 import uuid
+import queue
 import traceback
-from flask import Flask, render_template, request, send_from_directory, jsonify
+import metrics
+from flask import Flask, Response, render_template, request, send_from_directory, jsonify, stream_with_context
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
 # Import your modules
-from pdf_data_extractor import extract_pdf_data, analyze_piping_data, save_results
-from create_pid_structure import (
-    load_extracted_data, create_pid_scrape_format,
-    create_detailed_components_sheet, save_to_excel
+from job_queue import JobQueue
+# Loads the PDF_EXTRACTOR_TAG_PATTERNS site patterns, so a bad file fails at startup, not in every job
+import tag_patterns
+from extraction_profiles import EXTRACTION_PROFILES
+from workspace import start_sweeper
+from result_cache import open_cache
+from output_writers import available_formats, output_path
+from batch_export import stream_zip, unique_arcnames, consolidate_pid_components
+from task_events import EventBroker, format_sse, HEARTBEAT_SECONDS, STATUS_POLL_SECONDS
+from task_store import open_task_store, empty_status
+from chunked_upload import (
+    UploadError, create_upload, upload_status, write_chunk, verify_upload, move_upload,
+    DEFAULT_CHUNK_SIZE
 )
 
 app = Flask(__name__)
@@ -17,21 +29,125 @@ app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = '/tmp/uploads/'
 app.config['OUTPUT_FOLDER'] = '/tmp/outputs/'
 app.config['ALLOWED_EXTENSIONS'] = {'pdf'}
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max request size (larger files go in chunks)
+# Chunked uploads: assembled on disk under CHUNK_FOLDER, up to MAX_UPLOAD_MB per file
+app.config['CHUNK_FOLDER'] = '/tmp/uploads_chunked/'
+app.config['CHUNK_SIZE'] = DEFAULT_CHUNK_SIZE
+app.config['MAX_UPLOAD_MB'] = int(os.environ.get('PDF_EXTRACTOR_MAX_UPLOAD_MB', 1024))
+app.config['QUEUE_DB'] = os.environ.get('PDF_EXTRACTOR_QUEUE_DB', '/tmp/pdf_extractor_jobs.sqlite3')
+# Worker processes draining the job queue; 0 runs jobs on a background thread instead.
+# A small fixed default suits small and serverless hosts; raise it on dedicated machines
+app.config['WORKER_COUNT'] = int(os.environ.get('PDF_EXTRACTOR_WORKERS', 2))
+# Optional intermediate dumps per job ('binary', 'json', 'xlsx'); none are needed to serve the workbook
+app.config['PIPELINE_ARTIFACTS'] = tuple(
+    a for a in os.environ.get('PDF_EXTRACTOR_ARTIFACTS', '').split(',') if a
+)
+# Cheapest extraction profile that produces the full PID workbook (symbol boxes, line segments and
+# Line_Connectivity need geometry; 'text+annotations' is faster but falls back to the TO/FROM text guess)
+app.config['DEFAULT_PROFILE'] = os.environ.get('PDF_EXTRACTOR_PROFILE', 'tags+geometry')
+# Processes each job uses to extract page ranges in parallel (1 = sequential)
+app.config['PAGE_WORKERS'] = int(os.environ.get('PDF_EXTRACTOR_PAGE_WORKERS', 1))
+
+# Content-hash cache of extraction results and workbooks (empty dir disables it)
+app.config['RESULT_CACHE_DIR'] = os.environ.get('PDF_EXTRACTOR_CACHE_DIR', '/tmp/pdf_extractor_cache')
+app.config['RESULT_CACHE_MB'] = int(os.environ.get('PDF_EXTRACTOR_CACHE_MB', 512))
+
+# Task workspaces (spooled uploads and outputs) untouched for this long are deleted
+app.config['WORKSPACE_TTL'] = int(os.environ.get('PDF_EXTRACTOR_WORKSPACE_TTL', 6 * 60 * 60))
+
+# Task status shared by every web process ('memory' keeps it per process, as a dict)
+app.config['TASK_DB'] = os.environ.get('PDF_EXTRACTOR_TASK_DB', '/tmp/pdf_extractor_tasks.sqlite3')
+app.config['TASK_TTL'] = int(os.environ.get('PDF_EXTRACTOR_TASK_TTL', app.config['WORKSPACE_TTL']))
+
+# Long-running hosts: start warm workers (pipeline already imported) at boot rather than on first upload
+app.config['WARM_WORKERS'] = os.environ.get('PDF_EXTRACTOR_WARM_WORKERS', '') not in ('', '0')
+
+# Write each job's stage timings to profile.json in its workspace (served metrics are always on)
+app.config['PROFILE_REPORTS'] = os.environ.get('PDF_EXTRACTOR_PROFILE_REPORTS', '') not in ('', '0')
 
 # Create folders on every cold start
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+os.makedirs(app.config['CHUNK_FOLDER'], exist_ok=True)
+
+task_store = open_task_store(app.config['TASK_DB'])
+job_queue = None
+# Pushes job events to /events/<task_id> streams
+event_broker = EventBroker()
+
+def handle_job_event(event):
+    """Record a progress/result event reported by a queue worker in the task store and metrics"""
+    profile = event.pop('metrics', None)
+    if profile is not None:
+        metrics.record_job(metrics.registry, profile, event['type'])
+    task = task_store.apply_event(event)
+    if task is None:
+        return
+    event_broker.publish(event['task_id'], {**event, 'processed': task['processed'], 'total': task['total']})
 
-# In-memory task tracking (per invocation)
-tasks = {}
+def get_job_queue():
+    """Create and start the worker pool on first use"""
+    global job_queue
+    if job_queue is None:
+        job_queue = JobQueue(
+            app.config['QUEUE_DB'],
+            app.config['OUTPUT_FOLDER'],
+            num_workers=app.config['WORKER_COUNT'],
+            on_event=handle_job_event,
+            profile_reports=app.config['PROFILE_REPORTS'],
+            warm=app.config['WARM_WORKERS'],
+            pipeline_options={
+                'artifacts': app.config['PIPELINE_ARTIFACTS'],
+                'page_workers': app.config['PAGE_WORKERS'],
+                'cache': open_cache(
+                    app.config['RESULT_CACHE_DIR'], app.config['RESULT_CACHE_MB'] * 1024 * 1024
+                )
+            }
+        )
+        job_queue.start()
+        start_sweeper(
+            [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'], app.config['CHUNK_FOLDER']],
+            app.config['WORKSPACE_TTL'],
+            hooks=[lambda: task_store.expire(app.config['TASK_TTL'])]
+        )
+    return job_queue
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template(
+        'index.html',
+        profiles=list(EXTRACTION_PROFILES),
+        default_profile=app.config['DEFAULT_PROFILE'],
+        output_formats=available_formats()
+    )
+
+def job_options(form):
+    """Validated per-job options from an upload form or JSON body; raises ValueError"""
+    profile = form.get('profile') or app.config['DEFAULT_PROFILE']
+    if profile not in EXTRACTION_PROFILES:
+        raise ValueError(f'Unknown extraction profile: {profile}')
+    output_format = form.get('output_format') or 'xlsx'
+    if output_format not in available_formats():
+        raise ValueError(f'Unsupported output format: {output_format}')
+    return {'profile': profile, 'output_format': output_format}
+
+def new_task():
+    task_id = str(uuid.uuid4())
+    task_store.create(task_id)
+    return task_id
+
+def enqueue_task(task_id, spooled, options):
+    """Queue spooled (pdf_path, filename) pairs as the jobs of one task"""
+    # Set the total before enqueueing so a fast worker can't mark the task done early
+    task_store.set_total(task_id, len(spooled))
+    queue = get_job_queue()
+    for pdf_path, filename in spooled:
+        queue.enqueue(task_id, pdf_path, filename, options=options)
+        metrics.registry.inc('pdf_extractor_uploads_total')
+        print(f"Queued: {filename}")
 
 @app.route('/upload', methods=['POST'])
 def upload_files():
@@ -44,58 +160,27 @@ def upload_files():
         if not files or files[0].filename == '':
             return jsonify({'error': 'No files selected'}), 400
 
-        task_id = str(uuid.uuid4())
-        tasks[task_id] = {
-            'total': len(files), 
-            'processed': 0, 
-            'downloads': [],
-            'errors': []
-        }
+        try:
+            options = job_options(request.form)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        task_id = new_task()
+
+        # Spool uploads under a per-task directory; workers delete them when done
+        spool_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
+        os.makedirs(spool_dir, exist_ok=True)
 
-        for file in files:
+        spooled = []
+        for index, file in enumerate(files):
             if file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
-                pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                
-                try:
-                    # Save uploaded file
-                    file.save(pdf_path)
-                    
-                    print(f"Processing: {filename}")
-                    
-                    # --- Extraction Pipeline ---
-                    results = extract_pdf_data(pdf_path)
-                    piping_analysis = analyze_piping_data(results)
-                    save_results(results, piping_analysis, app.config['OUTPUT_FOLDER'])
-
-                    piping_data, raw_data = load_extracted_data(app.config['OUTPUT_FOLDER'])
-                    pid_df = create_pid_scrape_format(piping_data, raw_data)
-                    detailed_df = create_detailed_components_sheet(piping_data, raw_data)
-
-                    excel_name = f"PID_Extract_{filename.replace('.pdf', '')}.xlsx"
-                    output_excel = os.path.join(app.config['OUTPUT_FOLDER'], excel_name)
-                    save_to_excel(pid_df, detailed_df, piping_data, output_excel)
-
-                    tasks[task_id]['downloads'].append(f"/download/{excel_name}")
-                    tasks[task_id]['processed'] += 1
-                    
-                    print(f"Success: {filename}")
-
-                except Exception as e:
-                    error_msg = f"Error processing {filename}: {str(e)}"
-                    print(error_msg)
-                    print(traceback.format_exc())
-                    tasks[task_id]['errors'].append(error_msg)
-                    tasks[task_id]['processed'] += 1  # Still count as processed
-                
-                finally:
-                    # Clean up uploaded file
-                    if os.path.exists(pdf_path):
-                        try:
-                            os.remove(pdf_path)
-                        except:
-                            pass
+                # Files of the same name in one task must not share a spool file
+                pdf_path = os.path.join(spool_dir, f"{index}_{filename}")
+                file.save(pdf_path)
+                spooled.append((pdf_path, filename))
 
+        enqueue_task(task_id, spooled, options)
         return jsonify({'task_id': task_id})
 
     except Exception as e:
@@ -104,18 +189,121 @@ def upload_files():
         print(traceback.format_exc())
         return jsonify({'error': error_msg}), 500
 
+@app.errorhandler(UploadError)
+def upload_error(error):
+    return jsonify({'error': str(error)}), error.status
+
+@app.route('/uploads', methods=['POST'])
+def start_chunked_upload():
+    """Begin a resumable upload: JSON {filename, size, sha256 (optional)}"""
+    body = request.get_json(silent=True) or {}
+    filename = secure_filename(body.get('filename') or '')
+    if not allowed_file(filename):
+        return jsonify({'error': 'Only PDF files are accepted'}), 400
+    try:
+        size = int(body.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'File size is required'}), 400
+    if size > app.config['MAX_UPLOAD_MB'] * 1024 * 1024:
+        return jsonify({'error': f"File too large. Maximum size is {app.config['MAX_UPLOAD_MB']}MB"}), 413
+    return jsonify(create_upload(
+        app.config['CHUNK_FOLDER'], filename, size, app.config['CHUNK_SIZE'], body.get('sha256')
+    ))
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    """Chunks received so far, so an interrupted upload can resume"""
+    return jsonify(upload_status(app.config['CHUNK_FOLDER'], upload_id))
+
+@app.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_chunk(upload_id, index):
+    """Store one chunk (raw request body), streamed straight to its offset on disk"""
+    status = write_chunk(
+        app.config['CHUNK_FOLDER'], upload_id, index, request.stream,
+        request.headers.get('X-Chunk-SHA256')
+    )
+    return jsonify({'upload_id': upload_id, 'received': len(status['received']),
+                    'total_chunks': status['total_chunks']})
+
+@app.route('/uploads/complete', methods=['POST'])
+def complete_chunked_uploads():
+    """Verify finished uploads and queue them as one task: JSON {uploads: [ids], profile, output_format}"""
+    body = request.get_json(silent=True) or {}
+    upload_ids = body.get('uploads') or []
+    if not upload_ids:
+        return jsonify({'error': 'No uploads given'}), 400
+    try:
+        options = job_options(body)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Check every upload before moving any, so a bad one doesn't leave a partial task
+    statuses = [upload_status(app.config['CHUNK_FOLDER'], upload_id) for upload_id in upload_ids]
+    for status in statuses:
+        verify_upload(app.config['CHUNK_FOLDER'], status['upload_id'])
+
+    task_id = new_task()
+    spool_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
+    spooled = []
+    for status in statuses:
+        # Keyed by upload id, so uploads of the same name don't overwrite each other
+        pdf_path = os.path.join(spool_dir, f"{status['upload_id']}_{status['filename']}")
+        move_upload(app.config['CHUNK_FOLDER'], status['upload_id'], pdf_path)
+        spooled.append((pdf_path, status['filename']))
+
+    enqueue_task(task_id, spooled, options)
+    return jsonify({'task_id': task_id})
+
+def task_status(task_id):
+    task = task_store.get(task_id) or empty_status()
+    return {**task, 'done': task['processed'] == task['total']}
+
 @app.route('/status/<task_id>')
 def get_status(task_id):
-    task = tasks.get(task_id, {})
-    return jsonify({
-        'total': task.get('total', 0),
-        'processed': task.get('processed', 0),
-        'downloads': task.get('downloads', []),
-        'errors': task.get('errors', []),
-        'done': task.get('processed', 0) == task.get('total', 0)
-    })
-
-@app.route('/download/<filename>')
+    return jsonify(task_status(task_id))
+
+@app.route('/events/<task_id>')
+def task_events(task_id):
+    """Server-Sent Events: a 'status' snapshot, then start/page/done/error events, then 'complete'"""
+    if task_store.get(task_id) is None:
+        return jsonify({'error': 'Unknown task'}), 404
+
+    def stream():
+        # Subscribe before the snapshot so no event falls between the two
+        subscription = event_broker.subscribe(task_id)
+        try:
+            status = task_status(task_id)
+            yield format_sse('status', status)
+            idle = 0
+            while not status['done']:
+                try:
+                    event = subscription.get(timeout=STATUS_POLL_SECONDS)
+                    yield format_sse(event['type'], event)
+                    idle = 0
+                    status = task_status(task_id)
+                    continue
+                except queue.Empty:
+                    idle += STATUS_POLL_SECONDS
+                # Jobs finished by another process's workers only show up in the store
+                latest = task_status(task_id)
+                if latest != status:
+                    status = latest
+                    yield format_sse('status', status)
+                    idle = 0
+                elif idle >= HEARTBEAT_SECONDS:
+                    yield ': keep-alive\n\n'
+                    idle = 0
+            yield format_sse('complete', status)
+        finally:
+            event_broker.unsubscribe(task_id, subscription)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/download/<path:filename>')
 def download_file(filename):
     try:
         return send_from_directory(
@@ -126,13 +314,52 @@ def download_file(filename):
     except Exception as e:
         return jsonify({'error': f'File not found: {str(e)}'}), 404
 
+@app.route('/download-all/<task_id>')
+def download_all(task_id):
+    """Stream every output of a task as one ZIP; ?consolidated=1 adds a merged PID_Components workbook"""
+    task = task_store.get(task_id)
+    if not task or not task['downloads']:
+        return jsonify({'error': 'No outputs for this task'}), 404
+
+    paths = [safe_join(app.config['OUTPUT_FOLDER'], link[len('/download/'):])
+             for link in task['downloads']]
+    entries = unique_arcnames(p for p in paths if p and os.path.isfile(p))
+    if not entries:
+        return jsonify({'error': 'Outputs have expired'}), 404
+
+    if request.args.get('consolidated'):
+        consolidated = consolidate_pid_components(
+            entries, output_path(os.path.join(app.config['OUTPUT_FOLDER'], task_id), 'PID_Components_All')
+        )
+        entries.append((consolidated.name, str(consolidated)))
+
+    return Response(
+        stream_with_context(stream_zip(entries)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename=PID_Extract_{task_id[:8]}.zip'}
+    )
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of this process's pipeline metrics"""
+    if job_queue is not None:
+        metrics.registry.set('pdf_extractor_queue_pending_jobs', job_queue.pending())
+    rss = metrics.rss_mb()
+    if rss is not None:
+        metrics.registry.set('pdf_extractor_process_rss_megabytes', rss)
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error', 'details': str(error)}), 500
 
 @app.errorhandler(413)
 def too_large(error):
-    return jsonify({'error': 'File too large. Maximum size is 16MB'}), 413
+    return jsonify({'error': 'File too large for a single upload. Maximum size is 16MB; larger files are sent in chunks'}), 413
+
+# Warm workers start with the server so the first upload doesn't wait for them
+if app.config['WARM_WORKERS']:
+    get_job_queue()
 
 # Vercel looks for `app` variable
 if __name__ == '__main__':
@@ -0,0 +1,73 @@
+import io
+import os
+import zipfile
+
+from output_writers import read_sheet, records_sheet, write_sheets
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable sink that hands written bytes back out as chunks"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def unique_arcnames(paths):
+    """(arcname, path) pairs named after each file, suffixing duplicates"""
+    seen = {}
+    entries = []
+    for path in paths:
+        name = os.path.basename(path)
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        if count:
+            stem, dot, ext = name.partition('.')
+            name = f"{stem}_{count + 1}{dot}{ext}"
+        entries.append((name, path))
+    return entries
+
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE):
+    """Yield a ZIP of (arcname, path) entries as it is built.
+
+    zipfile falls back to data descriptors on an unseekable sink, so nothing
+    beyond the current chunk is held in memory and the archive size does not
+    need to be known up front.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for arcname, path in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, 'rb') as src, archive.open(info, 'w') as dest:
+                for chunk in iter(lambda: src.read(chunk_size), b''):
+                    dest.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def consolidate_pid_components(outputs, output_file, fmt='xlsx'):
+    """Merge the PID_Components rows of several outputs into one sheet tagged with Source_File.
+
+    `outputs` are (name, path) pairs of files written by save_to_excel in any
+    output format.
+    """
+    records = []
+    for name, path in outputs:
+        columns, rows = read_sheet(path, 'PID_Components')
+        records.extend({'Source_File': name, **dict(zip(columns, row))} for row in rows)
+    return write_sheets([records_sheet('PID_Components', records)], output_file, fmt)
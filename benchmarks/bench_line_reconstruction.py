@@ -0,0 +1,96 @@
+"""Benchmark vectorized line reconstruction against the original dict-of-lists grouping.
+
+Usage:
+    python benchmarks/bench_line_reconstruction.py [drawing.pdf ...] [--glyphs 200000] [--repeat 5]
+
+Without PDFs a random page of `--glyphs` characters is generated.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from geometry import GeometryTable, CHAR_FIELDS, char_table, reconstruct_lines
+
+
+def legacy_coordinate_patterns(chars, page=1):
+    """The grouping analyze_piping_data used before reconstruct_lines"""
+    patterns = []
+    y_groups = {}
+    for char in chars:
+        y = round(char['y0'])
+        if y not in y_groups:
+            y_groups[y] = []
+        y_groups[y].append(char)
+    for y, chars_at_y in y_groups.items():
+        if len(chars_at_y) > 5:
+            text_line = ''.join([c['text'] for c in sorted(chars_at_y, key=lambda x: x['x0'])])
+            if text_line.strip():
+                patterns.append({'y_coordinate': y, 'text': text_line.strip(), 'page': page})
+    return patterns
+
+
+def synthetic_page(glyphs, seed=0):
+    """Random text lines (with baseline jitter) on an A0-sized sheet"""
+    rng = np.random.default_rng(seed)
+    line_length = 40
+    lines = max(1, glyphs // line_length)
+    baselines = rng.uniform(0, 2384, lines)
+    starts = rng.uniform(0, 3000, lines)
+    index = np.arange(glyphs)
+    line = index // line_length
+    line = np.minimum(line, lines - 1)
+    size = np.full(glyphs, 8.0, dtype=np.float32)
+    x0 = (starts[line] + (index % line_length) * 5.0).astype(np.float32)
+    y0 = (baselines[line] + rng.normal(0, 0.1, glyphs)).astype(np.float32)
+    columns = {'x0': x0, 'y0': y0, 'x1': x0 + 4.5, 'y1': y0 + size, 'size': size,
+               'rotation': np.zeros(glyphs, dtype=np.int8)}
+    text = ''.join(rng.choice(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-'), glyphs))
+    return GeometryTable(CHAR_FIELDS, columns, text)
+
+
+def pdf_pages(pdf_path):
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            yield char_table(page.chars)
+            page.close()
+
+
+def _time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench(name, tables, repeat):
+    dict_pages = [table.to_dicts() for table in tables]
+    glyphs = sum(len(table) for table in tables)
+    legacy = _time(lambda: [legacy_coordinate_patterns(page) for page in dict_pages], repeat)
+    vectorized = _time(lambda: [reconstruct_lines(table, min_chars=6) for table in tables], repeat)
+    print(f"{name[:30]:30} {glyphs:>9} {legacy:>9.4f}s {vectorized:>9.4f}s {legacy / vectorized:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdfs', nargs='*')
+    parser.add_argument('--glyphs', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'input':30} {'glyphs':>9} {'legacy':>10} {'vector':>10} {'speedup':>8}")
+    if not args.pdfs:
+        bench(f"synthetic ({args.glyphs} glyphs)", [synthetic_page(args.glyphs)], args.repeat)
+    for pdf_path in args.pdfs:
+        bench(os.path.basename(pdf_path), list(pdf_pages(pdf_path)), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Time each pipeline stage on a synthetic P&ID corpus and catch regressions between runs.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--preset small --preset dense ...]
+        [--case name:pages=10,glyphs=4000,lines=300,rects=60,annotations=40,seed=0]
+        [--pdf drawing.pdf ...] [--repeat 3] [--profile full-geometry]
+        [--output results.json] [--baseline old.json] [--threshold 0.10]
+    python benchmarks/bench_pipeline.py --compare old.json new.json [--threshold 0.10]
+
+Each case runs in a fresh process, so its peak RSS is its own. Stages are
+extract (extract_pdf_data), analyze (analyze_piping_data), categorize
+(categorize_components, classifier memo cleared first), structure
+(pipeline.structure_results: tag layout and pipe runs, PID_Components and
+Component_Details) and write (save_to_excel, with the Line_Connectivity
+sheet, as process_pdf writes it). Results are JSON; with --baseline or --compare, any stage
+slower than the baseline by more than --threshold (and --min-delta seconds)
+is reported and the exit status is 1.
+"""
+import os
+import sys
+import io
+import json
+import time
+import platform
+import argparse
+import tempfile
+import contextlib
+import statistics
+import subprocess
+import multiprocessing
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pid import generate_pid_pdf, parse_tag_mix
+from metrics import peak_rss_mb
+
+RESULTS_VERSION = 1
+STAGES = ('extract', 'analyze', 'categorize', 'structure', 'write')
+
+# Corpus presets: generate_pid_pdf arguments
+PRESETS = {
+    'small': {'pages': 5, 'glyphs_per_page': 3000, 'lines_per_page': 200, 'rects_per_page': 40,
+              'annotations_per_page': 30},
+    'dense': {'pages': 2, 'glyphs_per_page': 30000, 'lines_per_page': 3000, 'rects_per_page': 400,
+              'annotations_per_page': 100},
+    'annotated': {'pages': 20, 'glyphs_per_page': 1500, 'lines_per_page': 100, 'rects_per_page': 20,
+                  'annotations_per_page': 400},
+    'package': {'pages': 40, 'glyphs_per_page': 4000, 'lines_per_page': 300, 'rects_per_page': 60,
+                'annotations_per_page': 40},
+}
+DEFAULT_PRESETS = ('small', 'dense', 'annotated')
+
+# --case keys -> generate_pid_pdf arguments
+CASE_KEYS = {'pages': 'pages', 'glyphs': 'glyphs_per_page', 'lines': 'lines_per_page',
+             'rects': 'rects_per_page', 'annotations': 'annotations_per_page', 'seed': 'seed'}
+
+
+def parse_case(spec):
+    """'name:pages=10,glyphs=4000,mix=line=3;valve=1' -> (name, generate_pid_pdf kwargs)"""
+    name, _, options = spec.partition(':')
+    params = dict(PRESETS['small'])
+    for item in options.split(','):
+        if not item:
+            continue
+        key, _, value = item.partition('=')
+        if key == 'mix':
+            params['tag_mix'] = parse_tag_mix(value.replace(';', ','))
+        elif key in CASE_KEYS:
+            params[CASE_KEYS[key]] = int(value)
+        else:
+            raise ValueError(f"Unknown case option: {key} (expected {', '.join(CASE_KEYS)} or mix)")
+    return name, params
+
+
+def _summary(runs):
+    return {'median_s': round(statistics.median(runs), 6), 'min_s': round(min(runs), 6),
+            'runs': [round(run, 6) for run in runs]}
+
+
+def measure(pdf_path, profile, repeat, output_format):
+    """Run every stage `repeat` times in this process; stage timings, RSS and document counts"""
+    from pdf_data_extractor import extract_pdf_data, analyze_piping_data
+    from create_pid_structure import categorize_components, save_to_excel
+    from pipeline import structure_results
+    from output_writers import output_path
+    from tag_patterns import default_classifier
+
+    timings = {stage: [] for stage in STAGES}
+    rss_after = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_file = output_path(tmp_dir, 'bench', output_format)
+        for _ in range(repeat):
+            default_classifier.clear_cache()
+            stage_outputs = {}
+
+            def run(stage, func):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    stage_outputs[stage] = func()
+                timings[stage].append(time.perf_counter() - start)
+                rss_after[stage] = peak_rss_mb()
+                return stage_outputs[stage]
+
+            results = run('extract', lambda: extract_pdf_data(pdf_path, profile=profile))
+            analysis = run('analyze', lambda: analyze_piping_data(results))
+            categories = run('categorize', lambda: categorize_components(analysis['annotations_text']))
+            structured = run('structure', lambda: structure_results(results, analysis, categories))
+            run('write', lambda: save_to_excel(
+                structured['pid_df'], structured['detailed_df'], analysis, output_file, output_format,
+                structured['line_runs']
+            ))
+
+    stages = {stage: _summary(runs) for stage, runs in timings.items()}
+    return {
+        'pages': len(results.get('text_content', [])),
+        'annotations': len(results.get('annotations', [])),
+        'components': int(structured['pid_df'].count().sum()),
+        'stages': stages,
+        'total_s': round(sum(stage['median_s'] for stage in stages.values()), 6),
+        'rss_after_mb': rss_after,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_case(name, pdf_path, profile, repeat, output_format, params=None):
+    """measure() in a fresh spawned process so the case's peak RSS is not inflated by earlier cases"""
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        measured = pool.apply(measure, (pdf_path, profile, repeat, output_format))
+    return {'name': name, 'pdf': os.path.basename(pdf_path), 'size_bytes': os.path.getsize(pdf_path),
+            'params': params, **measured}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(cases, pdfs, profile='full-geometry', repeat=3, output_format='xlsx', corpus_dir=None):
+    """Generate the synthetic corpus, then measure each case and real PDF; returns the results dict"""
+    cases_out = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_dir = corpus_dir or tmp_dir
+        os.makedirs(corpus_dir, exist_ok=True)
+        for name, params in cases:
+            pdf_path = os.path.join(corpus_dir, f"{name}.pdf")
+            generate_pid_pdf(pdf_path, **params)
+            print(f"Running {name} ...", file=sys.stderr)
+            cases_out.append(run_case(name, pdf_path, profile, repeat, output_format, params))
+        for pdf_path in pdfs:
+            print(f"Running {os.path.basename(pdf_path)} ...", file=sys.stderr)
+            cases_out.append(run_case(os.path.basename(pdf_path), pdf_path, profile, repeat, output_format))
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'profile': profile,
+        'output_format': output_format,
+        'repeat': repeat,
+        'cases': cases_out,
+    }
+
+
+def compare(old, new, threshold=0.10, min_delta=0.005, min_rss_delta=5.0):
+    """Rows of (case, metric, old, new, change, regressed) for cases present in both result sets"""
+    old_cases = {case['name']: case for case in old['cases']}
+    rows = []
+    for case in new['cases']:
+        before = old_cases.get(case['name'])
+        if before is None:
+            continue
+        metrics = [(stage, before['stages'][stage]['median_s'], case['stages'][stage]['median_s'], min_delta)
+                   for stage in STAGES if stage in before['stages'] and stage in case['stages']]
+        metrics.append(('total', before['total_s'], case['total_s'], min_delta))
+        if before.get('peak_rss_mb') and case.get('peak_rss_mb'):
+            metrics.append(('peak_rss_mb', before['peak_rss_mb'], case['peak_rss_mb'], min_rss_delta))
+        for metric, old_value, new_value, floor in metrics:
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            regressed = change > threshold and new_value - old_value > floor
+            rows.append((case['name'], metric, old_value, new_value, change, regressed))
+    return rows
+
+
+def print_results(results):
+    print(f"{'case':14} {'pages':>5} " + ' '.join(f"{stage:>10}" for stage in STAGES)
+          + f" {'total':>9} {'peak MB':>8}")
+    for case in results['cases']:
+        print(f"{case['name'][:14]:14} {case['pages']:>5} "
+              + ' '.join(f"{case['stages'][stage]['median_s']:>9.3f}s" for stage in STAGES)
+              + f" {case['total_s']:>8.3f}s {case['peak_rss_mb'] or 0:>8.1f}")
+
+
+def print_comparison(rows):
+    print(f"{'case':14} {'metric':12} {'old':>10} {'new':>10} {'change':>8}")
+    for name, metric, old_value, new_value, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name[:14]:14} {metric:12} {old_value:>10.3f} {new_value:>10.3f} {change:>+7.1%}{flag}")
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', action='append', choices=list(PRESETS),
+                        help=f"synthetic corpus preset (default: {', '.join(DEFAULT_PRESETS)})")
+    parser.add_argument('--case', action='append', default=[],
+                        help='custom synthetic case, name:pages=N,glyphs=N,lines=N,rects=N,annotations=N,'
+                             'seed=N,mix=line=3;valve=1')
+    parser.add_argument('--pdf', action='append', default=[], help='also benchmark a real PDF')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--profile', default='full-geometry')
+    parser.add_argument('--format', dest='output_format', default='xlsx')
+    parser.add_argument('--corpus-dir', help='keep the generated PDFs here')
+    parser.add_argument('--output', help='write results JSON to this file')
+    parser.add_argument('--json', action='store_true', help='print results JSON instead of a table')
+    parser.add_argument('--baseline', help='results JSON to compare this run against')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='only compare two results files')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown (0.10 = 10%%)')
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help='ignore slowdowns smaller than this many seconds')
+    args = parser.parse_args()
+
+    if args.compare:
+        rows = compare(_load(args.compare[0]), _load(args.compare[1]), args.threshold, args.min_delta)
+        print_comparison(rows)
+        return 1 if any(row[-1] for row in rows) else 0
+
+    try:
+        cases = [(name, PRESETS[name]) for name in (args.preset or ([] if args.case or args.pdf
+                                                                    else DEFAULT_PRESETS))]
+        cases += [parse_case(spec) for spec in args.case]
+    except ValueError as e:
+        parser.error(str(e))
+    results = run_benchmarks(cases, args.pdf, args.profile, args.repeat, args.output_format,
+                             args.corpus_dir)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+    if args.baseline:
+        rows = compare(_load(args.baseline), results, args.threshold, args.min_delta)
+        print()
+        print_comparison(rows)
+        return 1 if any(row[-1] for row in rows) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
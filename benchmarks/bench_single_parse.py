@@ -0,0 +1,79 @@
+"""Compare single-parse extraction against the legacy pdfplumber + PyPDF2 double read.
+
+Usage:
+    python benchmarks/bench_single_parse.py drawing1.pdf [drawing2.pdf ...] [--repeat 5] [--json]
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import contextlib
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+from pdf_data_extractor import (
+    extract_pdf_data, extract_metadata, extract_annotations,
+    extract_pypdf2_metadata_and_annotations
+)
+
+
+def _time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def _plumber_annotations(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        extract_metadata(pdf)
+        for i, page in enumerate(pdf.pages):
+            extract_annotations(page, i + 1)
+
+
+def _pypdf2_annotations(pdf_path):
+    extract_pypdf2_metadata_and_annotations(pdf_path, {'metadata': {}, 'annotations': []})
+
+
+def bench(pdf_path, repeat):
+    return {
+        'file': os.path.basename(pdf_path),
+        'size_bytes': os.path.getsize(pdf_path),
+        'annotations_pypdf2_s': _time(lambda: _pypdf2_annotations(pdf_path), repeat),
+        'annotations_single_parse_s': _time(lambda: _plumber_annotations(pdf_path), repeat),
+        'extract_legacy_s': _time(lambda: extract_pdf_data(pdf_path, single_parse=False), repeat),
+        'extract_single_parse_s': _time(lambda: extract_pdf_data(pdf_path), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdfs', nargs='+')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    rows = [bench(path, args.repeat) for path in args.pdfs]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'file':30} {'legacy':>10} {'single':>10} {'saved':>8}")
+    for row in rows:
+        legacy = row['extract_legacy_s']
+        single = row['extract_single_parse_s']
+        saved = (legacy - single) / legacy * 100 if legacy else 0.0
+        print(f"{row['file'][:30]:30} {legacy:>9.3f}s {single:>9.3f}s {saved:>7.1f}%")
+        print(f"{'  metadata+annotations only':30} "
+              f"{row['annotations_pypdf2_s']:>9.3f}s {row['annotations_single_parse_s']:>9.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Track cold-start import time of the web app and the pipeline.
+
+Usage:
+    python benchmarks/bench_startup.py [--target app --target pipeline ...] [--repeat 5]
+        [--output results.json] [--baseline old.json] [--threshold 0.20]
+    python benchmarks/bench_startup.py --compare old.json new.json [--threshold 0.20]
+
+Every measurement runs in a fresh interpreter, as a cold start would. For
+each target module it records the import time, the heavy dependencies the
+import pulled in (the web app should load none of them) and the slowest
+modules from `-X importtime`. `interpreter` is the cost of starting Python
+with nothing imported; `warm_up` is what a worker pays to import the
+pipeline before its first job (ahead of time in warm mode). Results are
+JSON; with --baseline or --compare, any target slower than the baseline by
+more than --threshold (and --min-delta seconds), or loading a heavy module
+it didn't load before, is reported and the exit status is 1.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_VERSION = 1
+DEFAULT_TARGETS = ('interpreter', 'app', 'pipeline', 'warm_up')
+
+# Dependencies whose import alone costs tens to hundreds of milliseconds
+HEAVY_MODULES = ('numpy', 'pandas', 'pdfplumber', 'pdfminer', 'PyPDF2', 'openpyxl')
+
+# Statement each target runs after the clock starts
+TARGET_CODE = {
+    'interpreter': 'pass',
+    'warm_up': 'import job_queue; job_queue.warm_up()',
+}
+
+PROBE = """\
+import sys, time, json
+started = time.perf_counter()
+{code}
+seconds = time.perf_counter() - started
+print(json.dumps({{'seconds': seconds, 'heavy': [m for m in {heavy!r} if m in sys.modules],
+                  'modules': len(sys.modules)}}))
+"""
+
+
+def _probe(target, importtime=False):
+    """Run one fresh interpreter for `target`; returns (measurement dict, -X importtime stderr)"""
+    code = TARGET_CODE.get(target, f'import {target}')
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + [
+        '-c', PROBE.format(code=code, heavy=HEAVY_MODULES)
+    ]
+    env = {**os.environ, 'PYTHONPATH': REPO_ROOT, 'PYTHONDONTWRITEBYTECODE': '1'}
+    # app.py starts nothing at import unless asked to
+    env.pop('PDF_EXTRACTOR_WARM_WORKERS', None)
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    process_seconds = time.perf_counter() - started
+    measured = json.loads(completed.stdout.strip().splitlines()[-1])
+    measured['process_seconds'] = process_seconds
+    return measured, completed.stderr
+
+
+def slowest_imports(importtime_log, limit=10):
+    """(module, cumulative seconds) of the slowest imports, down to the modules they import directly"""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level
+        if (len(name) - len(name.lstrip()) - 1) // 2 > 1:
+            continue
+        rows.append((name.strip(), int(cumulative) / 1e6))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return [{'module': name, 'seconds': round(seconds, 6)} for name, seconds in rows[:limit]]
+
+
+def measure_target(target, repeat):
+    runs = []
+    heavy = []
+    for _ in range(repeat):
+        measured, _ = _probe(target)
+        runs.append(measured)
+        heavy = measured['heavy']
+    _, importtime_log = _probe(target, importtime=True)
+    seconds = [run['seconds'] for run in runs]
+    return {
+        'name': target,
+        'median_s': round(statistics.median(seconds), 6),
+        'min_s': round(min(seconds), 6),
+        'runs': [round(value, 6) for value in seconds],
+        'process_median_s': round(statistics.median(run['process_seconds'] for run in runs), 6),
+        'modules': runs[-1]['modules'],
+        'heavy_modules': heavy,
+        'slowest_imports': slowest_imports(importtime_log),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(targets, repeat=5):
+    cases = []
+    for target in targets:
+        print(f"Timing {target} ...", file=sys.stderr)
+        cases.append(measure_target(target, repeat))
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'cases': cases,
+    }
+
+
+def compare(old, new, threshold=0.20, min_delta=0.02):
+    """Rows of (target, old, new, change, newly loaded heavy modules, regressed) for targets in both"""
+    old_cases = {case['name']: case for case in old['cases']}
+    rows = []
+    for case in new['cases']:
+        before = old_cases.get(case['name'])
+        if before is None:
+            continue
+        old_value, new_value = before['median_s'], case['median_s']
+        change = (new_value - old_value) / old_value if old_value else 0.0
+        added = sorted(set(case['heavy_modules']) - set(before['heavy_modules']))
+        regressed = bool(added) or (change > threshold and new_value - old_value > min_delta)
+        rows.append((case['name'], old_value, new_value, change, added, regressed))
+    return rows
+
+
+def print_results(results):
+    print(f"{'target':12} {'import':>9} {'process':>9} {'modules':>8}  heavy modules loaded")
+    for case in results['cases']:
+        print(f"{case['name'][:12]:12} {case['median_s']:>8.3f}s {case['process_median_s']:>8.3f}s "
+              f"{case['modules']:>8}  {', '.join(case['heavy_modules']) or '-'}")
+    for case in results['cases']:
+        if case['slowest_imports']:
+            slowest = ', '.join(f"{row['module']} {row['seconds']:.3f}s" for row in case['slowest_imports'][:5])
+            print(f"  {case['name']}: {slowest}")
+
+
+def print_comparison(rows):
+    print(f"{'target':12} {'old':>9} {'new':>9} {'change':>8}")
+    for name, old_value, new_value, change, added, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        loaded = f" (now loads {', '.join(added)})" if added else ''
+        print(f"{name[:12]:12} {old_value:>8.3f}s {new_value:>8.3f}s {change:>+7.1%}{flag}{loaded}")
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', action='append',
+                        help=f"module to import, or interpreter/warm_up (default: {', '.join(DEFAULT_TARGETS)})")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results JSON to this file')
+    parser.add_argument('--json', action='store_true', help='print results JSON instead of a table')
+    parser.add_argument('--baseline', help='results JSON to compare this run against')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='only compare two results files')
+    parser.add_argument('--threshold', type=float, default=0.20, help='allowed slowdown (0.20 = 20%%)')
+    parser.add_argument('--min-delta', type=float, default=0.02,
+                        help='ignore slowdowns smaller than this many seconds')
+    args = parser.parse_args()
+
+    if args.compare:
+        rows = compare(_load(args.compare[0]), _load(args.compare[1]), args.threshold, args.min_delta)
+        print_comparison(rows)
+        return 1 if any(row[-1] for row in rows) else 0
+
+    results = run_benchmarks(args.target or DEFAULT_TARGETS, args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+    if args.baseline:
+        rows = compare(_load(args.baseline), results, args.threshold, args.min_delta)
+        print()
+        print_comparison(rows)
+        return 1 if any(row[-1] for row in rows) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
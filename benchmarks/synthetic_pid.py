@@ -0,0 +1,248 @@
+"""Generate synthetic P&ID-like PDFs for benchmarking, with no dependencies beyond the stdlib.
+
+Usage:
+    python benchmarks/synthetic_pid.py out.pdf [--pages 10] [--glyphs 4000] [--lines 300]
+        [--rects 60] [--annotations 40] [--tag-mix equipment=2,line=3,instrument=4,valve=1]
+
+Pages are A1 sheets with pipe runs (line segments), equipment symbols and a
+title block (rectangles), free text mixing tags, process conditions, pipe
+sizes and FROM/TO notes, and FreeText annotations holding tags -- the
+inputs extract_pdf_data, analyze_piping_data and categorize_components see
+on real drawings. The same arguments and seed always produce the same file.
+"""
+import sys
+import zlib
+import random
+import argparse
+
+# A1 landscape, in points
+PAGE_WIDTH = 2384
+PAGE_HEIGHT = 1684
+
+EQUIPMENT_PREFIXES = 'PMEFVCHTR'
+LINE_SERVICES = ('PW', 'CW', 'ST', 'HO', 'IA', 'NG', 'BFW', 'CS', 'SS')
+INSTRUMENT_PREFIXES = ('FE', 'FI', 'FT', 'PG', 'PI', 'PT', 'TE', 'TT', 'LG', 'LI', 'LT', 'HS', 'IPF', 'FO')
+VALVE_PREFIXES = ('CV', 'HV', 'PV', 'FV', 'PSV', 'PRV')
+FILLER_WORDS = ('PUMP', 'SUCTION', 'DISCHARGE', 'DRAIN', 'VENT', 'SAMPLE', 'CHECK', 'GATE', 'GLOBE',
+                'NOTE', 'SEE', 'DETAIL', 'TYP', 'INSULATED', 'TRACED', 'CONT', 'ON', 'DWG', 'SPEC')
+UNIT_NAMES = ('CRUDE UNIT', 'HOT OIL SYSTEM', 'FEED PUMP', 'FLASH VESSEL', 'STRIPPER TOWER')
+
+# Kind -> default weight in the tag mix
+DEFAULT_TAG_MIX = {'equipment': 2, 'line': 3, 'instrument': 4, 'valve': 1}
+
+
+def _equipment(rng):
+    return f"{rng.choice(EQUIPMENT_PREFIXES)}-{rng.randint(100, 9999)}{rng.choice(('', '', 'A', 'B'))}"
+
+
+def _line(rng):
+    size = rng.choice((1, 2, 3, 4, 6, 8, 10, 12))
+    return f"{rng.choice(LINE_SERVICES)}-{rng.randint(1000, 99999)}-{size}\"-{rng.choice(('A1A', 'B2C', 'C3'))}"
+
+
+def _instrument(rng):
+    return f"{rng.choice(INSTRUMENT_PREFIXES)}-{rng.randint(10, 999)}{rng.choice(('', '', 'A'))}"
+
+
+def _valve(rng):
+    return f"{rng.choice(VALVE_PREFIXES)}-{rng.randint(10, 999)}"
+
+
+TAG_KINDS = {
+    'equipment': _equipment,
+    'line': _line,
+    'instrument': _instrument,
+    'valve': _valve,
+}
+
+
+def parse_tag_mix(spec):
+    """'equipment=2,line=3' -> {'equipment': 2.0, 'line': 3.0}"""
+    mix = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in TAG_KINDS:
+            raise ValueError(f"Unknown tag kind: {kind} (expected one of {', '.join(TAG_KINDS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def _pdf_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class _PdfWriter:
+    """Just enough of the PDF file structure: numbered objects, an xref table and a trailer"""
+
+    def __init__(self, compress=True):
+        self.compress = compress
+        self._objects = []
+
+    def reserve(self):
+        self._objects.append(None)
+        return len(self._objects)
+
+    def set(self, number, body):
+        self._objects[number - 1] = body.encode('latin-1') if isinstance(body, str) else body
+
+    def add(self, body):
+        number = self.reserve()
+        self.set(number, body)
+        return number
+
+    def add_stream(self, data):
+        data = data.encode('latin-1')
+        if self.compress:
+            data = zlib.compress(data)
+            header = f"<< /Length {len(data)} /Filter /FlateDecode >>"
+        else:
+            header = f"<< /Length {len(data)} >>"
+        return self.add(header.encode('latin-1') + b"\nstream\n" + data + b"\nendstream")
+
+    def write(self, path, root, info):
+        with open(path, 'wb') as f:
+            f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            offsets = []
+            for number, body in enumerate(self._objects, 1):
+                offsets.append(f.tell())
+                f.write(f"{number} 0 obj\n".encode('latin-1') + body + b"\nendobj\n")
+            xref = f.tell()
+            f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode('latin-1'))
+            f.write(''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1'))
+            f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root {root} 0 R /Info {info} 0 R >>\n"
+                    f"startxref\n{xref}\n%%EOF\n".encode('latin-1'))
+
+
+class _TagSource:
+    def __init__(self, rng, tag_mix):
+        self.rng = rng
+        self.kinds = [kind for kind, weight in tag_mix.items() if weight > 0]
+        self.weights = [tag_mix[kind] for kind in self.kinds]
+
+    def __call__(self):
+        if not self.kinds:
+            return self.rng.choice(FILLER_WORDS)
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        return TAG_KINDS[kind](self.rng)
+
+
+def _text_item(rng, tag):
+    """One piece of drawing text: a tag, a tag with process conditions, a pipe size or a note"""
+    roll = rng.random()
+    if roll < 0.35:
+        return tag()
+    if roll < 0.55:
+        return (f"{tag()} {rng.randint(50, 5000)} GPM {rng.randint(10, 900)} PSI "
+                f"{rng.randint(60, 750)} F")
+    if roll < 0.65:
+        return f"{tag()} {rng.randint(900, 3600)} RPM"
+    if roll < 0.75:
+        return f"FROM {_equipment(rng)} TO {_equipment(rng)}"
+    if roll < 0.85:
+        return rng.choice((f"{rng.randint(1, 24)}\" x {rng.randint(1, 12)}\"", f"DN {rng.randint(2, 60) * 25}",
+                           f"NPS {rng.randint(1, 36)}", f"Pipe {rng.randint(1, 500)}"))
+    return ' '.join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(1, 4)))
+
+
+def _page_content(rng, tag, page_number, drawing_number, glyphs, lines, rects):
+    ops = ['0.6 w']
+    # Pipe runs: mostly orthogonal segments, as routed on a P&ID
+    for _ in range(lines):
+        x, y = rng.uniform(50, PAGE_WIDTH - 50), rng.uniform(50, PAGE_HEIGHT - 50)
+        length = rng.uniform(20, 600)
+        if rng.random() < 0.5:
+            ops.append(f"{x:.2f} {y:.2f} m {min(x + length, PAGE_WIDTH - 20):.2f} {y:.2f} l S")
+        else:
+            ops.append(f"{x:.2f} {y:.2f} m {x:.2f} {min(y + length, PAGE_HEIGHT - 20):.2f} l S")
+    # Equipment and instrument symbols, plus the title block frame
+    for _ in range(rects):
+        w, h = rng.uniform(15, 160), rng.uniform(15, 160)
+        ops.append(f"{rng.uniform(50, PAGE_WIDTH - 220):.2f} {rng.uniform(50, PAGE_HEIGHT - 220):.2f} "
+                   f"{w:.2f} {h:.2f} re S")
+    ops.append(f"{PAGE_WIDTH - 620} 20 600 140 re S")
+
+    items = [
+        (PAGE_WIDTH - 600, 120, 14, f"{drawing_number} - {rng.choice(UNIT_NAMES)}"),
+        (PAGE_WIDTH - 600, 90, 10, f"DWG {drawing_number} SHEET {page_number} REV {rng.randint(0, 5)}"),
+    ]
+    emitted = sum(len(item[3]) for item in items)
+    while emitted < glyphs:
+        text = _text_item(rng, tag)
+        items.append((rng.uniform(40, PAGE_WIDTH - 400), rng.uniform(180, PAGE_HEIGHT - 40),
+                      rng.choice((6, 7, 8, 10)), text))
+        emitted += len(text)
+    for x, y, size, text in items:
+        ops.append(f"BT /F1 {size} Tf {x:.2f} {y:.2f} Td ({_pdf_text(text)}) Tj ET")
+    return '\n'.join(ops), emitted
+
+
+def generate_pid_pdf(path, pages=10, glyphs_per_page=4000, lines_per_page=300, rects_per_page=60,
+                     annotations_per_page=40, tag_mix=None, seed=0, compress=True):
+    """Write a synthetic P&ID package to `path`; returns counts of what was drawn"""
+    rng = random.Random(seed)
+    tag = _TagSource(rng, DEFAULT_TAG_MIX if tag_mix is None else tag_mix)
+    writer = _PdfWriter(compress)
+    catalog = writer.reserve()
+    page_tree = writer.reserve()
+    font = writer.add("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    info = writer.add(f"<< /Title (Synthetic P&ID package) /Producer (benchmarks/synthetic_pid.py) "
+                      f"/Subject (seed {seed}) >>")
+
+    page_objects = []
+    stats = {'pages': pages, 'glyphs': 0, 'lines': pages * lines_per_page,
+             'rects': pages * (rects_per_page + 1), 'annotations': pages * annotations_per_page}
+    unit = rng.randint(10, 99)
+    for page_number in range(1, pages + 1):
+        drawing_number = f"{unit}-PR-{rng.randint(100, 999)}-{page_number:03d}"
+        content, glyphs = _page_content(rng, tag, page_number, drawing_number, glyphs_per_page,
+                                        lines_per_page, rects_per_page)
+        stats['glyphs'] += glyphs
+        contents = writer.add_stream(content)
+        annots = []
+        for i in range(annotations_per_page):
+            x, y = rng.uniform(40, PAGE_WIDTH - 200), rng.uniform(40, PAGE_HEIGHT - 40)
+            annots.append(writer.add(
+                f"<< /Type /Annot /Subtype /FreeText /Rect [{x:.2f} {y:.2f} {x + 90:.2f} {y + 14:.2f}] "
+                f"/Contents ({_pdf_text(tag())}) /NM (annot-{page_number}-{i}) /DA (/Helv 8 Tf 0 g) >>"
+            ))
+        page_objects.append(writer.add(
+            f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {contents} 0 R "
+            f"/Annots [{' '.join(f'{a} 0 R' for a in annots)}] >>"
+        ))
+
+    writer.set(page_tree, f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_objects)}] "
+                          f"/Count {len(page_objects)} >>")
+    writer.set(catalog, f"<< /Type /Catalog /Pages {page_tree} 0 R >>")
+    writer.write(path, catalog, info)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output')
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--glyphs', type=int, default=4000, help='text glyphs per page')
+    parser.add_argument('--lines', type=int, default=300, help='line segments per page')
+    parser.add_argument('--rects', type=int, default=60, help='rectangles per page')
+    parser.add_argument('--annotations', type=int, default=40, help='annotations per page')
+    parser.add_argument('--tag-mix', default=None,
+                        help=f"kind=weight list over {', '.join(TAG_KINDS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-compress', action='store_true', help='leave content streams uncompressed')
+    args = parser.parse_args()
+
+    try:
+        tag_mix = parse_tag_mix(args.tag_mix) if args.tag_mix else None
+    except ValueError as e:
+        parser.error(str(e))
+    stats = generate_pid_pdf(args.output, args.pages, args.glyphs, args.lines, args.rects,
+                             args.annotations, tag_mix, args.seed, not args.no_compress)
+    print(f"Wrote {args.output}: " + ', '.join(f"{value} {key}" for key, value in stats.items()))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
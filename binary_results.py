@@ -0,0 +1,236 @@
+"""Compact binary file for extraction results, read back through a memory map.
+
+Layout: an 8-byte magic, the data section, a JSON header, the header's
+length (uint64, little endian) and the magic again. The header goes last
+so the file is written in one pass. Every block in the data section
+starts on a 64-byte boundary:
+
+- the float32/int8/int32 columns of each page's characters, lines and
+  rectangles, written as they are held in geometry.GeometryTable, with the
+  glyph text as UTF-8;
+- one small JSON block per page for each of its text, tables and
+  annotations, and one for the piping analysis.
+
+The header has the metadata and an index of every block, with offsets
+relative to the data section (which starts at byte 64). ResultsFile maps
+the file and builds only the pages and layers asked for. Geometry columns
+are views into the map rather than copies, so loading a drawing costs the
+header plus whatever is actually read. The JSON dumps (pdf_data_extractor.save_json_results)
+remain as an export format.
+"""
+import os
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from extraction_profiles import LAYERS
+from geometry import GeometryTable, CHAR_FIELDS, LINE_FIELDS, RECT_FIELDS, as_table
+
+RESULTS_FILE = 'pdf_extraction_results.bin'
+MAGIC = b'PDFXRES\x01'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DATA_START = ALIGNMENT  # The magic, padded to the first boundary
+
+# Geometry layer -> (results key, per-page key); the page key is also the extract_page key
+GEOMETRY_LAYERS = {
+    'chars': ('coordinates_data', 'characters'),
+    'lines': ('lines', 'lines'),
+    'rects': ('rectangles', 'rectangles'),
+}
+# Legacy list-of-dicts geometry (e.g. loaded from JSON) is converted with these as_table arguments
+TABLE_FORMATS = {'chars': (CHAR_FIELDS, True), 'lines': (LINE_FIELDS,), 'rects': (RECT_FIELDS,)}
+# Layers stored as one JSON block per page
+JSON_LAYERS = ('text', 'tables', 'annotations')
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+class _DataWriter:
+    """Appends aligned blocks to the data section; returns their offsets"""
+
+    def __init__(self, f):
+        self.f = f
+        self.size = 0
+        f.write(MAGIC + b'\0' * _padding(len(MAGIC)))
+
+    def add(self, data):
+        offset = self.size
+        view = memoryview(data).cast('B')
+        self.f.write(view)
+        padding = _padding(len(view))
+        self.f.write(b'\0' * padding)
+        self.size += len(view) + padding
+        return offset
+
+    def add_json(self, value):
+        data = json.dumps(value, ensure_ascii=False, default=str).encode('utf-8')
+        return [self.add(data), len(data)]
+
+
+def _table_entry(data, table):
+    """Write one GeometryTable's columns; returns its header entry"""
+    entry = {
+        'fields': list(table.fields),
+        'count': len(table),
+        'columns': [[name, column.dtype.str, data.add(np.ascontiguousarray(column))]
+                    for name, column in table.columns.items()],
+        'text': None,
+        'offsets': None
+    }
+    if table.text is not None:
+        text = table.text.encode('utf-8')
+        entry['text'] = [data.add(text), len(text)]
+    if table.offsets is not None:
+        entry['offsets'] = [table.offsets.dtype.str, data.add(np.ascontiguousarray(table.offsets))]
+    return entry
+
+
+def _pages_by_layer(results):
+    """{layer: {page: value}} from an extract_pdf_data results dict"""
+    layers = {layer: {} for layer in (*JSON_LAYERS, *GEOMETRY_LAYERS)}
+    for entry in results.get('text_content', []):
+        layers['text'][entry['page']] = entry['text']
+    for entry in results.get('tables', []):
+        layers['tables'].setdefault(entry['page'], []).append(entry['data'])
+    for annotation in results.get('annotations', []):
+        layers['annotations'].setdefault(annotation['page'], []).append(annotation)
+    for layer, (results_key, page_key) in GEOMETRY_LAYERS.items():
+        for entry in results.get(results_key, []):
+            layers[layer][entry['page']] = entry[page_key]
+    return layers
+
+
+def write_results(path, results, piping_analysis, extractor_version=None):
+    """Write extract_pdf_data output and its piping analysis to `path` (atomically)"""
+    by_layer = _pages_by_layer(results)
+    index = {layer: {} for layer in by_layer}
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            data = _DataWriter(f)
+            for layer, pages in by_layer.items():
+                for page, value in pages.items():
+                    if layer in GEOMETRY_LAYERS:
+                        index[layer][str(page)] = _table_entry(data, as_table(value, *TABLE_FORMATS[layer]))
+                    else:
+                        index[layer][str(page)] = data.add_json(value)
+            header = json.dumps({
+                'format_version': FORMAT_VERSION,
+                'extractor_version': extractor_version,
+                'metadata': results.get('metadata', {}),
+                'pages': sorted({page for pages in by_layer.values() for page in pages}),
+                'index': index,
+                'piping_analysis': data.add_json(piping_analysis)
+            }, ensure_ascii=False, default=str).encode('utf-8')
+            f.write(header)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(MAGIC)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ResultsFile:
+    """Memory-mapped reader for a file written by write_results.
+
+    `pages` lists the page numbers with any content; `page()` and
+    `results()` return the extract_page / extract_pdf_data shapes for the
+    pages and LAYERS asked for (metadata comes from the header and is always
+    included). Geometry tables keep the map alive while they are in use.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = len(self._map) - 8 - len(MAGIC)
+        if header_end < DATA_START or self._map[:len(MAGIC)] != MAGIC or self._map[-len(MAGIC):] != MAGIC:
+            raise ValueError(f"Not a binary results file: {self.path}")
+        header_length, = struct.unpack('<Q', self._map[header_end:header_end + 8])
+        self.header = json.loads(self._map[header_end - header_length:header_end].decode('utf-8'))
+        if self.header['format_version'] > FORMAT_VERSION:
+            raise ValueError(f"Unsupported results format version {self.header['format_version']}")
+        self._index = self.header['index']
+
+    @property
+    def pages(self):
+        return self.header['pages']
+
+    @property
+    def metadata(self):
+        return self.header['metadata']
+
+    def _bytes(self, ref):
+        offset, size = ref
+        start = DATA_START + offset
+        return self._map[start:start + size]
+
+    def _json(self, ref):
+        return json.loads(self._bytes(ref).decode('utf-8'))
+
+    def _array(self, dtype, offset, count):
+        dtype = np.dtype(dtype)
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.frombuffer(self._map, dtype=dtype, count=count, offset=DATA_START + offset)
+
+    def _table(self, entry):
+        count = entry['count']
+        columns = {name: self._array(dtype, offset, count) for name, dtype, offset in entry['columns']}
+        text = offsets = None
+        if entry['text'] is not None:
+            text = self._bytes(entry['text']).decode('utf-8')
+        if entry['offsets'] is not None:
+            dtype, offset = entry['offsets']
+            offsets = self._array(dtype, offset, count + 1)
+        return GeometryTable(entry['fields'], columns, text, offsets)
+
+    def page(self, page, layers=LAYERS):
+        """One page in the extract_page shape; layers not asked for (or not stored) are empty"""
+        key = str(page)
+        page_data = {'page': page, 'text': None, 'tables': [],
+                     'characters': [], 'lines': [], 'rectangles': [], 'annotations': []}
+        for layer in JSON_LAYERS:
+            if layer in layers and key in self._index[layer]:
+                page_data[layer] = self._json(self._index[layer][key])
+        for layer, (_, page_key) in GEOMETRY_LAYERS.items():
+            if layer in layers and key in self._index[layer]:
+                page_data[page_key] = self._table(self._index[layer][key])
+        return page_data
+
+    def results(self, pages=None, layers=LAYERS):
+        """extract_pdf_data-shaped results for `pages` (default: all), reading only `layers`"""
+        wanted = self.pages if pages is None else sorted(set(pages) & set(self.pages))
+        results = {
+            'text_content': [],
+            'tables': [],
+            'metadata': dict(self.metadata),
+            'annotations': [],
+            'coordinates_data': []
+        }
+        for page in wanted:
+            page_data = self.page(page, layers)
+            if page_data['text']:
+                results['text_content'].append({'page': page, 'text': page_data['text']})
+            for j, table in enumerate(page_data['tables']):
+                results['tables'].append({'page': page, 'table_number': j+1, 'data': table})
+            for layer, (results_key, page_key) in GEOMETRY_LAYERS.items():
+                if len(page_data[page_key]):
+                    results.setdefault(results_key, []).append({'page': page, page_key: page_data[page_key]})
+            results['annotations'].extend(page_data['annotations'])
+        return results
+
+    def piping_analysis(self):
+        return self._json(self.header['piping_analysis'])
+
+
+def read_results(path, pages=None, layers=LAYERS):
+    """(results, piping_analysis) from a binary results file; see ResultsFile.results"""
+    reader = ResultsFile(path)
+    return reader.results(pages, layers), reader.piping_analysis()
@@ -0,0 +1,123 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import hashlib
+
+# Chunks are small enough to stay well under MAX_CONTENT_LENGTH per request
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+COPY_BUFFER = 1024 * 1024
+
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """A chunked-upload request that can't be honoured; `status` is the HTTP status to report"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _upload_dir(root, upload_id):
+    if not _UPLOAD_ID.match(upload_id or ''):
+        raise UploadError('Unknown upload', 404)
+    path = os.path.join(root, upload_id)
+    if not os.path.isdir(path):
+        raise UploadError('Unknown upload', 404)
+    return path
+
+
+def _total_chunks(meta):
+    return max(1, -(-meta['size'] // meta['chunk_size']))
+
+
+def _received(path):
+    return sorted(int(name) for name in os.listdir(os.path.join(path, 'received')))
+
+
+def create_upload(root, filename, size, chunk_size=DEFAULT_CHUNK_SIZE, sha256=None):
+    """Start a chunked upload: reserve the file on disk and return its status"""
+    if size < 0:
+        raise UploadError('Invalid size')
+    upload_id = uuid.uuid4().hex
+    path = os.path.join(root, upload_id)
+    os.makedirs(os.path.join(path, 'received'))
+    meta = {'filename': filename, 'size': size, 'chunk_size': chunk_size,
+            'sha256': sha256.lower() if sha256 else None}
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    # Chunks are written in place at their offsets, in any order
+    with open(os.path.join(path, 'data'), 'wb') as f:
+        f.truncate(size)
+    return upload_status(root, upload_id)
+
+
+def load_upload(root, upload_id):
+    path = _upload_dir(root, upload_id)
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        return path, json.load(f)
+
+
+def upload_status(root, upload_id):
+    """Metadata plus the chunk indices received so far (what a client needs to resume)"""
+    path, meta = load_upload(root, upload_id)
+    return {'upload_id': upload_id, **meta, 'total_chunks': _total_chunks(meta),
+            'received': _received(path)}
+
+
+def write_chunk(root, upload_id, index, stream, sha256=None):
+    """Copy one chunk from `stream` to its offset, verifying its length and optional SHA-256"""
+    path, meta = load_upload(root, upload_id)
+    total = _total_chunks(meta)
+    if not 0 <= index < total:
+        raise UploadError(f'Chunk index out of range (0-{total - 1})')
+    offset = index * meta['chunk_size']
+    expected = min(meta['chunk_size'], meta['size'] - offset)
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(os.path.join(path, 'data'), 'r+b') as f:
+        f.seek(offset)
+        while written <= expected:
+            block = stream.read(min(COPY_BUFFER, expected + 1 - written))
+            if not block:
+                break
+            if written + len(block) > expected:
+                raise UploadError(f'Chunk {index} is larger than {expected} bytes')
+            f.write(block)
+            digest.update(block)
+            written += len(block)
+    if written != expected:
+        raise UploadError(f'Chunk {index} has {written} bytes, expected {expected}')
+    if sha256 and digest.hexdigest() != sha256.lower():
+        raise UploadError(f'Checksum mismatch for chunk {index}', 422)
+
+    # Marker files rather than a shared index, so parallel chunk requests don't race
+    open(os.path.join(path, 'received', str(index)), 'w').close()
+    return upload_status(root, upload_id)
+
+
+def verify_upload(root, upload_id):
+    """Check an upload has every chunk and matches its declared SHA-256; returns the SHA-256"""
+    path, meta = load_upload(root, upload_id)
+    missing = sorted(set(range(_total_chunks(meta))) - set(_received(path)))
+    if meta['size'] and missing:
+        raise UploadError(f"Upload of {meta['filename']} is incomplete, missing chunks: {missing[:20]}", 409)
+
+    digest = hashlib.sha256()
+    with open(os.path.join(path, 'data'), 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER), b''):
+            digest.update(block)
+    if meta['sha256'] and digest.hexdigest() != meta['sha256']:
+        raise UploadError(f"Checksum mismatch for {meta['filename']}", 422)
+    return digest.hexdigest()
+
+
+def move_upload(root, upload_id, destination):
+    """Move an assembled upload to `destination` and discard its bookkeeping"""
+    path, _ = load_upload(root, upload_id)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    shutil.move(os.path.join(path, 'data'), destination)
+    shutil.rmtree(path, ignore_errors=True)
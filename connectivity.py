@@ -0,0 +1,174 @@
+"""Pipe runs from a page's vector line segments.
+
+A drawn pipe is rarely one segment: it is split at every fitting, symbol
+and text gap, and its ends only approximately meet the pipes it joins.
+LineGraph merges the collinear pieces, snaps endpoints that land within a
+tolerance of another segment (an end meeting an end, or a branch meeting a
+header in a T), and groups everything connected into runs with a
+union-find. Apart from the union-find over the snapped pairs all of it is
+array work, so pages with 50k+ segments stay well under a second.
+"""
+import numpy as np
+
+from geometry import segment_endpoints
+from spatial import GridIndex
+
+SNAP_TOLERANCE = 2.0  # Endpoints this close (PDF points) to another segment are joined to it
+AXIS_TOLERANCE = 0.5  # A segment whose ends differ by less than this in y (x) is horizontal (vertical)
+FRAME_FRACTION = 0.75  # Horizontal (vertical) segments this share of the page wide (high) are frame lines...
+FRAME_MARGIN = 0.05  # ...when they lie within this share of the page's height (width) of its edge
+
+
+def _merge_intervals(along0, along1, across, tolerance):
+    """Merge axis-parallel pieces; returns (lo, hi, across, pieces) of the merged segments.
+
+    Pieces are binned into bands `tolerance` wide by their `across`
+    coordinate; within a band, intervals that overlap or leave a gap of at
+    most `tolerance` are merged. Pieces of one pipe that straddle a band edge
+    stay separate but are still joined by endpoint snapping.
+    """
+    lo, hi = np.minimum(along0, along1), np.maximum(along0, along1)
+    band = np.floor(across / tolerance).astype(np.int64)
+    band -= band.min()
+    order = np.lexsort((lo, band))
+    lo, hi, band, across = lo[order], hi[order], band[order], across[order]
+    # Shifting each band clear of the previous one lets a single running max
+    # over the whole array act as a running max per band
+    shift = band * (float(hi.max() - lo.min()) + 4 * tolerance + 1)
+    reach = np.maximum.accumulate(hi + shift)
+    starts = np.flatnonzero(np.concatenate([[True], lo[1:] + shift[1:] > reach[:-1] + tolerance]))
+    pieces = np.diff(np.append(starts, len(lo)))
+    return (lo[starts], np.maximum.reduceat(hi, starts),
+            np.add.reduceat(across, starts) / pieces, pieces)
+
+
+def merge_collinear(ax, ay, bx, by, tolerance=SNAP_TOLERANCE):
+    """Merge horizontal and vertical pieces lying on one line that touch or overlap.
+
+    Returns (ax, ay, bx, by, pieces): the merged segments and how many input
+    segments each covers. Diagonal segments are passed through as they are.
+    """
+    ax, ay, bx, by = (np.asarray(a, dtype=np.float64) for a in (ax, ay, bx, by))
+    horizontal = np.abs(by - ay) <= AXIS_TOLERANCE
+    vertical = ~horizontal & (np.abs(bx - ax) <= AXIS_TOLERANCE)
+    diagonal = ~(horizontal | vertical)
+    parts = [(ax[diagonal], ay[diagonal], bx[diagonal], by[diagonal],
+              np.ones(int(diagonal.sum()), dtype=np.int64))]
+    if horizontal.any():
+        lo, hi, y, pieces = _merge_intervals(ax[horizontal], bx[horizontal],
+                                             (ay[horizontal] + by[horizontal]) / 2, tolerance)
+        parts.append((lo, y, hi, y, pieces))
+    if vertical.any():
+        lo, hi, x, pieces = _merge_intervals(ay[vertical], by[vertical],
+                                             (ax[vertical] + bx[vertical]) / 2, tolerance)
+        parts.append((x, lo, x, hi, pieces))
+    return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+
+def frame_segments(ax, ay, bx, by, extent, frames=(), fraction=FRAME_FRACTION, margin=FRAME_MARGIN,
+                   tolerance=SNAP_TOLERANCE):
+    """Mask of the segments that draw the sheet frame or title block rather than a pipe.
+
+    Those are horizontal (vertical) segments spanning at least `fraction` of
+    the width (height) of `extent`, the page's drawn x0, y0, x1, y1, within
+    `margin` of its top or bottom (left or right) edge, and segments lying
+    along an edge of one of `frames`, rows of x0, y0, x1, y1 (the frame and
+    title block rectangles). Left in, they join most of a page's pipes into
+    one run.
+    """
+    ax, ay, bx, by = (np.asarray(a, dtype=np.float64) for a in (ax, ay, bx, by))
+    horizontal = np.abs(by - ay) <= AXIS_TOLERANCE
+    vertical = ~horizontal & (np.abs(bx - ax) <= AXIS_TOLERANCE)
+    x0, y0, x1, y1 = extent
+    width, height = x1 - x0, y1 - y0
+    near_x = np.minimum(np.abs(ax - x0), np.abs(x1 - ax)) <= margin * width
+    near_y = np.minimum(np.abs(ay - y0), np.abs(y1 - ay)) <= margin * height
+    frame = ((horizontal & near_y & (np.abs(bx - ax) >= fraction * width))
+             | (vertical & near_x & (np.abs(by - ay) >= fraction * height)))
+    lo_x, hi_x = np.minimum(ax, bx), np.maximum(ax, bx)
+    lo_y, hi_y = np.minimum(ay, by), np.maximum(ay, by)
+    for x0, y0, x1, y1 in np.asarray(frames, dtype=np.float64).reshape(-1, 4):
+        within_x = (lo_x >= x0 - tolerance) & (hi_x <= x1 + tolerance)
+        within_y = (lo_y >= y0 - tolerance) & (hi_y <= y1 + tolerance)
+        frame |= horizontal & within_x & ((np.abs(ay - y0) <= tolerance) | (np.abs(ay - y1) <= tolerance))
+        frame |= vertical & within_y & ((np.abs(ax - x0) <= tolerance) | (np.abs(ax - x1) <= tolerance))
+    return frame
+
+
+def _components(n, first, second):
+    """Component label (0..k-1, in order of lowest member) of each of `n` nodes joined by the edge arrays"""
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]  # Path halving
+            i = parent[i]
+        return i
+
+    for i, j in zip(first.tolist(), second.tolist()):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # The lower index stays the root, so labels don't depend on edge order
+            if root_i < root_j:
+                parent[root_j] = root_i
+            else:
+                parent[root_i] = root_j
+    roots = np.fromiter((find(i) for i in range(n)), dtype=np.int64, count=n)
+    return np.unique(roots, return_inverse=True)[1].reshape(-1)
+
+
+class LineGraph:
+    """Connected pipe runs of one page.
+
+    `ax`..`by` are the merged segments, `pieces` the number of drawn
+    segments behind each, `run` the run label of each merged segment and
+    `index` a GridIndex over them.
+    """
+
+    def __init__(self, ax, ay, bx, by, tolerance=SNAP_TOLERANCE):
+        self.tolerance = tolerance
+        if len(ax):
+            self.ax, self.ay, self.bx, self.by, self.pieces = merge_collinear(ax, ay, bx, by, tolerance)
+        else:
+            self.ax = self.ay = self.bx = self.by = np.zeros(0)
+            self.pieces = np.zeros(0, dtype=np.int64)
+        self.index = GridIndex.from_segments(self.ax, self.ay, self.bx, self.by)
+        n = len(self.ax)
+        # Every endpoint is joined to each segment it lies within `tolerance` of
+        point, segment = self.index.query_pairs(
+            np.concatenate([self.ax, self.bx]), np.concatenate([self.ay, self.by]), tolerance
+        )
+        owner = point % n if n else point
+        joined = owner != segment
+        first = np.minimum(owner, segment)[joined]
+        second = np.maximum(owner, segment)[joined]
+        edges = np.sort(first * n + second)
+        edges = edges[np.concatenate([[True], edges[1:] != edges[:-1]])] if len(edges) else edges
+        self.run = _components(n, edges // max(n, 1), edges % max(n, 1))
+        self.run_count = int(self.run.max()) + 1 if n else 0
+
+    @classmethod
+    def from_lines(cls, lines, tolerance=SNAP_TOLERANCE):
+        """LineGraph of a page's line GeometryTable"""
+        return cls(*segment_endpoints(lines), tolerance=tolerance)
+
+    def __len__(self):
+        return len(self.ax)
+
+    def run_segments(self):
+        """Number of drawn segments in each run"""
+        return np.bincount(self.run, weights=self.pieces, minlength=self.run_count).astype(np.int64)
+
+    def run_lengths(self):
+        """Total length of each run"""
+        lengths = np.hypot(self.bx - self.ax, self.by - self.ay)
+        return np.bincount(self.run, weights=lengths, minlength=self.run_count)
+
+    def run_near(self, x, y, radius):
+        """Run of the segment nearest (x, y), or None if none is within `radius`"""
+        nearest = self.index.nearest(x, y, radius)
+        return None if nearest is None else int(self.run[nearest[0]])
+
+    def runs_touching(self, x0, y0, x1, y1):
+        """Sorted runs with a segment crossing the box"""
+        return np.unique(self.run[self.index.touching(x0, y0, x1, y1)]).tolist()
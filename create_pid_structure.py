@@ -1,13 +1,52 @@
 import pandas as pd
 import json
 import re
+from itertools import chain
 from pathlib import Path
 
-def load_extracted_data(output_dir):
-    """Load the previously extracted data"""
-    with open(Path(output_dir) / 'piping_analysis.json', 'r', encoding='utf-8') as f:
+from tag_patterns import default_classifier
+from output_writers import frame_sheet, column_sheet, write_sheets
+from spatial import PageGeometry
+from geometry import segment_endpoints
+from connectivity import LineGraph, frame_segments
+from binary_results import read_results, RESULTS_FILE
+from extraction_profiles import LAYERS
+
+# Bump whenever the workbook layout or analysis changes, so cached workbooks are invalidated
+STRUCTURE_VERSION = 4
+
+# Compiled once at import instead of on every call
+DRAWING_NAME_RE = re.compile(
+    r'(\d{2,3}-[A-Z]{2}-\d{3}-\d{3})\s*[-:]?\s*([A-Z\s&,\-]+(?:UNIT|SYSTEM|FURNACE|PUMP|VESSEL|TOWER|REACTOR)[A-Z\s&,\-]*)',
+    re.IGNORECASE
+)
+LINE_NUMBER_RE = re.compile(r'^[A-Z]{1,3}-\d+')
+EQUIPMENT_TAG_RE = re.compile(r'\b([PMEFVCHTR]-\d{3,6}[A-Z]?)\b')
+PID_NUMBER_RE = re.compile(r'(\d{2,3}-[A-Z]{2}-\d{3}-\d{3})')
+# Pipe line numbers: size first (6"-P-1001-A1A) or service first (PW-10023-6"-A1A)
+LINE_TAG_RE = re.compile(
+    r'(\b\d+(?:\.\d+)?"-[A-Z]{1,4}-\d{3,6}(?:-[A-Z0-9]+)*|\b[A-Z]{1,4}-\d{3,6}-\d+(?:\.\d+)?"(?:-[A-Z0-9]+)*)'
+)
+FLOW_RE = re.compile(r'(\d+[,\d]*)\s*(?:GPM|gpm|LPM)')
+PRESSURE_RE = re.compile(r'(\d+)\s*(?:PSI|psi|bar|Bar)')
+TEMPERATURE_RE = re.compile(r'(\d+)\s*(?:°F|F|°C|C)')
+RPM_RE = re.compile(r'(\d+)\s*(?:RPM|rpm)')
+TO_RE = re.compile(r'(?:TO|to)\s+([A-Z0-9\-\s]+?)(?:\n|$|TO|FROM)')
+FROM_RE = re.compile(r'(?:FROM|from)\s+([A-Z0-9\-\s]+?)(?:\n|$|TO|FROM)')
+
+def load_extracted_data(output_dir, name_prefix='', pages=None, layers=LAYERS):
+    """Load the previously extracted data: the binary results file when there is one, else the JSON dumps.
+
+    `pages` and `layers` limit what is read from the binary file (the JSON
+    dumps are always read whole).
+    """
+    binary_path = Path(output_dir) / f'{name_prefix}{RESULTS_FILE}'
+    if binary_path.exists():
+        raw_data, piping_data = read_results(binary_path, pages, layers)
+        return piping_data, raw_data
+    with open(Path(output_dir) / f'{name_prefix}piping_analysis.json', 'r', encoding='utf-8') as f:
         piping_data = json.load(f)
-    with open(Path(output_dir) / 'pdf_extraction_results.json', 'r', encoding='utf-8') as f:
+    with open(Path(output_dir) / f'{name_prefix}pdf_extraction_results.json', 'r', encoding='utf-8') as f:
         raw_data = json.load(f)
     return piping_data, raw_data
 
@@ -21,8 +60,7 @@ def extract_drawing_name(raw_data):
         
         # Look for common P&ID drawing number patterns
         # Pattern: XXX-XX-XXX-XXX followed by description
-        pattern = r'(\d{2,3}-[A-Z]{2}-\d{3}-\d{3})\s*[-:]?\s*([A-Z\s&,\-]+(?:UNIT|SYSTEM|FURNACE|PUMP|VESSEL|TOWER|REACTOR)[A-Z\s&,\-]*)'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = DRAWING_NAME_RE.search(text)
         
         if match:
             drawing_num = match.group(1)
@@ -32,9 +70,8 @@ def extract_drawing_name(raw_data):
     
     return drawing_name
 
-def categorize_components(annotations_text):
-    """Categorize extracted components into PID categories"""
-
+def new_categories():
+    """Empty PID category lists: the reference columns plus any site-registered categories"""
     categories = {
         'Drawing_Name': [],
         'CV #': [],
@@ -59,51 +96,25 @@ def categorize_components(annotations_text):
         'Thermal Weld #': []
     }
 
-    # --- Extended pattern definitions ---
-    patterns = {
-        'Equipment #': [
-            r'\b(P|M|E|F|V|C|H|T|R)-\d{3,6}\b',                    # Basic equipment tags
-            r'\b[PMEFVCHTR]-\d{3,6}(?:-[A-Z0-9]+)?\b',              # With suffixes
-        ],
-        'PID #': [r'\b\d{2,3}-[A-Z]{2}-\d{3}-\d{3}\b'],
-        'Line #': [
-            r'\b[A-Z]{1,3}-\d{3,6}(?:-\d+)?["]?[-~]?[A-Z0-9"\-\(\)]*\b',  # General line pattern
-            r'\bP-\d{3,6}(?:-\d+)?["]?-?[A-Z0-9"~\-\(\)]*[A-Z]{1,3}\b',   # P- prefix lines
-            r'\b(?:RO|MS|HS|CS|SS)-\d+["\-].*\b',                         # Special material lines
-        ],
-        'Flow Element #': [r'\bFE-\d+[A-Z]?\b', r'\d+-FE-\d+[A-Z]?\b'],
-        'Flow Indicator #': [r'\bFI-\d+[A-Z]?\b', r'\d+-FI-\d+[A-Z]?\b'],
-        'Flow Transmitter #': [r'\bFT-\d+[A-Z]?\b', r'\d+-FT-\d+[A-Z]?\b'],
-        'Pressure Gauge #': [r'\b(?:PG|PI)-\d+[A-Z]?\b', r'\d+-(?:PG|PI)-\d+[A-Z]?\b'],
-        'Pressure Transmitter #': [r'\bPT-\d+[A-Z]?\b', r'\d+-PT-\d+[A-Z]?\b'],
-        'PSV #': [r'\b(?:PSV|PRV)-\d+[A-Z]?\b', r'\d+-(?:PSV|PRV)-\d+[A-Z]?\b'],
-        'Temperature Element #': [r'\bTE-\d+[A-Z]?\b', r'\d+-TE-\d+[A-Z]?\b'],
-        'Temperature Transmitter #': [r'\bTT-\d+[A-Z]?\b', r'\d+-TT-\d+[A-Z]?\b'],
-        'Level Gauge #': [r'\b(?:LG|LI)-\d+[A-Z]?\b', r'\d+-(?:LG|LI)-\d+[A-Z]?\b'],
-        'Level Transmitter #': [r'\bLT-\d+[A-Z]?\b', r'\d+-LT-\d+[A-Z]?\b'],
-        'CV #': [r'\b(?:CV|HV|PV|FV)-\d+[A-Z]?\b', r'\d+-(?:CV|HV|PV|FV)-\d+[A-Z]?\b'],
-        'High Switch #': [r'\bHS-\d+[A-Z]?\b', r'\d+-HS-\d+[A-Z]?\b'],
-        'IPF #': [r'\bIPF-\d+[A-Z]?\b'],
-        'Orfice #': [r'\b(?:FO|OR)-\d+[A-Z]?\b'],
-    }
+    for category in default_classifier.categories:
+        categories.setdefault(category, [])
+    return categories
 
-    # --- Categorization logic ---
+def add_to_categories(categories, annotations_text):
+    """Classify annotation texts into `categories` (can be called page by page)"""
+    # --- Categorization logic (single compiled scan per string, first category wins) ---
     for text in annotations_text:
         if not text or not str(text).strip():
             continue
 
         text_str = str(text).strip()
-        categorized = False
-
-        for category, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                if re.search(pattern, text_str, re.IGNORECASE):
-                    categories[category].append(text_str)
-                    categorized = True
-                    break
-            if categorized:
-                break
+        category = default_classifier.classify(text_str)
+        if category is not None:
+            categories[category].append(text_str)
+    return categories
 
+def clean_line_numbers(categories):
+    """Drop Line # entries that are notes or references rather than line numbers"""
     # --- Cleanup unwanted text from Line # ---
     cleaned_lines = []
     skip_keywords = ['TO ', 'FROM ', 'HOT OIL', 'TRIM', 'AS-BUILT', 'UPDATE', 'FILTER', 'DWG', 'SHEET', 'REV']
@@ -112,103 +123,307 @@ def categorize_components(annotations_text):
         if any(word in upper_line for word in skip_keywords):
             continue
         # Only keep if it looks like a proper line number
-        if re.match(r'^[A-Z]{1,3}-\d+', line) or '"' in line:
+        if LINE_NUMBER_RE.match(line) or '"' in line:
             cleaned_lines.append(line)
     categories['Line #'] = list(set(cleaned_lines))  # Remove duplicates
 
     return categories
 
-def extract_equipment_details(raw_data, piping_data):
-    """Extract equipment specifications from PDF text"""
+def categorize_components(annotations_text):
+    """Categorize extracted components into PID categories"""
+    return clean_line_numbers(add_to_categories(new_categories(), annotations_text))
+
+def page_texts(raw_data):
+    """(page number, text) for every page with extracted text"""
+    return [(page_text.get('page'), page_text.get('text') or '')
+            for page_text in raw_data.get('text_content', [])]
+
+def build_tag_index(pages, pattern):
+    """Inverted index of tag -> [(page, offset), ...] for every match of `pattern`, in one pass per page.
+
+    Tags are keyed in order of first appearance, so output order is stable.
+    """
+    index = {}
+    for page_number, text in pages:
+        for match in pattern.finditer(text):
+            index.setdefault(match.group(1), []).append((page_number, match.start(1)))
+    return index
+
+def _occurrences_by_page(occurrences):
+    """Group (page, offset) occurrences into {page: [offsets]} preserving page order"""
+    by_page = {}
+    for page_number, offset in occurrences:
+        by_page.setdefault(page_number, []).append(offset)
+    return by_page
+
+def _first_in_windows(pattern, text, offsets, window):
+    """First match of `pattern` in the window after any occurrence (searched in place, no slicing)"""
+    for offset in offsets:
+        match = pattern.search(text, offset, offset + window)
+        if match:
+            return match
+    return None
+
+# Placing tags on the drawing (PDF points)
+SYMBOL_MAX_SIZE = 300  # Larger rectangles are frames and title blocks, not symbols
+SYMBOL_RADIUS = 40  # How far from a tag its symbol may be when the tag isn't inside one
+LINE_RADIUS = 30  # A tag further than this from every line segment isn't on a line
+EQUIPMENT_CONTACT = 10  # A pipe run passing this close to an equipment symbol (or bare tag) connects to it
+MAX_CONNECTED_EQUIPMENT = 6  # Lines whose runs touch more equipment than this keep their TO/FROM description
+
+LINE_CONNECTIVITY_COLUMNS = ['Page', 'Run', 'Line_Numbers', 'Equipment', 'Segments', 'Length']
+
+def _format_coordinates(values):
+    return ', '.join(f"{float(v):.1f}" for v in values)
+
+def _center(box):
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+def _place_tags(geometry, page_number, patterns):
+    """{(tag, page): {'Symbol_Box', 'Line_Segment'}} for the tags among one page's words.
+
+    Each tag gets the smallest rectangle around it (or the nearest one close
+    by) and the nearest line segment, found through the PageGeometry's
+    spatial indexes. Where a tag occurs several times, the first occurrence
+    with a symbol wins.
+    """
+    located = {}
+    if geometry.chars is None:
+        return located
+    texts, boxes = geometry.words
+    for text, box in zip(texts, boxes):
+        for pattern in patterns:
+            for match in pattern.finditer(text):
+                key = (match.group(1), page_number)
+                if located.get(key, {}).get('Symbol_Box'):
+                    continue
+                x, y = _center(box)
+                found = {'Symbol_Box': None, 'Line_Segment': None}
+                rect = geometry.symbol_rect(x, y, SYMBOL_RADIUS, SYMBOL_MAX_SIZE)
+                if rect is not None:
+                    index = geometry.rect_index
+                    found['Symbol_Box'] = _format_coordinates(
+                        (index.x0[rect], index.y0[rect], index.x1[rect], index.y1[rect])
+                    )
+                line = geometry.line_index.nearest(x, y, LINE_RADIUS)
+                if line is not None:
+                    found['Line_Segment'] = _format_coordinates(a[line[0]] for a in geometry.line_index.segments)
+                if key not in located or found['Symbol_Box']:
+                    located[key] = found
+    return located
+
+def new_layout():
+    """Empty drawing layout: tag placements, line tags on pipe runs, and the runs themselves"""
+    return {'tags': {}, 'lines': {}, 'runs': [], 'pages': []}
+
+def page_layout(page_number, chars, lines=None, rects=None):
+    """Tag placements and pipe connectivity of one page.
+
+    The page's segments, less its frame and title block lines
+    (connectivity.frame_segments), are merged into connected runs
+    (connectivity.LineGraph).
+    Every line tag (LINE_TAG_RE or PID_NUMBER_RE) is attached to the runs it
+    labels (nearest within LINE_RADIUS), and every equipment tag to the runs
+    passing within EQUIPMENT_CONTACT of its symbol (its own word box when it
+    has none). Returns new_layout() filled with:
+      'tags'  - _place_tags placements of equipment, PID and line tags
+      'lines' - {(tag, page): {'Occurrences', 'Runs', 'Connected_Equipment'}}
+      'runs'  - one LINE_CONNECTIVITY_COLUMNS row per run carrying a tag
+      'pages' - [page_number] when the page had words and lines to work with
+    """
+    geometry = PageGeometry(chars, lines, rects)
+    layout = new_layout()
+    layout['tags'] = _place_tags(geometry, page_number, (EQUIPMENT_TAG_RE, PID_NUMBER_RE, LINE_TAG_RE))
+    if geometry.chars is None or geometry.lines is None:
+        return layout
+    layout['pages'].append(page_number)
+    ax, ay, bx, by = segment_endpoints(geometry.lines)
+    pipes = ~frame_segments(ax, ay, bx, by, geometry.extent, geometry.large_rects(SYMBOL_MAX_SIZE))
+    graph = LineGraph(ax[pipes], ay[pipes], bx[pipes], by[pipes])
+
+    run_lines, run_equipment = {}, {}
+    for text, box in zip(*geometry.words):
+        x, y = _center(box)
+        line_tags = [match.group(1) for pattern in (LINE_TAG_RE, PID_NUMBER_RE)
+                     for match in pattern.finditer(text)]
+        if line_tags:
+            run = graph.run_near(x, y, LINE_RADIUS)
+            for tag in line_tags:
+                entry = layout['lines'].setdefault((tag, page_number), {'Occurrences': 0, 'Runs': []})
+                entry['Occurrences'] += 1
+                if run is not None and run not in entry['Runs']:
+                    entry['Runs'].append(run)
+                    run_lines.setdefault(run, []).append(tag)
+            continue  # The equipment-like middle of a line number is not equipment
+        equipment = [match.group(1) for match in EQUIPMENT_TAG_RE.finditer(text)]
+        if not equipment:
+            continue
+        rect = geometry.symbol_rect(x, y, SYMBOL_RADIUS, SYMBOL_MAX_SIZE)
+        if rect is not None:
+            index = geometry.rect_index
+            box = (index.x0[rect], index.y0[rect], index.x1[rect], index.y1[rect])
+        for run in graph.runs_touching(box[0] - EQUIPMENT_CONTACT, box[1] - EQUIPMENT_CONTACT,
+                                       box[2] + EQUIPMENT_CONTACT, box[3] + EQUIPMENT_CONTACT):
+            tags = run_equipment.setdefault(run, [])
+            tags.extend(tag for tag in equipment if tag not in tags)
+
+    # Runs are numbered per page in the order of their lowest segment
+    segments, lengths = graph.run_segments(), graph.run_lengths()
+    numbers = {}
+    for run in sorted(set(run_lines) | set(run_equipment)):
+        numbers[run] = len(numbers) + 1
+        layout['runs'].append({
+            'Page': page_number,
+            'Run': numbers[run],
+            'Line_Numbers': ', '.join(dict.fromkeys(run_lines.get(run, []))),
+            'Equipment': ', '.join(run_equipment.get(run, [])),
+            'Segments': int(segments[run]),
+            'Length': round(float(lengths[run]), 1)
+        })
+    for entry in layout['lines'].values():
+        equipment = [tag for run in entry['Runs'] for tag in run_equipment.get(run, [])]
+        entry['Connected_Equipment'] = list(dict.fromkeys(equipment))
+        entry['Runs'] = sorted(numbers[run] for run in entry['Runs'])
+    return layout
+
+def merge_layout(layout, page):
+    """Add one page_layout to a drawing layout (in place) and return it"""
+    layout['tags'].update(page['tags'])
+    layout['lines'].update(page['lines'])
+    layout['runs'].extend(page['runs'])
+    layout['pages'].extend(page['pages'])
+    return layout
+
+def drawing_layout(raw_data):
+    """page_layout over every page with character geometry in extract_pdf_data results"""
+    lines = {entry['page']: entry['lines'] for entry in raw_data.get('lines', [])}
+    rects = {entry['page']: entry['rectangles'] for entry in raw_data.get('rectangles', [])}
+    layout = new_layout()
+    for entry in raw_data.get('coordinates_data', []):
+        page_number = entry['page']
+        merge_layout(layout, page_layout(page_number, entry['characters'],
+                                         lines.get(page_number), rects.get(page_number)))
+    return layout
+
+def equipment_adjacency(line_runs):
+    """{equipment: {other equipment: (line numbers)}} from Line_Connectivity rows.
+
+    Two pieces of equipment are adjacent when a pipe run touches both; every
+    equipment tag on a run appears as a key, even with no neighbours. Runs
+    touching the same equipment are grouped first and each group's line
+    numbers are shared by all of its pairs; they are only merged for pairs
+    that several groups have in common.
+    """
+    groups = {}
+    for run in line_runs:
+        equipment = tuple(run['Equipment'].split(', ')) if run['Equipment'] else ()
+        line_numbers = groups.setdefault(equipment, {})
+        if run['Line_Numbers']:
+            line_numbers.update(dict.fromkeys(run['Line_Numbers'].split(', ')))
+    adjacency = {}
+    for equipment, line_numbers in groups.items():
+        line_numbers = tuple(line_numbers)
+        for tag in equipment:
+            neighbours = adjacency.setdefault(tag, {})
+            for other in equipment:
+                if other != tag:
+                    neighbours.setdefault(other, []).append(line_numbers)
+    for neighbours in adjacency.values():
+        for other, shared in neighbours.items():
+            neighbours[other] = shared[0] if len(shared) == 1 else tuple(dict.fromkeys(chain(*shared)))
+    return adjacency
+
+def extract_equipment_details(raw_data, piping_data, layout=None):
+    """Extract equipment specifications from PDF text, one row per tag and page"""
     equipment_details = []
-    all_text = []
+    pages = page_texts(raw_data)
+    texts = dict(pages)
     
-    # Combine all text from PDF
-    for page_text in raw_data.get('text_content', []):
-        all_text.append(page_text.get('text', ''))
-    
-    combined_text = ' '.join(all_text)
+    # Find all equipment tags and every place they occur
+    tag_index = build_tag_index(pages, EQUIPMENT_TAG_RE)
     
-    # Find all equipment tags
-    equipment_pattern = r'\b([PMEFVCHTR]-\d{3,6}[A-Z]?)\b'
-    equipment_tags = re.findall(equipment_pattern, combined_text)
-    equipment_tags = list(set(equipment_tags))  # Remove duplicates
-    
-    for tag in equipment_tags:
-        detail = {'Component_ID': tag, 'Category': 'Equipment'}
-        
-        # Try to find specifications near the tag
-        # Look for text within 200 characters after the tag
-        tag_index = combined_text.find(tag)
-        if tag_index != -1:
-            context = combined_text[tag_index:tag_index + 300]
+    for tag, occurrences in tag_index.items():
+        for page_number, offsets in _occurrences_by_page(occurrences).items():
+            detail = {'Component_ID': tag, 'Category': 'Equipment',
+                      'Page': page_number, 'Occurrences': len(offsets)}
+            text = texts[page_number]
             
-            # Extract common specs
-            flow_match = re.search(r'(\d+[,\d]*)\s*(?:GPM|gpm|LPM)', context)
-            if flow_match:
-                detail['Flow'] = flow_match.group(0)
+            # Look for specifications within 300 characters after each occurrence
+            for field, pattern in (('Flow', FLOW_RE), ('Pressure', PRESSURE_RE),
+                                   ('Temperature', TEMPERATURE_RE), ('RPM', RPM_RE)):
+                match = _first_in_windows(pattern, text, offsets, 300)
+                if match:
+                    detail[field] = match.group(0)
             
-            pressure_match = re.search(r'(\d+)\s*(?:PSI|psi|bar|Bar)', context)
-            if pressure_match:
-                detail['Pressure'] = pressure_match.group(0)
-            
-            temp_match = re.search(r'(\d+)\s*(?:°F|F|°C|C)', context)
-            if temp_match:
-                detail['Temperature'] = temp_match.group(0)
-            
-            rpm_match = re.search(r'(\d+)\s*(?:RPM|rpm)', context)
-            if rpm_match:
-                detail['RPM'] = rpm_match.group(0)
-        
-        equipment_details.append(detail)
+            detail.update((layout or new_layout())['tags'].get((tag, page_number), {}))
+            equipment_details.append(detail)
     
     return equipment_details
 
-def extract_line_connections(raw_data, piping_data):
-    """Extract line connections and descriptions from PDF"""
-    line_connections = []
-    all_text = []
+def _text_description(text, offsets):
+    """FROM/TO text within 200 characters after any occurrence of a line tag, or 'Process Line'"""
+    to_match = _first_in_windows(TO_RE, text, offsets, 200)
+    from_match = _first_in_windows(FROM_RE, text, offsets, 200)
     
-    for page_text in raw_data.get('text_content', []):
-        all_text.append(page_text.get('text', ''))
+    desc_parts = []
+    if from_match:
+        desc_parts.append(f"FROM {from_match.group(1).strip()}")
+    if to_match:
+        desc_parts.append(f"TO {to_match.group(1).strip()}")
     
-    combined_text = ' '.join(all_text)
+    # Generic description
+    return ' '.join(desc_parts) if desc_parts else 'Process Line'
+
+def extract_line_connections(raw_data, piping_data, layout=None):
+    """Extract line connections and descriptions from PDF, one row per line and page.
+
+    On pages with a line graph (see page_layout) each line tag is described
+    by the equipment its pipe runs touch. Elsewhere, and where the runs touch
+    no equipment or more than MAX_CONNECTED_EQUIPMENT (a run the graph could
+    not separate from its neighbours), TO/FROM text near the tag is the clue.
+    """
+    layout = layout or new_layout()
+    graph_pages = set(layout['pages'])
+    line_connections = []
+    texts = dict(page_texts(raw_data))
+    pages = [(page_number, text) for page_number, text in texts.items() if page_number not in graph_pages]
     
-    # Find PID numbers (line identifiers)
-    pid_pattern = r'(\d{2,3}-[A-Z]{2}-\d{3}-\d{3})'
-    pid_numbers = re.findall(pid_pattern, combined_text)
-    pid_numbers = list(set(pid_numbers))
+    # Find PID numbers (line identifiers) and every place they occur
+    tag_index = build_tag_index(pages, PID_NUMBER_RE)
     
-    for pid_num in pid_numbers:
-        connection = {'Component_ID': pid_num, 'Category': 'Line'}
-        
-        # Try to find description after PID number
-        pid_index = combined_text.find(pid_num)
-        if pid_index != -1:
-            context = combined_text[pid_index:pid_index + 200]
-            
-            # Look for TO/FROM patterns
-            to_match = re.search(r'(?:TO|to)\s+([A-Z0-9\-\s]+?)(?:\n|$|TO|FROM)', context)
-            from_match = re.search(r'(?:FROM|from)\s+([A-Z0-9\-\s]+?)(?:\n|$|TO|FROM)', context)
-            
-            desc_parts = []
-            if from_match:
-                desc_parts.append(f"FROM {from_match.group(1).strip()}")
-            if to_match:
-                desc_parts.append(f"TO {to_match.group(1).strip()}")
-            
-            if desc_parts:
-                connection['Description'] = ' '.join(desc_parts)
-            else:
-                # Generic description
-                connection['Description'] = 'Process Line'
-        
+    for pid_num, occurrences in tag_index.items():
+        for page_number, offsets in _occurrences_by_page(occurrences).items():
+            connection = {'Component_ID': pid_num, 'Category': 'Line',
+                          'Page': page_number, 'Occurrences': len(offsets),
+                          'Description': _text_description(texts[page_number], offsets)}
+            connection.update(layout['tags'].get((pid_num, page_number), {}))
+            line_connections.append(connection)
+    
+    # Line tags placed on the drawing's pipe runs
+    for (tag, page_number), entry in layout['lines'].items():
+        equipment = entry['Connected_Equipment']
+        if 0 < len(equipment) <= MAX_CONNECTED_EQUIPMENT:
+            description = f"Connects {', '.join(equipment)}"
+        else:
+            text = texts.get(page_number, '')
+            offsets = [match.start() for match in re.finditer(re.escape(tag), text)]
+            description = _text_description(text, offsets)
+        connection = {'Component_ID': tag, 'Category': 'Line', 'Page': page_number,
+                      'Occurrences': entry['Occurrences'],
+                      'Description': description,
+                      'Connected_Equipment': ', '.join(equipment),
+                      'Runs': ', '.join(str(run) for run in entry['Runs'])}
+        connection.update(layout['tags'].get((tag, page_number), {}))
         line_connections.append(connection)
     
     return line_connections
 
-def create_pid_scrape_format(piping_data, raw_data):
-    """Create structured data in the same format as PID scrape reference"""
+def create_pid_scrape_format(piping_data, raw_data, categories=None):
+    """Create structured data in the same format as PID scrape reference.
+
+    `categories` may be passed in when annotations were already categorized
+    incrementally (see pipeline.stream_pipeline).
+    """
     
     # Extract drawing name from actual PDF content
     drawing_name = extract_drawing_name(raw_data)
@@ -217,7 +432,8 @@ def create_pid_scrape_format(piping_data, raw_data):
     all_annotations = piping_data.get('annotations_text', [])
     
     # Categorize components
-    categories = categorize_components(all_annotations)
+    if categories is None:
+        categories = categorize_components(all_annotations)
     
     rows = []
     max_items = max(len(items) for items in categories.values()) if categories else 1
@@ -241,6 +457,8 @@ def create_pid_scrape_format(piping_data, raw_data):
         'Pressure Gauge #', 'Pressure Transmitter #', 'PSV #', 'SP #',
         'Temperature Element #', 'Temperature Transmitter #', 'Thermal Weld #'
     ]
+    # Site-registered categories go after the reference columns
+    column_order += [c for c in categories if c not in column_order]
 
     for col in column_order:
         if col not in df.columns:
@@ -248,16 +466,23 @@ def create_pid_scrape_format(piping_data, raw_data):
 
     return df[column_order]
 
-def create_detailed_components_sheet(piping_data, raw_data):
-    """Detailed component sheet with specifications - REAL DATA"""
+def create_detailed_components_sheet(piping_data, raw_data, layout=None):
+    """Detailed component sheet with specifications - REAL DATA.
+
+    With character and line geometry in `raw_data` (or a `layout` from
+    page_layout, when pages were streamed) each tag also gets its Symbol_Box
+    and Line_Segment, and lines the equipment they connect.
+    """
     detailed_data = []
+    if layout is None:
+        layout = drawing_layout(raw_data)
     
     # Extract equipment details from actual PDF
-    equipment_details = extract_equipment_details(raw_data, piping_data)
+    equipment_details = extract_equipment_details(raw_data, piping_data, layout)
     detailed_data.extend(equipment_details)
     
     # Extract line connections from actual PDF
-    line_connections = extract_line_connections(raw_data, piping_data)
+    line_connections = extract_line_connections(raw_data, piping_data, layout)
     detailed_data.extend(line_connections)
     
     # If no data was extracted, add a note
@@ -270,20 +495,26 @@ def create_detailed_components_sheet(piping_data, raw_data):
     
     return pd.DataFrame(detailed_data)
 
-def save_to_excel(pid_df, detailed_df, piping_data, output_file):
-    output_path = Path(output_file)
-    if output_path.exists():
-        output_path.unlink()  # Overwrite if exists
+def save_to_excel(pid_df, detailed_df, piping_data, output_file, fmt='xlsx', line_runs=None):
+    """Write the PID workbook; `fmt` 'csv' or 'parquet' writes a zip of per-sheet files instead.
 
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+    `line_runs` (page_layout 'runs') adds a Line_Connectivity sheet; it is
+    omitted when the drawing had no line geometry.
+    """
+    sheets = [
         # Sheet 1: PID Components (categorized)
-        pid_df.to_excel(writer, sheet_name='PID_Components', index=False)
+        frame_sheet('PID_Components', pid_df),
         
         # Sheet 2: Component Details (specifications)
-        detailed_df.to_excel(writer, sheet_name='Component_Details', index=False)
+        frame_sheet('Component_Details', detailed_df),
         
         # Sheet 3: All Annotations (raw data for reference)
-        annotations_df = pd.DataFrame({'Annotation': piping_data['annotations_text']})
-        annotations_df.to_excel(writer, sheet_name='All_Annotations', index=False)
+        column_sheet('All_Annotations', 'Annotation', piping_data['annotations_text'])
+    ]
+    if line_runs is not None:
+        # Sheet 4: Line Connectivity (pipe runs and the equipment they join)
+        sheets.append(('Line_Connectivity', LINE_CONNECTIVITY_COLUMNS,
+                       ([run[column] for column in LINE_CONNECTIVITY_COLUMNS] for run in line_runs)))
+    write_sheets(sheets, output_file, fmt)
         
-    print(f"Excel file saved: {output_file}")
\ No newline at end of file
+    print(f"Workbook saved: {output_file}")
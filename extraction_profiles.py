@@ -0,0 +1,31 @@
+"""Extraction layers and the named profiles that select them (no heavy imports)."""
+
+# Layers extract_pdf_data can produce; profiles select the subset a caller pays for
+LAYERS = ('text', 'tables', 'chars', 'lines', 'rects', 'annotations', 'metadata')
+
+EXTRACTION_PROFILES = {
+    # PID_Components from annotations only (no page content is parsed)
+    'tags-only': ('annotations', 'metadata'),
+    # PID_Components, Component_Details and annotations, with line connections guessed from TO/FROM text
+    'text+annotations': ('text', 'annotations', 'metadata'),
+    # Adds char/line/rect geometry: symbol boxes, line segments, pipe runs and Line_Connectivity
+    'tags+geometry': ('text', 'chars', 'lines', 'rects', 'annotations', 'metadata'),
+    # All layers, including tables and per-character/line/rect geometry
+    'full-geometry': LAYERS,
+}
+DEFAULT_PROFILE = 'full-geometry'
+
+
+def resolve_profile(profile):
+    """Return the set of layers for a profile name (or an explicit iterable of layers)"""
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, str):
+        if profile not in EXTRACTION_PROFILES:
+            raise ValueError(f"Unknown extraction profile: {profile}")
+        return frozenset(EXTRACTION_PROFILES[profile])
+    layers = frozenset(profile)
+    unknown = layers - set(LAYERS)
+    if unknown:
+        raise ValueError(f"Unknown extraction layer(s): {', '.join(sorted(unknown))}")
+    return layers
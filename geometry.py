@@ -0,0 +1,277 @@
+import numpy as np
+
+# Legacy per-item dict keys for each geometry layer, in output order
+CHAR_FIELDS = ('x0', 'y0', 'x1', 'y1', 'size')
+LINE_FIELDS = ('x0', 'y0', 'x1', 'y1', 'width')
+RECT_FIELDS = ('x0', 'y0', 'x1', 'y1', 'width', 'height')
+
+
+class GeometryTable:
+    """Columnar storage for one page of characters, lines or rectangles.
+
+    Each field is a float32 array; characters additionally keep their text in
+    a single string buffer (`offsets` delimits multi-character glyphs and is
+    None when every glyph is one character). This is a few bytes per item
+    instead of a dict of Python floats, and lets analysis work on whole
+    columns. `to_dicts()` (and iteration) give the legacy list-of-dicts view.
+    """
+
+    __slots__ = ('fields', 'columns', 'text', 'offsets')
+
+    def __init__(self, fields, columns, text=None, offsets=None):
+        self.fields = tuple(fields)
+        self.columns = columns
+        self.text = text
+        self.offsets = offsets
+
+    @classmethod
+    def from_records(cls, records, fields, with_text=False):
+        """Build a table from pdfplumber objects or legacy dicts (missing fields become 0)"""
+        records = list(records)
+        values = np.array([[r.get(f, 0) for f in fields] for r in records], dtype=np.float32)
+        values = values.reshape(len(records), len(fields))
+        columns = {f: np.ascontiguousarray(values[:, i]) for i, f in enumerate(fields)}
+
+        text = offsets = None
+        if with_text:
+            texts = [r['text'] for r in records]
+            text = ''.join(texts)
+            if len(text) != len(texts):
+                lengths = np.fromiter((len(t) for t in texts), dtype=np.int32, count=len(texts))
+                offsets = np.zeros(len(texts) + 1, dtype=np.int32)
+                np.cumsum(lengths, out=offsets[1:])
+        return cls(fields, columns, text, offsets)
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    @property
+    def nbytes(self):
+        size = sum(column.nbytes for column in self.columns.values())
+        if self.text is not None:
+            size += len(self.text.encode('utf-8'))
+        if self.offsets is not None:
+            size += self.offsets.nbytes
+        return size
+
+    def texts(self):
+        """Per-item text (characters only)"""
+        if self.text is None:
+            return []
+        if self.offsets is None:
+            return list(self.text)
+        return [self.text[self.offsets[i]:self.offsets[i + 1]] for i in range(len(self))]
+
+    def take(self, indices):
+        """Text of the items at `indices`, concatenated in that order"""
+        if self.offsets is None:
+            return ''.join(self.text[i] for i in indices)
+        return ''.join(self.text[self.offsets[i]:self.offsets[i + 1]] for i in indices)
+
+    def to_dicts(self):
+        """Legacy representation: one dict of Python floats per item"""
+        rows = zip(*(self.columns[f].tolist() for f in self.fields))
+        if self.text is None:
+            return [dict(zip(self.fields, row)) for row in rows]
+        return [{'text': text, **dict(zip(self.fields, row))}
+                for text, row in zip(self.texts(), rows)]
+
+
+def as_table(items, fields, with_text=False):
+    """Accept either a GeometryTable or a legacy list of dicts (e.g. loaded from JSON)"""
+    if isinstance(items, GeometryTable):
+        return items
+    return GeometryTable.from_records(items, fields, with_text)
+
+
+def _rotation(char):
+    """0 for upright glyphs, +1 for text rotated counter-clockwise (reads bottom to top), -1 clockwise"""
+    if char.get('upright', True):
+        return 0
+    return 1 if char['matrix'][1] > 0 else -1
+
+
+def char_table(chars):
+    chars = list(chars)
+    table = GeometryTable.from_records(chars, CHAR_FIELDS, with_text=True)
+    # Extra column used by reconstruct_lines; not part of the legacy dict format
+    table.columns['rotation'] = np.fromiter(
+        (_rotation(c) for c in chars), dtype=np.int8, count=len(chars)
+    )
+    return table
+
+
+def _line_direction(line):
+    """-1 for a segment running down to the right (its bounding box alone can't tell), else 1"""
+    pts = line.get('pts')
+    if not pts or len(pts) < 2:
+        return 1
+    (ax, a_top), (bx, b_top) = pts[0], pts[-1]
+    # pdfplumber points are (x, top): top grows down the page
+    return -1 if (bx - ax) * (b_top - a_top) > 0 else 1
+
+
+def line_table(lines):
+    lines = list(lines)
+    table = GeometryTable.from_records(lines, LINE_FIELDS)
+    # Extra column used by segment_endpoints; not part of the legacy dict format
+    table.columns['direction'] = np.fromiter(
+        (_line_direction(line) for line in lines), dtype=np.int8, count=len(lines)
+    )
+    return table
+
+
+def segment_endpoints(lines):
+    """(ax, ay, bx, by) endpoint arrays of a line table, restoring direction from the bounding boxes"""
+    x0, y0, x1, y1 = (lines[f] for f in ('x0', 'y0', 'x1', 'y1'))
+    direction = lines.columns.get('direction')
+    if direction is None:
+        return x0, y0, x1, y1
+    descending = direction < 0
+    return x0, np.where(descending, y1, y0), x1, np.where(descending, y0, y1)
+
+
+def rect_table(rects):
+    return GeometryTable.from_records(rects, RECT_FIELDS)
+
+
+def _reading_order(chars, y_tolerance=None, word_gap=0.3):
+    """Glyph indices in reading order, with per-gap flags: same line, and word break (spaced)"""
+    n = len(chars)
+
+    x0, y0, x1, y1, size = (chars[f] for f in ('x0', 'y0', 'x1', 'y1', 'size'))
+    rotation = chars.columns.get('rotation')
+    if rotation is None:
+        rotation = np.zeros(n, dtype=np.int8)
+    if y_tolerance is None:
+        y_tolerance = max(0.5, 0.2 * float(np.median(size)))
+
+    upright = rotation == 0
+    # Position across lines and along the reading direction (float64 for composite sort keys)
+    across = np.where(upright, y0, x0).astype(np.float64)
+    along = np.where(upright, x0, np.where(rotation > 0, y0, -y1)).astype(np.float64)
+    along_end = np.where(upright, x1, np.where(rotation > 0, y1, -y0)).astype(np.float64)
+
+    # Sort-and-split on the baseline: top line first, each rotation clustered separately
+    span = float(np.ptp(across)) + 1.0
+    by_baseline = np.argsort((rotation + 1) * (2 * span) - (across - across.min()))
+    sorted_across = across[by_baseline]
+    sorted_rotation = rotation[by_baseline]
+    starts = np.empty(n, dtype=bool)
+    starts[0] = True
+    starts[1:] = (np.abs(np.diff(sorted_across)) > y_tolerance) | (np.diff(sorted_rotation) != 0)
+    line_of = np.empty(n, dtype=np.int64)
+    line_of[by_baseline] = np.cumsum(starts) - 1
+
+    # Reading order inside each line
+    span = float(np.ptp(along)) + 1.0
+    glyphs = np.argsort(line_of * span + (along - along.min()))
+    glyph_line = line_of[glyphs]
+    same_line = glyph_line[1:] == glyph_line[:-1]
+    gaps = along[glyphs[1:]] - along_end[glyphs[:-1]]
+    spaced = same_line & (gaps > word_gap * size[glyphs[:-1]])
+
+    return glyphs, same_line, spaced, rotation
+
+
+def reconstruct_lines(chars, y_tolerance=None, word_gap=0.3, min_chars=1):
+    """Rebuild text lines from glyph geometry in a few vectorized passes.
+
+    Glyphs are sorted by baseline (x position for vertical text) and split
+    into lines wherever consecutive baselines differ by more than
+    `y_tolerance` (default: 20% of the median glyph size), which absorbs
+    baseline jitter. Each line is ordered along its reading direction and a
+    space is inserted where the gap to the previous glyph exceeds `word_gap`
+    times its size. Returns dicts with 'orientation' ('horizontal' or
+    'vertical'), 'y_coordinate', 'x_coordinate', 'text' and 'count' (glyphs).
+    """
+    n = len(chars)
+    if not n:
+        return []
+
+    x0, y0 = chars['x0'], chars['y0']
+    glyphs, same_line, spaced, rotation = _reading_order(chars, y_tolerance, word_gap)
+    texts = _join_lines(chars, glyphs, spaced, same_line)
+
+    line_starts = np.flatnonzero(np.concatenate(([True], ~same_line)))
+    counts = np.diff(np.append(line_starts, n))
+    line_rotation = rotation[glyphs[line_starts]]
+    mean_y = np.add.reduceat(y0[glyphs].astype(np.float64), line_starts) / counts
+    min_y = np.minimum.reduceat(y0[glyphs], line_starts)
+    min_x = np.minimum.reduceat(x0[glyphs], line_starts)
+
+    lines = []
+    for i, text in enumerate(texts):
+        if counts[i] < min_chars:
+            continue
+        vertical = bool(line_rotation[i])
+        lines.append({
+            'orientation': 'vertical' if vertical else 'horizontal',
+            'y_coordinate': int(round(float(min_y[i] if vertical else mean_y[i]))),
+            'x_coordinate': int(round(float(min_x[i]))),
+            'text': text,
+            'count': int(counts[i])
+        })
+    return lines
+
+
+def reconstruct_words(chars, y_tolerance=None, word_gap=0.3):
+    """Words (runs of glyphs on one line, split at gaps and whitespace glyphs) with their boxes.
+
+    Returns (texts, boxes): boxes is an (n, 4) float32 array of x0, y0, x1, y1.
+    """
+    n = len(chars)
+    if not n:
+        return [], np.zeros((0, 4), dtype=np.float32)
+
+    glyphs, same_line, spaced, _ = _reading_order(chars, y_tolerance, word_gap)
+    if chars.offsets is None:
+        codes = np.frombuffer(chars.text.encode('utf-32-le'), dtype='<u4')
+        space = np.isin(codes, (9, 10, 13, 32, 160))[glyphs]
+    else:
+        space = np.array([t.isspace() for t in chars.texts()], dtype=bool)[glyphs]
+    joined = same_line & ~spaced & ~space[:-1] & ~space[1:]
+    texts = _join_lines(chars, glyphs, np.zeros(n - 1, dtype=bool), joined)
+
+    starts = np.flatnonzero(np.concatenate(([True], ~joined)))
+    boxes = np.column_stack([
+        np.minimum.reduceat(chars['x0'][glyphs], starts),
+        np.minimum.reduceat(chars['y0'][glyphs], starts),
+        np.maximum.reduceat(chars['x1'][glyphs], starts),
+        np.maximum.reduceat(chars['y1'][glyphs], starts),
+    ])
+    keep = np.fromiter((not text.isspace() and bool(text) for text in texts), dtype=bool, count=len(texts))
+    return [text for text, kept in zip(texts, keep) if kept], boxes[keep]
+
+
+def _join_lines(chars, glyphs, spaced, same_line):
+    """Concatenate glyph text in `glyphs` order, inserting spaces; one string per line.
+
+    Lines are cut at their first glyphs rather than by splitting joined text,
+    so a glyph that is itself a newline can't shift later lines.
+    """
+    bounds = np.append(np.flatnonzero(np.concatenate(([True], ~same_line))), len(glyphs)).tolist()
+    if chars.offsets is None:
+        # One code point per glyph: reorder and splice in spaces as UTF-32 arrays
+        codes = np.frombuffer(chars.text.encode('utf-32-le'), dtype='<u4')[glyphs]
+        out = np.empty(2 * len(codes) - 1, dtype='<u4')
+        out[0::2] = codes
+        out[1::2] = ord(' ')
+        keep = np.ones(len(out), dtype=bool)
+        keep[1::2] = same_line & spaced
+        # Where each line's first glyph lands in the kept code points
+        cuts = (np.cumsum(keep) - 1)[0::2][bounds[:-1]].tolist() + [int(keep.sum())]
+        text = out[keep].tobytes().decode('utf-32-le')
+        return [text[start:end] for start, end in zip(cuts[:-1], cuts[1:])]
+
+    pieces = np.empty(2 * len(glyphs) - 1, dtype=object)
+    pieces[0::2] = np.array(chars.texts(), dtype=object)[glyphs]
+    pieces[1::2] = np.where(spaced, ' ', '')
+    pieces = pieces.tolist()
+    return [''.join(pieces[2 * start:2 * end - 1]) for start, end in zip(bounds[:-1], bounds[1:])]
@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import atexit
+import queue
+import sqlite3
+import threading
+import traceback
+import multiprocessing
+from contextlib import contextmanager
+
+import metrics
+
+# Job states stored in the `jobs` table
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+POLL_INTERVAL = 0.5  # seconds an idle worker waits before checking the queue again
+# A running job's worker renews its lease (the job's updated_at) every HEARTBEAT_INTERVAL seconds;
+# a RUNNING job not renewed for LEASE_SECONDS belonged to a worker that died and is queued again
+HEARTBEAT_INTERVAL = 10
+LEASE_SECONDS = 60
+WORKER_CHECK_INTERVAL = 5  # seconds between the web process's checks for dead workers
+
+# Imported by warm workers before their first job (the web tier itself never loads them)
+WARM_MODULES = ('pipeline', 'openpyxl')
+
+
+def connect(db_path):
+    """Open the queue database in autocommit mode so claims can use explicit transactions"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            pdf_path TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            worker_pid INTEGER,
+            error TEXT,
+            result TEXT,
+            options TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)')
+    # Databases created before per-job options existed
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+    if 'options' not in columns:
+        conn.execute('ALTER TABLE jobs ADD COLUMN options TEXT')
+    return conn
+
+
+def claim_job(conn):
+    """Atomically move the oldest queued job to RUNNING and return it (or None).
+
+    Jobs whose lease expired are put back on the queue first, in the same
+    transaction, so a job left behind by a dead worker is picked up by the
+    next worker that polls.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        now = time.time()
+        conn.execute(
+            'UPDATE jobs SET status = ?, worker_pid = NULL, updated_at = ? WHERE status = ? AND updated_at < ?',
+            (QUEUED, now, RUNNING, now - LEASE_SECONDS)
+        )
+        row = conn.execute(
+            'SELECT id, task_id, filename, pdf_path, options FROM jobs '
+            'WHERE status = ? ORDER BY id LIMIT 1',
+            (QUEUED,)
+        ).fetchone()
+        if row is None:
+            conn.execute('COMMIT')
+            return None
+        conn.execute(
+            'UPDATE jobs SET status = ?, worker_pid = ?, updated_at = ? WHERE id = ?',
+            (RUNNING, os.getpid(), now, row[0])
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return {'id': row[0], 'task_id': row[1], 'filename': row[2], 'pdf_path': row[3],
+            'options': json.loads(row[4]) if row[4] else {}}
+
+
+def finish_job(conn, job_id, status, result=None, error=None):
+    """Record a claimed job's outcome; False if this process no longer holds the job (lease expired)"""
+    cursor = conn.execute(
+        'UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? '
+        'WHERE id = ? AND status = ? AND worker_pid = ?',
+        (status, result, error, time.time(), job_id, RUNNING, os.getpid())
+    )
+    return cursor.rowcount == 1
+
+
+@contextmanager
+def heartbeat(db_path, job_id, interval=HEARTBEAT_INTERVAL):
+    """Renew a running job's lease from a background thread while the block runs"""
+    stop = threading.Event()
+
+    def renew():
+        conn = connect(db_path)
+        try:
+            while not stop.wait(interval):
+                try:
+                    conn.execute('UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?',
+                                 (time.time(), job_id, RUNNING))
+                except sqlite3.Error as e:
+                    print(f"Could not renew the lease on job {job_id}: {e}")
+        finally:
+            conn.close()
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def requeue_orphaned_jobs(conn):
+    """Put RUNNING jobs whose worker process no longer exists back on the queue"""
+    rows = conn.execute('SELECT id, worker_pid FROM jobs WHERE status = ?', (RUNNING,)).fetchall()
+    orphaned = [job_id for job_id, pid in rows if not _pid_alive(pid)]
+    for job_id in orphaned:
+        conn.execute(
+            'UPDATE jobs SET status = ?, worker_pid = NULL, updated_at = ? WHERE id = ?',
+            (QUEUED, time.time(), job_id)
+        )
+    return len(orphaned)
+
+
+def process_pdf_job(pdf_path, filename, task_id, output_dir, job_id, progress=None, **pipeline_options):
+    """Run extract -> analyze -> structure for one PDF inside its own workspace.
+
+    `pipeline_options` are passed through to pipeline.process_pdf. Returns the
+    workbook path relative to `output_dir`.
+    """
+    from pipeline import process_pdf
+    from workspace import file_digest, file_workspace, result_prefix
+    from output_writers import output_path
+
+    digest = file_digest(pdf_path)
+    workspace_dir = file_workspace(output_dir, task_id, job_id, digest)
+    excel_path = output_path(
+        workspace_dir, f"PID_Extract_{filename.replace('.pdf', '')}",
+        pipeline_options.get('output_format', 'xlsx')
+    )
+    process_pdf(
+        pdf_path, excel_path,
+        name_prefix=result_prefix(digest),
+        digest=digest,
+        progress=progress,
+        **pipeline_options
+    )
+    return os.path.relpath(excel_path, output_dir)
+
+
+def run_job(conn, job, output_dir, emit, pipeline_options=None, profile_reports=False):
+    """Process one claimed job, reporting progress and the outcome through `emit`.
+
+    Options stored with the job override the worker-wide `pipeline_options`.
+    The done/error event carries the job's metrics.JobProfile summary under
+    'metrics'; with `profile_reports` it is also written to profile.json in
+    the job's workspace.
+    """
+    task_id = job['task_id']
+    filename = job['filename']
+
+    def progress(page, total_pages):
+        emit({'type': 'page', 'task_id': task_id, 'filename': filename,
+              'page': page, 'total_pages': total_pages})
+
+    print(f"Processing: {filename}")
+    emit({'type': 'start', 'task_id': task_id, 'filename': filename})
+    # Cleared when the lease expired and the job went to another worker, which then owns its upload
+    owned = True
+    try:
+        with metrics.recording() as profile:
+            excel_path = process_pdf_job(
+                job['pdf_path'], filename, task_id, output_dir, job['id'],
+                progress=progress, **{**(pipeline_options or {}), **job['options']}
+            )
+        if profile_reports:
+            try:
+                metrics.write_report(
+                    os.path.join(output_dir, os.path.dirname(excel_path), 'profile.json'), profile,
+                    filename=filename, task_id=task_id, options=job['options']
+                )
+            except OSError as e:
+                print(f"Could not write profile report for {filename}: {e}")
+        owned = finish_job(conn, job['id'], DONE, result=excel_path)
+        if owned:
+            emit({'type': 'done', 'task_id': task_id, 'filename': filename,
+                  'download': f"/download/{excel_path.replace(os.sep, '/')}",
+                  'metrics': profile.to_dict()})
+            print(f"Success: {filename}")
+        else:
+            print(f"Lease on {filename} expired; the job was handed to another worker")
+    except Exception as e:
+        error_msg = f"Error processing {filename}: {str(e)}"
+        print(error_msg)
+        print(traceback.format_exc())
+        owned = finish_job(conn, job['id'], FAILED, error=error_msg)
+        if owned:
+            emit({'type': 'error', 'task_id': task_id, 'filename': filename, 'error': error_msg,
+                  'metrics': profile.to_dict()})
+    finally:
+        # Clean up the spooled upload (and its task directory once empty)
+        if owned and os.path.exists(job['pdf_path']):
+            try:
+                os.remove(job['pdf_path'])
+                os.rmdir(os.path.dirname(job['pdf_path']))
+            except OSError:
+                pass
+
+
+def warm_up():
+    """Import the pipeline and its heavy dependencies (pandas, pdfplumber, openpyxl) ahead of
+    the first job; returns the seconds it took"""
+    import importlib
+    started = time.perf_counter()
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+    return time.perf_counter() - started
+
+
+def worker_loop(db_path, output_dir, events, stop_event, pipeline_options=None, profile_reports=False,
+                warm=False):
+    """Body of a worker process: drain the queue until asked to stop"""
+    if warm:
+        print(f"Worker {os.getpid()} warmed up in {warm_up():.2f}s")
+    from pdf_data_extractor import shutdown_page_pools
+
+    conn = connect(db_path)
+    try:
+        while not stop_event.is_set():
+            job = claim_job(conn)
+            if job is None:
+                stop_event.wait(POLL_INTERVAL)
+                continue
+            with heartbeat(db_path, job['id']):
+                run_job(conn, job, output_dir, events.put, pipeline_options, profile_reports)
+    finally:
+        shutdown_page_pools()
+        conn.close()
+
+
+class JobQueue:
+    """File-backed job queue drained by a pool of worker processes.
+
+    Jobs live in a SQLite table so they survive a crashed worker: a worker
+    process that exits is replaced and the job it was running requeued, and
+    any job whose lease lapses (LEASE_SECONDS without a heartbeat) goes back
+    on the queue when the next job is claimed. Progress and results flow back to the web process over a multiprocessing queue and are
+    handed to `on_event`. With `num_workers=0` jobs run on a background thread
+    inside the current process (useful where forking is not allowed).
+    `pipeline_options` (e.g. artifacts, page_workers) are passed to
+    pipeline.process_pdf for every job; `profile_reports` writes each job's
+    stage timings to profile.json in its workspace.
+
+    With `warm=True` (for long-running hosts) workers import the pipeline
+    before polling, so the first job doesn't pay for loading pandas,
+    pdfplumber and openpyxl. Where the platform has a forkserver, workers are
+    forked from it after it has imported those modules once: starting a
+    worker costs a fork instead of a fresh interpreter, and the imported code
+    is shared between workers. (The forkserver imports them relative to the
+    working directory; started elsewhere, each worker imports them itself.)
+    """
+
+    def __init__(self, db_path, output_dir, num_workers=2, on_event=None, pipeline_options=None,
+                 profile_reports=False, warm=False):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.pipeline_options = dict(pipeline_options or {})
+        self.profile_reports = profile_reports
+        self.warm = warm
+        self.num_workers = num_workers
+        self.on_event = on_event or (lambda event: None)
+        if warm and 'forkserver' in multiprocessing.get_all_start_methods():
+            self._ctx = multiprocessing.get_context('forkserver')
+            self._ctx.set_forkserver_preload(list(WARM_MODULES))
+        else:
+            self._ctx = multiprocessing.get_context('spawn')
+        self._events = None
+        self._stop = None
+        self._workers = []
+        self._listener = None
+        self._lock = threading.Lock()
+
+        conn = connect(db_path)
+        requeued = requeue_orphaned_jobs(conn)
+        conn.close()
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s)")
+
+    def enqueue(self, task_id, pdf_path, filename, options=None):
+        """Queue a PDF; `options` are per-job pipeline.process_pdf arguments (JSON-serializable)"""
+        conn = connect(self.db_path)
+        try:
+            now = time.time()
+            cursor = conn.execute(
+                'INSERT INTO jobs (task_id, filename, pdf_path, status, options, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (task_id, filename, pdf_path, QUEUED, json.dumps(options or {}), now, now)
+            )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def pending(self):
+        conn = connect(self.db_path)
+        try:
+            return conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def start(self):
+        """Start the worker pool and the event listener (idempotent)"""
+        with self._lock:
+            if self._listener is not None:
+                return
+            if self.num_workers > 0:
+                self._events = self._ctx.Queue()
+                self._stop = self._ctx.Event()
+                for _ in range(self.num_workers):
+                    self._start_worker()
+            else:
+                self._events = queue.Queue()
+                self._stop = threading.Event()
+                worker = threading.Thread(
+                    target=worker_loop,
+                    args=(self.db_path, self.output_dir, self._events, self._stop,
+                          self.pipeline_options, self.profile_reports, self.warm),
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+            atexit.register(self.stop)
+            print(f"Job queue started with {len(self._workers)} worker(s)")
+
+    def _start_worker(self):
+        # Not daemonic: workers may start their own page-extraction pools
+        worker = self._ctx.Process(
+            target=worker_loop,
+            args=(self.db_path, self.output_dir, self._events, self._stop,
+                  self.pipeline_options, self.profile_reports, self.warm)
+        )
+        worker.start()
+        self._workers.append(worker)
+
+    def _replace_dead_workers(self):
+        """Start a new worker for each one that exited and requeue the jobs they were running"""
+        with self._lock:
+            if self._stop.is_set():
+                return
+            dead = [worker for worker in self._workers
+                    if isinstance(worker, multiprocessing.process.BaseProcess) and not worker.is_alive()]
+            for worker in dead:
+                self._workers.remove(worker)
+                self._start_worker()
+        if not dead:
+            return
+        conn = connect(self.db_path)
+        try:
+            requeued = requeue_orphaned_jobs(conn)
+        finally:
+            conn.close()
+        print(f"Replaced {len(dead)} exited worker(s); requeued {requeued} interrupted job(s)")
+
+    def stop(self, timeout=5):
+        """Ask workers to finish; processes still busy after `timeout` are terminated
+        and their jobs are requeued on the next start."""
+        with self._lock:
+            if self._stop is None:
+                return
+            self._stop.set()
+            for worker in self._workers:
+                worker.join(timeout)
+                if isinstance(worker, multiprocessing.process.BaseProcess) and worker.is_alive():
+                    worker.terminate()
+            self._workers = []
+
+    def _listen(self):
+        checked = time.monotonic()
+        while True:
+            if time.monotonic() - checked > WORKER_CHECK_INTERVAL:
+                self._replace_dead_workers()
+                checked = time.monotonic()
+            try:
+                event = self._events.get(timeout=1)
+            except queue.Empty:
+                if self._stop.is_set() and not any(w.is_alive() for w in self._workers):
+                    return
+                continue
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error handling job event {event.get('type')}: {e}")
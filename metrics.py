@@ -0,0 +1,299 @@
+"""Pipeline instrumentation: per-job stage timings and counts, and a Prometheus-text registry.
+
+Work on a file is recorded into a JobProfile while `recording()` is active on
+the current thread. Code along the pipeline marks its stages with
+`with stage('extract.text'):` and reports pages and cache lookups; with no
+active recording these calls only check a thread-local, so they stay in
+place in every code path. Queue workers send the finished profile back with
+the job's done/error event, and the web process folds it into `registry`,
+which /metrics renders in the Prometheus text format.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Geometry and annotation counts reported per page
+OBJECT_KINDS = (('characters', 'chars'), ('lines', 'lines'), ('rectangles', 'rects'),
+                ('annotations', 'annotations'))
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class JobProfile:
+    """Timings and counts gathered while one file goes through the pipeline.
+
+    `stages` sums the seconds spent in each named stage (stages nest by
+    name: 'extract' includes 'extract.text'), `pages` holds one duration per
+    page extracted in this process (pages from parallel shards are counted in
+    `parsed_pages` without one), `objects` counts the geometry and
+    annotations read, and `cache` the hits and misses per cache layer.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.stages = {}
+        self.pages = []
+        self.parsed_pages = 0
+        self.cached_pages = 0
+        self.objects = {}
+        self.cache = {}
+        self.peak_rss_mb = None
+        self.rss_mb = None
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_page(self, seconds, page_data):
+        self.parsed_pages += 1
+        if seconds is not None:
+            self.pages.append(round(seconds, 6))
+        for field, kind in OBJECT_KINDS:
+            self.objects[kind] = self.objects.get(kind, 0) + len(page_data.get(field) or ())
+
+    def add_cache_lookup(self, layer, hit):
+        counts = self.cache.setdefault(layer, {'hit': 0, 'miss': 0})
+        counts['hit' if hit else 'miss'] += 1
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        self.rss_mb = rss_mb()
+        self.peak_rss_mb = peak_rss_mb()
+
+    def to_dict(self):
+        """JSON-serializable summary, as sent with job events and written to profile reports"""
+        return {
+            'seconds': round(self.seconds or 0.0, 6),
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'pages': self.pages,
+            'parsed_pages': self.parsed_pages,
+            'cached_pages': self.cached_pages,
+            'objects': self.objects,
+            'cache': self.cache,
+            'rss_mb': self.rss_mb,
+            'peak_rss_mb': self.peak_rss_mb
+        }
+
+
+_local = threading.local()
+
+
+def current():
+    """The JobProfile being recorded on this thread, or None"""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def recording():
+    """Record the pipeline work done inside the block on this thread; yields the JobProfile"""
+    profile = JobProfile()
+    previous = current()
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+        profile.finish()
+
+
+@contextmanager
+def stage(name):
+    """Add the time spent in the block to stage `name` of the active recording"""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, time.perf_counter() - start)
+
+
+def page_extracted(seconds, page_data):
+    """Count one extracted page and its objects; `seconds` is None when it was timed elsewhere"""
+    profile = current()
+    if profile is not None:
+        profile.add_page(seconds, page_data)
+
+
+def pages_from_cache(count):
+    profile = current()
+    if profile is not None:
+        profile.cached_pages += count
+
+
+def cache_lookup(layer, hit):
+    """Count a hit or miss of one cache layer ('results', 'workbook', 'page')"""
+    profile = current()
+    if profile is not None:
+        profile.add_cache_lookup(layer, hit)
+
+
+def write_report(path, profile, **context):
+    """Write a per-job profile report: the JobProfile summary plus `context` (file name, task, ...)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({**context, **profile.to_dict()}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Counters, gauges and histograms of one process, rendered in the Prometheus text format.
+
+    Metrics are declared once with `describe` and updated by name with label
+    keyword arguments; an update is a lock and a dict lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # name -> (type, help, buckets)
+        self._values = {}  # name -> {labels: value, or [bucket counts, sum, count] for histograms}
+
+    def describe(self, name, kind, help_text, buckets=DURATION_BUCKETS):
+        if kind not in ('counter', 'gauge', 'histogram'):
+            raise ValueError(f"Unknown metric type: {kind}")
+        with self._lock:
+            self._metrics[name] = (kind, help_text, tuple(buckets))
+            self._values.setdefault(name, {})
+
+    def _series(self, name, labels):
+        if name not in self._metrics:
+            raise KeyError(f"Undeclared metric: {name}")
+        return self._values[name], tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series, key = self._series(name, labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            series, key = self._series(name, labels)
+            series[key] = value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            series, key = self._series(name, labels)
+            buckets = self._metrics[name][2]
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def value(self, name, **labels):
+        """Current value of a counter or gauge series (None if never set)"""
+        with self._lock:
+            series, key = self._series(name, labels)
+            return series.get(key)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in self._metrics.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in self._values[name].items():
+                    if kind != 'histogram':
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                        continue
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets, counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_value(float(bound)))])} "
+                                     f"{cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def pipeline_registry():
+    """Registry with the pipeline metrics declared"""
+    registry = Registry()
+    registry.describe('pdf_extractor_jobs_total', 'counter', 'Files processed, by outcome')
+    registry.describe('pdf_extractor_job_seconds', 'histogram', 'Wall time per file')
+    registry.describe('pdf_extractor_stage_seconds', 'histogram', 'Time per file spent in each pipeline stage')
+    registry.describe('pdf_extractor_page_seconds', 'histogram', 'Extraction time per page')
+    registry.describe('pdf_extractor_pages_total', 'counter', 'Pages handled, by source (parsed or cache)')
+    registry.describe('pdf_extractor_objects_total', 'counter', 'Characters, lines, rects and annotations extracted')
+    registry.describe('pdf_extractor_cache_lookups_total', 'counter', 'Result cache lookups, by layer and result')
+    registry.describe('pdf_extractor_worker_rss_megabytes', 'gauge', 'Worker RSS after its latest file')
+    registry.describe('pdf_extractor_worker_peak_rss_megabytes', 'gauge', 'Highest worker peak RSS seen')
+    registry.describe('pdf_extractor_uploads_total', 'counter', 'Files accepted for processing')
+    registry.describe('pdf_extractor_queue_pending_jobs', 'gauge', 'Jobs queued or running')
+    registry.describe('pdf_extractor_process_rss_megabytes', 'gauge', 'RSS of the process serving /metrics')
+    return registry
+
+
+def record_job(registry, profile, status):
+    """Fold a JobProfile summary (JobProfile.to_dict()) into a pipeline_registry()"""
+    registry.inc('pdf_extractor_jobs_total', status=status)
+    registry.observe('pdf_extractor_job_seconds', profile['seconds'])
+    for name, seconds in profile['stages'].items():
+        registry.observe('pdf_extractor_stage_seconds', seconds, stage=name)
+    for seconds in profile['pages']:
+        registry.observe('pdf_extractor_page_seconds', seconds)
+    registry.inc('pdf_extractor_pages_total', profile['parsed_pages'], source='parsed')
+    registry.inc('pdf_extractor_pages_total', profile['cached_pages'], source='cache')
+    for kind, count in profile['objects'].items():
+        registry.inc('pdf_extractor_objects_total', count, kind=kind)
+    for layer, counts in profile['cache'].items():
+        for result, count in counts.items():
+            registry.inc('pdf_extractor_cache_lookups_total', count, layer=layer, result=result)
+    if profile.get('rss_mb') is not None:
+        registry.set('pdf_extractor_worker_rss_megabytes', profile['rss_mb'])
+    if profile.get('peak_rss_mb') is not None:
+        peak = registry.value('pdf_extractor_worker_peak_rss_megabytes') or 0
+        registry.set('pdf_extractor_worker_peak_rss_megabytes', max(peak, profile['peak_rss_mb']))
+
+
+# Metrics of this process, served by app.py at /metrics
+registry = pipeline_registry()
@@ -0,0 +1,164 @@
+import io
+import importlib.util
+import csv
+import math
+import zipfile
+from pathlib import Path
+from functools import lru_cache
+
+# Output format -> file extension. 'csv' and 'parquet' write one file per sheet inside a zip.
+FORMATS = {
+    'xlsx': '.xlsx',
+    'csv': '.csv.zip',
+    'parquet': '.parquet.zip',
+}
+
+
+@lru_cache(maxsize=None)
+def _header_style():
+    """(font, border, alignment) of header cells: the same look as pandas' to_excel"""
+    # openpyxl is only imported once a workbook is actually written
+    from openpyxl.styles import Alignment, Border, Font, Side
+    thin = Side(style='thin')
+    return (Font(bold=True), Border(left=thin, right=thin, top=thin, bottom=thin),
+            Alignment(horizontal='center', vertical='top'))
+
+
+def available_formats():
+    """Formats whose optional dependencies are installed"""
+    return [fmt for fmt in FORMATS
+            if fmt != 'parquet' or importlib.util.find_spec('pyarrow') is not None]
+
+
+def output_path(output_dir, stem, fmt='xlsx'):
+    """File name for `stem` written in `fmt`"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return Path(output_dir) / f"{stem}{FORMATS[fmt]}"
+
+
+def records_sheet(name, records):
+    """Sheet from a list of dicts, with columns in first-seen order (like pd.DataFrame(records))"""
+    columns = {}
+    for record in records:
+        for key in record:
+            columns.setdefault(key, None)
+    columns = list(columns)
+    return name, columns, (tuple(record.get(c) for c in columns) for record in records)
+
+
+def column_sheet(name, column, values):
+    """Single-column sheet"""
+    return name, [column], ((value,) for value in values)
+
+
+def frame_sheet(name, df):
+    """Sheet from a DataFrame (index dropped)"""
+    return name, list(df.columns), df.itertuples(index=False, name=None)
+
+
+def _cell_value(value):
+    """Scalars pass through; NaN becomes empty and containers are rendered as text, as pandas does"""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (list, tuple, dict, set)):
+        return str(value)
+    return value
+
+
+def _write_xlsx(sheets, path):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    header_font, header_border, header_alignment = _header_style()
+    # Write-only workbook: rows are streamed to the file instead of held as cell objects
+    workbook = Workbook(write_only=True)
+    for name, columns, rows in sheets:
+        worksheet = workbook.create_sheet(name)
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(worksheet, value=column)
+            cell.font = header_font
+            cell.border = header_border
+            cell.alignment = header_alignment
+            header.append(cell)
+        worksheet.append(header)
+        for row in rows:
+            worksheet.append([_cell_value(value) for value in row])
+    workbook.save(path)
+
+
+def _write_csv(sheets, path):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, columns, rows in sheets:
+            with archive.open(f"{name}.csv", 'w') as member:
+                text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+                writer = csv.writer(text)
+                writer.writerow(columns)
+                writer.writerows([_cell_value(value) for value in row] for row in rows)
+                text.flush()
+                text.detach()
+
+
+def _write_parquet(sheets, path):
+    try:
+        import pyarrow  # noqa: F401  (pandas' parquet engine)
+    except ImportError:
+        raise ValueError("Parquet output requires pyarrow (pip install pyarrow)")
+    import pandas as pd
+
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, columns, rows in sheets:
+            data = {column: [] for column in columns}
+            for row in rows:
+                for column, value in zip(columns, row):
+                    data[column].append(_cell_value(value))
+            for column, values in data.items():
+                # Parquet columns are typed; fall back to text where a column mixes types
+                if len({type(v) for v in values if v is not None}) > 1:
+                    data[column] = [None if v is None else str(v) for v in values]
+            buffer = io.BytesIO()
+            pd.DataFrame(data, columns=columns).to_parquet(buffer, index=False)
+            archive.writestr(f"{name}.parquet", buffer.getvalue())
+
+
+WRITERS = {
+    'xlsx': _write_xlsx,
+    'csv': _write_csv,
+    'parquet': _write_parquet,
+}
+
+
+def read_sheet(path, name):
+    """(columns, rows) of one sheet from a file written by write_sheets, in any format"""
+    path = str(path)
+    if path.endswith(FORMATS['csv']):
+        with zipfile.ZipFile(path) as archive, archive.open(f"{name}.csv") as member:
+            rows = list(csv.reader(io.TextIOWrapper(member, encoding='utf-8', newline='')))
+        return (rows[0], rows[1:]) if rows else ([], [])
+    if path.endswith(FORMATS['parquet']):
+        import pandas as pd
+        with zipfile.ZipFile(path) as archive:
+            df = pd.read_parquet(io.BytesIO(archive.read(f"{name}.parquet")))
+        return list(df.columns), list(df.itertuples(index=False, name=None))
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = list(workbook[name].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+    return (list(rows[0]), rows[1:]) if rows else ([], [])
+
+
+def write_sheets(sheets, path, fmt='xlsx'):
+    """Write (name, columns, rows) sheets to `path` in `fmt`; rows may be any iterable of sequences"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    path = Path(path)
+    if path.exists():
+        path.unlink()  # Overwrite if exists
+    WRITERS[fmt](sheets, path)
+    return path
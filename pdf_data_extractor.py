@@ -1,12 +1,28 @@
 import pdfplumber
-import PyPDF2
-import pandas as pd
 import re
 import json
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from pdfminer.pdftypes import resolve1, PDFObjRef, PDFStream
+from pdfminer.psparser import PSLiteral
+from pdfminer.utils import decode_text
+from output_writers import records_sheet, column_sheet, write_sheets, output_path
+from binary_results import write_results, RESULTS_FILE
+from metrics import stage, page_extracted, pages_from_cache, cache_lookup
+# Profile tables live in a module of their own so the web tier can list them without pdfplumber
+from extraction_profiles import LAYERS, DEFAULT_PROFILE, resolve_profile
+from geometry import (
+    GeometryTable, CHAR_FIELDS, as_table, char_table, line_table, rect_table, reconstruct_lines
+)
 
 def convert_to_serializable(obj):
-    """Convert PyPDF2 objects to JSON-serializable types"""
+    """Convert PyPDF2 objects and columnar geometry to JSON-serializable types"""
+    if isinstance(obj, GeometryTable):
+        return obj.to_dicts()
     if hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes)):
         if isinstance(obj, dict):
             return {k: convert_to_serializable(v) for k, v in obj.items()}
@@ -22,7 +38,360 @@ def convert_to_serializable(obj):
         # Convert any other type to string (includes FloatObject, etc.)
         return str(obj)
 
-def extract_pdf_data(pdf_path):
+# Bump whenever extract_pdf_data output changes, so cached results are invalidated
+EXTRACTOR_VERSION = 2
+
+# Output metadata key -> PDF document info key
+METADATA_FIELDS = {
+    'title': 'Title',
+    'author': 'Author',
+    'subject': 'Subject',
+    'creator': 'Creator',
+    'producer': 'Producer',
+    'creation_date': 'CreationDate',
+    'modification_date': 'ModDate'
+}
+
+def _pdf_string(value):
+    """Decode a raw PDF string/name the way PyPDF2's str() renders it"""
+    value = resolve1(value)
+    if value is None:
+        return ''
+    if isinstance(value, PSLiteral):
+        return '/' + str(value.name)
+    if isinstance(value, bytes):
+        return decode_text(value)
+    return str(value)
+
+def extract_metadata(pdf):
+    """Document info from an open pdfplumber PDF (no second parse needed)"""
+    if not pdf.metadata:
+        return {}
+    return {key: str(pdf.metadata.get(info_key, ''))
+            for key, info_key in METADATA_FIELDS.items()}
+
+def extract_annotations(page, page_number):
+    """Annotations from the pdfminer page object pdfplumber has already parsed"""
+    annotations = []
+    for annot in resolve1(page.page_obj.annots) or []:
+        try:
+            annotation = resolve1(annot)
+            if annotation:
+                # Convert rect to list of floats (raw PDF coordinates)
+                rect = resolve1(annotation.get('Rect')) or []
+                rect_list = [float(resolve1(x)) for x in rect]
+
+                annotations.append({
+                    'page': page_number,
+                    'type': _pdf_string(annotation.get('Subtype')),
+                    'content': _pdf_string(annotation.get('Contents')),
+                    'rect': rect_list,
+                    'name': _pdf_string(annotation.get('NM'))
+                })
+        except Exception as e:
+            print(f"Error extracting annotation on page {page_number}: {e}")
+            continue
+    return annotations
+
+# Keys that point back up the page tree or from an annotation to its page, not page content
+_FINGERPRINT_SKIP_KEYS = {'Parent', 'P', 'StructParents', 'StructParent'}
+
+def page_fingerprint(page_obj):
+    """SHA-256 over a page's content streams, resources, annotations and page boxes.
+
+    Indirect objects are hashed by value (numbered in visit order), so an
+    unchanged sheet keeps its fingerprint when a package is re-issued with
+    renumbered objects or reordered pages. References to other pages (e.g.
+    link destinations) are not followed. Call it on a fresh parse, before the
+    page's streams are decoded.
+    """
+    digest = hashlib.sha256()
+    seen = {}
+
+    def feed(obj, root=False):
+        if isinstance(obj, PDFObjRef):
+            if obj.objid in seen:
+                digest.update(b'R%d;' % seen[obj.objid])
+                return
+            seen[obj.objid] = len(seen)
+            obj = obj.resolve()
+        if isinstance(obj, PDFStream):
+            data = obj.rawdata if obj.rawdata is not None else obj.get_data()
+            digest.update(b'S')
+            feed(obj.attrs)
+            digest.update(b'%d:' % len(data))
+            digest.update(data)
+        elif isinstance(obj, dict):
+            page_type = obj.get('Type')
+            if not root and isinstance(page_type, PSLiteral) and page_type.name == 'Page':
+                digest.update(b'PAGE;')
+                return
+            digest.update(b'D{')
+            for key in sorted(obj):
+                if key not in _FINGERPRINT_SKIP_KEYS:
+                    digest.update(f'{key}='.encode('utf-8'))
+                    feed(obj[key])
+            digest.update(b'}')
+        elif isinstance(obj, (list, tuple)):
+            digest.update(b'L[')
+            for item in obj:
+                feed(item)
+            digest.update(b']')
+        else:
+            digest.update(f'{type(obj).__name__}:{obj!r};'.encode('utf-8'))
+
+    feed(page_obj.attrs, root=True)
+    return digest.hexdigest()
+
+def renumber_page(page_data, page_number):
+    """Page output cached from another position in a package, relabelled as `page_number`"""
+    if page_data['page'] == page_number:
+        return page_data
+    return {**page_data, 'page': page_number,
+            'annotations': [{**annot, 'page': page_number} for annot in page_data['annotations']]}
+
+def extract_page(page, page_number, layers=LAYERS):
+    """Extract the requested layers from a single pdfplumber page.
+
+    Layers that are not requested are never computed, so e.g. a page without
+    'text', 'tables', 'chars', 'lines' or 'rects' never has its content stream
+    parsed at all.
+    """
+    page_data = {'page': page_number, 'text': None, 'tables': [],
+                 'characters': [], 'lines': [], 'rectangles': [], 'annotations': []}
+
+    if 'annotations' in layers:
+        with stage('extract.annotations'):
+            page_data['annotations'] = extract_annotations(page, page_number)
+
+    # Extract text
+    if 'text' in layers:
+        with stage('extract.text'):
+            page_data['text'] = page.extract_text()
+
+    # Extract tables
+    if 'tables' in layers:
+        with stage('extract.tables'):
+            page_data['tables'] = page.extract_tables() or []
+
+    # Extract text with coordinates (useful for piping diagrams), stored column-wise
+    if 'chars' in layers:
+        with stage('extract.chars'):
+            page_data['characters'] = char_table(page.chars)
+
+    # Extract lines (important for piping diagrams)
+    if 'lines' in layers:
+        with stage('extract.lines'):
+            page_data['lines'] = line_table(page.lines)
+
+    # Extract rectangles and curves (for symbols and components)
+    if 'rects' in layers:
+        with stage('extract.rects'):
+            page_data['rectangles'] = rect_table(page.rects)
+
+    return page_data
+
+def merge_page_data(results, page_data):
+    """Append one page's extraction output to the document-level results"""
+    page_number = page_data['page']
+    if page_data['text']:
+        results['text_content'].append({
+            'page': page_number,
+            'text': page_data['text']
+        })
+
+    for j, table in enumerate(page_data['tables']):
+        results['tables'].append({
+            'page': page_number,
+            'table_number': j+1,
+            'data': table
+        })
+
+    if page_data['characters']:
+        results['coordinates_data'].append({
+            'page': page_number,
+            'characters': page_data['characters']
+        })
+
+    if page_data['lines']:
+        results.setdefault('lines', []).append({
+            'page': page_number,
+            'lines': page_data['lines']
+        })
+
+    if page_data['rectangles']:
+        results.setdefault('rectangles', []).append({
+            'page': page_number,
+            'rectangles': page_data['rectangles']
+        })
+
+    results['annotations'].extend(page_data['annotations'])
+
+def extract_page_range(pdf_path, start, end, layers=LAYERS):
+    """Open the PDF independently and extract pages [start, end) (0-based)"""
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for i in range(start, end):
+            page = pdf.pages[i]
+            pages.append(extract_page(page, i+1, layers))
+            page.close()
+    return pages
+
+# Process pools reused across documents, keyed by worker count
+_page_pools = {}
+
+def _get_page_pool(workers):
+    if workers not in _page_pools:
+        _page_pools[workers] = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _page_pools[workers]
+
+def _discard_page_pool(workers):
+    """Drop a pool whose worker died; the next parallel extraction starts a fresh one"""
+    pool = _page_pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_page_pools():
+    """Stop any page-extraction pools started by this process"""
+    while _page_pools:
+        _, pool = _page_pools.popitem()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _page_shards(pages, workers):
+    """Split page indices into contiguous ranges, a few per worker to even out slow pages"""
+    shard_size = max(1, -(-len(pages) // (workers * 4)))
+    shards = []
+    for i in pages:
+        if shards and shards[-1][1] == i and shards[-1][1] - shards[-1][0] < shard_size:
+            shards[-1][1] = i + 1
+        else:
+            shards.append([i, i + 1])
+    return [tuple(shard) for shard in shards]
+
+def _extract_pages_parallel(pdf_path, pages, workers, layers, on_shard_done):
+    """Extract `pages` (0-based indices) in worker processes; returns {index: page_data}.
+
+    A shard that raises fails the whole extraction rather than leaving its
+    pages out. If a worker process dies (e.g. killed for memory) the pool is
+    discarded and the shards it didn't finish are extracted in this process.
+    """
+    def submit():
+        pool = _get_page_pool(workers)
+        return {pool.submit(extract_page_range, pdf_path, start, end, layers): (start, end)
+                for start, end in _page_shards(pages, workers)}
+
+    try:
+        futures = submit()
+    except BrokenProcessPool:
+        # A worker died after the pool was last used
+        _discard_page_pool(workers)
+        futures = submit()
+
+    extracted = {}
+    unfinished = []
+
+    def add_shard(start, end, shard_pages):
+        for offset, page_data in enumerate(shard_pages):
+            extracted[start + offset] = page_data
+        on_shard_done(start, end)
+
+    try:
+        for future in as_completed(futures):
+            start, end = futures[future]
+            try:
+                shard_pages = future.result()
+            except BrokenProcessPool:
+                unfinished.append((start, end))
+                continue
+            add_shard(start, end, shard_pages)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+    if unfinished:
+        _discard_page_pool(workers)
+        print(f"Page worker died; extracting {len(unfinished)} remaining shard(s) in this process")
+        for start, end in sorted(unfinished):
+            add_shard(start, end, extract_page_range(pdf_path, start, end, layers))
+    return extracted
+
+def _page_cache_keys(pdf, page_cache, layers):
+    """Cache key per page index; all pages are fingerprinted before any stream is decoded"""
+    keys = {}
+    for i, page in enumerate(pdf.pages):
+        try:
+            fingerprint = page_fingerprint(page.page_obj)
+        except Exception as e:
+            print(f"Error fingerprinting page {i+1}: {e}")
+            continue
+        keys[i] = page_cache.key(fingerprint, 'page', EXTRACTOR_VERSION, sorted(layers))
+    return keys
+
+def _load_cached_pages(pdf, page_cache, layers):
+    """Fingerprint every page; returns ({index: cache key}, {index: cached page_data})"""
+    keys = _page_cache_keys(pdf, page_cache, layers)
+    cached = {}
+    for i, key in keys.items():
+        page_data = page_cache.load(key)
+        cache_lookup('page', page_data is not None)
+        if page_data is not None:
+            cached[i] = renumber_page(page_data, i+1)
+    pages_from_cache(len(cached))
+    return keys, cached
+
+def iter_pdf_pages(pdf_path, profile=DEFAULT_PROFILE, progress=None, page_cache=None):
+    """Yield each page's extract_page output in page order, one page at a time.
+
+    pdfplumber's per-page object caches are flushed before the next page is
+    read, so only the page being consumed is held in memory. Metadata is not
+    read (use extract_metadata). `progress` and `page_cache` behave as in
+    extract_pdf_data.
+    """
+    layers = resolve_profile(profile) - {'metadata'}
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+        page_keys = _page_cache_keys(pdf, page_cache, layers) if page_cache is not None else {}
+        for i, page in enumerate(pdf.pages):
+            started = time.perf_counter()
+            with stage('extract'):
+                page_data = page_cache.load(page_keys[i]) if i in page_keys else None
+                if i in page_keys:
+                    cache_lookup('page', page_data is not None)
+                if page_data is not None:
+                    page_data = renumber_page(page_data, i+1)
+                    pages_from_cache(1)
+                else:
+                    page_data = extract_page(page, i+1, layers)
+                    page_extracted(time.perf_counter() - started, page_data)
+                    if i in page_keys:
+                        page_cache.store(page_keys[i], page_data)
+                page.close()
+            if progress:
+                progress(i+1, total_pages)
+            yield page_data
+
+def extract_pdf_data(pdf_path, progress=None, workers=1, single_parse=True,
+                     profile=DEFAULT_PROFILE, page_cache=None):
+    """Extract text, tables, geometry, metadata and annotations from a PDF.
+
+    `profile` names an entry of EXTRACTION_PROFILES (or is an iterable of
+    LAYERS); layers outside it are skipped and left empty. `progress`, if
+    given, is called as progress(pages_done, total_pages) after each page is
+    processed. With `workers` > 1 page ranges are extracted in parallel
+    worker processes, each opening the PDF independently, and merged back in
+    page order. Metadata and annotations come from the same pdfplumber
+    parse; `single_parse=False` falls back to re-reading the file with PyPDF2.
+    With a result_cache.ResultCache as `page_cache`, pages are looked up by
+    page_fingerprint and only changed pages are extracted.
+    """
+    layers = resolve_profile(profile)
+    # Layers read per page by pdfplumber; the legacy path gets these two from PyPDF2
+    page_layers = layers if single_parse else layers - {'annotations', 'metadata'}
+
     results = {
         'text_content': [],
         'tables': [],
@@ -33,100 +402,84 @@ def extract_pdf_data(pdf_path):
     
     print(f"Processing PDF: {pdf_path}")
     
-    # Method 1: Using pdfplumber for comprehensive extraction
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            results['metadata']['total_pages'] = len(pdf.pages)
-            print(f"Total pages: {len(pdf.pages)}")
-            
-            for i, page in enumerate(pdf.pages):
+    # Method 1: Using pdfplumber for comprehensive extraction. Errors propagate, as they do from
+    # iter_pdf_pages, so an unreadable PDF fails its job instead of yielding an empty workbook
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+        results['metadata']['total_pages'] = total_pages
+        print(f"Total pages: {total_pages}")
+        if 'metadata' in page_layers:
+            with stage('extract.metadata'):
+                results['metadata'].update(extract_metadata(pdf))
+        
+        page_keys, pages_data = {}, {}
+        if page_cache is not None:
+            page_keys, pages_data = _load_cached_pages(pdf, page_cache, page_layers)
+            print(f"Pages served from cache: {len(pages_data)}/{total_pages}")
+        missing = [i for i in range(total_pages) if i not in pages_data]
+        completed = len(pages_data)
+        if progress and completed:
+            progress(completed, total_pages)
+        
+        if workers > 1 and len(missing) > 1:
+            pdf.close()
+
+            def shard_done(start, end):
+                nonlocal completed
+                completed += end - start
+                print(f"Processed pages {start+1}-{end} ({completed}/{total_pages})")
+                if progress:
+                    progress(completed, total_pages)
+
+            pages_data.update(
+                _extract_pages_parallel(pdf_path, missing, workers, page_layers, shard_done)
+            )
+            # Timed inside the page workers' own processes; only counted here
+            for i in missing:
+                if i in pages_data:
+                    page_extracted(None, pages_data[i])
+        else:
+            for i in missing:
+                page = pdf.pages[i]
                 print(f"Processing page {i+1}...")
-                
-                # Extract text
-                text = page.extract_text()
-                if text:
-                    results['text_content'].append({
-                        'page': i+1,
-                        'text': text
-                    })
-                
-                # Extract tables
-                tables = page.extract_tables()
-                if tables:
-                    for j, table in enumerate(tables):
-                        results['tables'].append({
-                            'page': i+1,
-                            'table_number': j+1,
-                            'data': table
-                        })
-                
-                # Extract text with coordinates (useful for piping diagrams)
-                chars = page.chars
-                if chars:
-                    page_coords = []
-                    for char in chars:
-                        page_coords.append({
-                            'text': char['text'],
-                            'x0': float(char['x0']),
-                            'y0': float(char['y0']),
-                            'x1': float(char['x1']),
-                            'y1': float(char['y1']),
-                            'size': float(char['size'])
-                        })
-                    results['coordinates_data'].append({
-                        'page': i+1,
-                        'characters': page_coords
-                    })
-                
-                # Extract lines (important for piping diagrams)
-                lines = page.lines
-                if lines:
-                    page_lines = []
-                    for line in lines:
-                        page_lines.append({
-                            'x0': float(line['x0']),
-                            'y0': float(line['y0']),
-                            'x1': float(line['x1']),
-                            'y1': float(line['y1']),
-                            'width': float(line.get('width', 0))
-                        })
-                    if 'lines' not in results:
-                        results['lines'] = []
-                    results['lines'].append({
-                        'page': i+1,
-                        'lines': page_lines
-                    })
-                
-                # Extract rectangles and curves (for symbols and components)
-                rects = page.rects
-                if rects:
-                    page_rects = []
-                    for rect in rects:
-                        page_rects.append({
-                            'x0': float(rect['x0']),
-                            'y0': float(rect['y0']),
-                            'x1': float(rect['x1']),
-                            'y1': float(rect['y1']),
-                            'width': float(rect.get('width', 0)),
-                            'height': float(rect.get('height', 0))
-                        })
-                    if 'rectangles' not in results:
-                        results['rectangles'] = []
-                    results['rectangles'].append({
-                        'page': i+1,
-                        'rectangles': page_rects
-                    })
-                
-    except Exception as e:
-        print(f"Error with pdfplumber: {e}")
+                started = time.perf_counter()
+                pages_data[i] = extract_page(page, i+1, page_layers)
+                page_extracted(time.perf_counter() - started, pages_data[i])
+                # Drop pdfplumber's per-object dicts; the columnar copy is all we keep
+                page.close()
+                completed += 1
+                if progress:
+                    progress(completed, total_pages)
+        
+        if page_cache is not None:
+            for i in missing:
+                if i in pages_data and i in page_keys:
+                    page_cache.store(page_keys[i], pages_data[i])
+        
+        # Merge in page order regardless of where each page came from
+        for i in sorted(pages_data):
+            merge_page_data(results, pages_data[i])
+            
+    
+    if not single_parse and layers & {'annotations', 'metadata'}:
+        with stage('extract.pypdf2'):
+            extract_pypdf2_metadata_and_annotations(
+                pdf_path, results,
+                metadata='metadata' in layers, annotations='annotations' in layers
+            )
     
-    # Method 2: Using PyPDF2 for annotations and metadata
+    return results
+
+def extract_pypdf2_metadata_and_annotations(pdf_path, results, metadata=True, annotations=True):
+    """Legacy second pass: re-read the PDF with PyPDF2 for metadata and annotations"""
+    import PyPDF2
+
     try:
         with open(pdf_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             
             # Get metadata
-            if pdf_reader.metadata:
+            if metadata and pdf_reader.metadata:
                 results['metadata'].update({
                     'title': str(pdf_reader.metadata.get('/Title', '')),
                     'author': str(pdf_reader.metadata.get('/Author', '')),
@@ -138,7 +491,7 @@ def extract_pdf_data(pdf_path):
                 })
             
             # Extract annotations
-            for i, page in enumerate(pdf_reader.pages):
+            for i, page in enumerate(pdf_reader.pages if annotations else []):
                 if '/Annots' in page:
                     for annot in page['/Annots']:
                         try:
@@ -161,70 +514,127 @@ def extract_pdf_data(pdf_path):
                 
     except Exception as e:
         print(f"Error with PyPDF2: {e}")
-    
-    return results
 
-def analyze_piping_data(results):
-    piping_analysis = {
+# Pipe number and dimension patterns, compiled once
+PIPE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'\b\d+"?\s*[xX×]\s*\d+"?\b',  # Pipe dimensions like 6" x 4"
+    r'\bPipe\s*\d+\b',  # Pipe numbers
+    r'\bP-\d+\b',  # P- prefix pipe numbers
+    r'\b\d+"\s*Ø\b',  # Diameter notations
+    r'\bDN\s*\d+\b',  # DN (Diameter Nominal)
+    r'\bNPS\s*\d+\b'   # NPS (Nominal Pipe Size)
+)]
+
+def _empty_analysis():
+    return {
         'pipe_numbers': [],
         'dimensions': [],
         'annotations_text': [],
         'coordinate_patterns': [],
         'potential_components': []
     }
+
+def _text_dimensions(text):
+    """Pipe numbers and dimensions (common patterns) found in one page's text"""
+    dimensions = []
+    for pattern in PIPE_PATTERNS:
+        dimensions.extend(pattern.findall(text))
+    return dimensions
+
+def _annotation_text(annot):
+    """Annotation content with stray BOM markers removed ('' if empty)"""
+    if not annot['content']:
+        return ''
+    return annot['content'].replace('\\ufeff', '').replace('feff', '')
+
+def _coordinate_patterns(characters, page_number):
+    """Reconstructed text lines of one page, significant groupings only (more than 5 glyphs)"""
+    chars = as_table(characters, CHAR_FIELDS, with_text=True)
+    return [{
+        'y_coordinate': line['y_coordinate'],
+        'text': line['text'].strip(),
+        'page': page_number,
+        'orientation': line['orientation']
+    } for line in reconstruct_lines(chars, min_chars=6) if line['text'].strip()]
+
+def analyze_piping_data(results):
+    piping_analysis = _empty_analysis()
     
     # Extract pipe numbers and dimensions from text
     for page_text in results['text_content']:
-        text = page_text['text']
-        
-        # Look for pipe numbers (common patterns)
-        pipe_patterns = [
-            r'\b\d+"?\s*[xX×]\s*\d+"?\b',  # Pipe dimensions like 6" x 4"
-            r'\bPipe\s*\d+\b',  # Pipe numbers
-            r'\bP-\d+\b',  # P- prefix pipe numbers
-            r'\b\d+"\s*Ø\b',  # Diameter notations
-            r'\bDN\s*\d+\b',  # DN (Diameter Nominal)
-            r'\bNPS\s*\d+\b'   # NPS (Nominal Pipe Size)
-        ]
-        
-        for pattern in pipe_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                piping_analysis['dimensions'].extend(matches)
+        piping_analysis['dimensions'].extend(_text_dimensions(page_text['text']))
     
     # Extract annotation text (often contains component labels)
+    seen_annotations = set()
     for annot in results['annotations']:
-        if annot['content']:
-            content = annot['content'].replace('\\ufeff', '').replace('feff', '')
-            if content and content not in piping_analysis['annotations_text']:
-                piping_analysis['annotations_text'].append(content)
+        content = _annotation_text(annot)
+        if content and content not in seen_annotations:
+            seen_annotations.add(content)
+            piping_analysis['annotations_text'].append(content)
     
     # Analyze coordinate patterns for systematic layout
-    if results['coordinates_data']:
-        for page_coords in results['coordinates_data']:
-            chars = page_coords['characters']
-            # Group characters by y-coordinate (horizontal lines)
-            y_groups = {}
-            for char in chars:
-                y = round(char['y0'])
-                if y not in y_groups:
-                    y_groups[y] = []
-                y_groups[y].append(char)
-            
-            # Look for repeated patterns
-            for y, chars_at_y in y_groups.items():
-                if len(chars_at_y) > 5:  # Significant grouping
-                    text_line = ''.join([c['text'] for c in sorted(chars_at_y, key=lambda x: x['x0'])])
-                    if text_line.strip():
-                        piping_analysis['coordinate_patterns'].append({
-                            'y_coordinate': y,
-                            'text': text_line.strip(),
-                            'page': page_coords['page']
-                        })
+    for page_coords in results['coordinates_data']:
+        piping_analysis['coordinate_patterns'].extend(
+            _coordinate_patterns(page_coords['characters'], page_coords['page'])
+        )
     
     return piping_analysis
 
-def save_results(results, piping_analysis, output_dir):
+class PipingAnalyzer:
+    """Incremental analyze_piping_data over pages from iter_pdf_pages.
+
+    Each page is analyzed as it arrives and its heavy layers (tables, chars,
+    lines, rects) are dropped; only page text and annotations are kept in
+    `results`, which is all the PID structuring needs. Pages must be added in
+    page order for the output to match analyze_piping_data.
+    """
+
+    def __init__(self):
+        self.results = {
+            'text_content': [],
+            'tables': [],
+            'metadata': {},
+            'annotations': [],
+            'coordinates_data': []
+        }
+        self.piping_analysis = _empty_analysis()
+        self._seen_annotations = set()
+
+    def add_page(self, page_data):
+        """Analyze one page; returns the annotation texts it added (for incremental classification)"""
+        page_number = page_data['page']
+        if page_data['text']:
+            self.results['text_content'].append({'page': page_number, 'text': page_data['text']})
+            self.piping_analysis['dimensions'].extend(_text_dimensions(page_data['text']))
+
+        new_annotations = []
+        self.results['annotations'].extend(page_data['annotations'])
+        for annot in page_data['annotations']:
+            content = _annotation_text(annot)
+            if content and content not in self._seen_annotations:
+                self._seen_annotations.add(content)
+                new_annotations.append(content)
+        self.piping_analysis['annotations_text'].extend(new_annotations)
+
+        if page_data['characters']:
+            self.piping_analysis['coordinate_patterns'].extend(
+                _coordinate_patterns(page_data['characters'], page_number)
+            )
+        return new_annotations
+
+def save_results(results, piping_analysis, output_dir, name_prefix=''):
+    """Write the binary results file, the JSON dumps and the extraction workbook to `output_dir`"""
+    save_binary_results(results, piping_analysis, output_dir, name_prefix)
+    save_json_results(results, piping_analysis, output_dir, name_prefix)
+    save_extracted_excel(results, piping_analysis, output_dir, name_prefix)
+    print(f"Results saved to {output_dir}")
+
+def save_binary_results(results, piping_analysis, output_dir, name_prefix=''):
+    """Write results and analysis to one compact, memory-mappable file (see binary_results)"""
+    write_results(Path(output_dir) / f'{name_prefix}{RESULTS_FILE}', results, piping_analysis,
+                  EXTRACTOR_VERSION)
+
+def save_json_results(results, piping_analysis, output_dir, name_prefix=''):
     output_path = Path(output_dir)
     
     # Convert results to JSON-serializable format
@@ -232,64 +642,51 @@ def save_results(results, piping_analysis, output_dir):
     serializable_analysis = convert_to_serializable(piping_analysis)
     
     # Save raw results as JSON
-    with open(output_path / 'pdf_extraction_results.json', 'w', encoding='utf-8') as f:
+    with open(output_path / f'{name_prefix}pdf_extraction_results.json', 'w', encoding='utf-8') as f:
         json.dump(serializable_results, f, indent=2, ensure_ascii=False)
     
     # Save piping analysis as JSON
-    with open(output_path / 'piping_analysis.json', 'w', encoding='utf-8') as f:
+    with open(output_path / f'{name_prefix}piping_analysis.json', 'w', encoding='utf-8') as f:
         json.dump(serializable_analysis, f, indent=2, ensure_ascii=False)
+
+def _table_cells(tables):
+    """Long-format rows (page, table, row, column, value), generated without building a frame"""
+    for table_info in tables:
+        page = table_info['page']
+        table_num = table_info['table_number']
+        for row_idx, row in enumerate(table_info['data']):
+            for col_idx, cell in enumerate(row):
+                yield page, table_num, row_idx, col_idx, cell
+
+def save_extracted_excel(results, piping_analysis, output_dir, name_prefix='', fmt='xlsx'):
+    """Write the raw extraction workbook (or its csv/parquet equivalent, see output_writers)"""
+    sheets = []
     
-    # Create Excel file with different sheets
-    with pd.ExcelWriter(output_path / 'piping_data_extracted.xlsx', engine='openpyxl') as writer:
-        
-        # Metadata sheet
-        if results['metadata']:
-            metadata_df = pd.DataFrame([results['metadata']])
-            metadata_df.to_excel(writer, sheet_name='Metadata', index=False)
-        
-        # Text content sheet
-        if results['text_content']:
-            text_df = pd.DataFrame(results['text_content'])
-            text_df.to_excel(writer, sheet_name='Text_Content', index=False)
-        
-        # Tables sheet
-        if results['tables']:
-            tables_data = []
-            for table_info in results['tables']:
-                page = table_info['page']
-                table_num = table_info['table_number']
-                table_data = table_info['data']
-                
-                for row_idx, row in enumerate(table_data):
-                    for col_idx, cell in enumerate(row):
-                        tables_data.append({
-                            'Page': page,
-                            'Table': table_num,
-                            'Row': row_idx,
-                            'Column': col_idx,
-                            'Value': cell
-                        })
-            
-            if tables_data:
-                tables_df = pd.DataFrame(tables_data)
-                tables_df.to_excel(writer, sheet_name='Tables', index=False)
-        
-        # Annotations sheet
-        if results['annotations']:
-            annotations_df = pd.DataFrame(results['annotations'])
-            annotations_df.to_excel(writer, sheet_name='Annotations', index=False)
-        
-        # Piping analysis sheets
-        if piping_analysis['dimensions']:
-            dimensions_df = pd.DataFrame({'Dimensions': piping_analysis['dimensions']})
-            dimensions_df.to_excel(writer, sheet_name='Pipe_Dimensions', index=False)
-        
-        if piping_analysis['annotations_text']:
-            annot_text_df = pd.DataFrame({'Annotation_Text': piping_analysis['annotations_text']})
-            annot_text_df.to_excel(writer, sheet_name='Component_Labels', index=False)
-        
-        if piping_analysis['coordinate_patterns']:
-            coord_df = pd.DataFrame(piping_analysis['coordinate_patterns'])
-            coord_df.to_excel(writer, sheet_name='Coordinate_Patterns', index=False)
+    # Metadata sheet
+    if results['metadata']:
+        sheets.append(records_sheet('Metadata', [results['metadata']]))
+    
+    # Text content sheet
+    if results['text_content']:
+        sheets.append(records_sheet('Text_Content', results['text_content']))
+    
+    # Tables sheet (one row per cell)
+    if any(row for table_info in results['tables'] for row in table_info['data']):
+        sheets.append(('Tables', ['Page', 'Table', 'Row', 'Column', 'Value'],
+                       _table_cells(results['tables'])))
+    
+    # Annotations sheet
+    if results['annotations']:
+        sheets.append(records_sheet('Annotations', results['annotations']))
+    
+    # Piping analysis sheets
+    if piping_analysis['dimensions']:
+        sheets.append(column_sheet('Pipe_Dimensions', 'Dimensions', piping_analysis['dimensions']))
+    
+    if piping_analysis['annotations_text']:
+        sheets.append(column_sheet('Component_Labels', 'Annotation_Text', piping_analysis['annotations_text']))
+    
+    if piping_analysis['coordinate_patterns']:
+        sheets.append(records_sheet('Coordinate_Patterns', piping_analysis['coordinate_patterns']))
     
-    print(f"Results saved to {output_path}")
\ No newline at end of file
+    write_sheets(sheets, output_path(output_dir, f'{name_prefix}piping_data_extracted', fmt), fmt)
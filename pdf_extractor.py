@@ -0,0 +1,262 @@
+"""Command-line driver for offline processing.
+
+    python -m pdf_extractor batch <dir> [-o OUTPUT] [-j WORKERS] [--profile P] [--format F]
+
+Walks <dir> for PDFs, runs the extract -> analyze -> structure pipeline on a
+process pool and writes one workbook per PDF under OUTPUT, mirroring the
+input tree. Every finished file is appended to OUTPUT/checkpoint.jsonl, so an
+interrupted run picks up where it stopped; OUTPUT/manifest.json summarizes
+the run.
+"""
+import os
+import re
+import sys
+import json
+import time
+import signal
+import argparse
+import traceback
+import multiprocessing
+
+from extraction_profiles import EXTRACTION_PROFILES
+from output_writers import FORMATS, available_formats, output_path
+from result_cache import open_cache, DEFAULT_MAX_BYTES
+from tag_patterns import TagClassifier, load_site_patterns, SITE_PATTERNS_ENV
+import metrics
+
+CHECKPOINT_NAME = 'checkpoint.jsonl'
+MANIFEST_NAME = 'manifest.json'
+# Workers are replaced after this many files so parser memory can't creep up over a long run
+FILES_PER_WORKER = 50
+
+# File states recorded in the checkpoint
+DONE = 'done'
+CACHED = 'cached'
+FAILED = 'failed'
+
+# This worker's ResultCache: opened once by _init_worker, so its size accounting carries across files
+_worker_cache = None
+
+
+def find_pdfs(input_dir):
+    """Relative paths of every PDF under `input_dir`, in a stable order"""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(input_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith('.pdf'):
+                found.append(os.path.relpath(os.path.join(dirpath, name), input_dir))
+    return found
+
+
+def file_identity(path):
+    """(size, mtime_ns) of a file; a changed identity means the checkpoint entry is stale"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_checkpoint(path):
+    """Latest checkpoint record per relative path"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by an interrupted run
+            records[record['path']] = record
+    return records
+
+
+def is_finished(record, identity, output_dir, retry_failed=False):
+    """Whether a checkpoint record means the file can be skipped this run"""
+    if record is None or record.get('identity') != identity:
+        return False
+    if record['status'] == FAILED:
+        return not retry_failed
+    return os.path.exists(os.path.join(output_dir, record['output']))
+
+
+def output_for(rel_path, output_format):
+    """Workbook path (relative to the output dir) for the PDF at `rel_path`"""
+    stem = os.path.splitext(os.path.basename(rel_path))[0]
+    return str(output_path(os.path.dirname(rel_path), f"PID_Extract_{stem}", output_format))
+
+
+def _init_worker(quiet, cache_dir, cache_bytes):
+    global _worker_cache
+    # Ctrl+C is handled by the parent, which terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_cache = open_cache(cache_dir, cache_bytes)
+    if quiet:
+        # The pipeline reports per page; thousands of files would bury the batch progress
+        sys.stdout = open(os.devnull, 'w')
+
+
+def process_one(job):
+    """Pool task: run the pipeline on one (input_dir, rel_path, output_dir, options) job"""
+    from pipeline import process_pdf
+    from workspace import file_digest
+
+    input_dir, rel_path, output_dir, options = job
+    pdf_path = os.path.join(input_dir, rel_path)
+    record = {'path': rel_path, 'identity': file_identity(pdf_path)}
+    started = time.time()
+    try:
+        digest = file_digest(pdf_path)
+        record['sha256'] = digest
+        record['output'] = output_for(rel_path, options['output_format'])
+        excel_path = os.path.join(output_dir, record['output'])
+        os.makedirs(os.path.dirname(excel_path), exist_ok=True)
+        with metrics.recording() as profile:
+            structured = process_pdf(pdf_path, excel_path, digest=digest, cache=_worker_cache, **options)
+        record['status'] = CACHED if structured is None else DONE
+        record['stages'] = profile.to_dict()['stages']
+        record['peak_rss_mb'] = profile.peak_rss_mb
+    except Exception as e:
+        record['status'] = FAILED
+        record['error'] = f"{type(e).__name__}: {e}"
+        record['traceback'] = traceback.format_exc()
+    record['seconds'] = round(time.time() - started, 3)
+    return record
+
+
+def write_manifest(path, records, input_dir, options, elapsed):
+    """Summary of every file in the run (including ones finished by earlier runs)"""
+    counts = {}
+    stages = {}
+    for record in records:
+        counts[record['status']] = counts.get(record['status'], 0) + 1
+        for name, seconds in record.get('stages', {}).items():
+            stages[name] = round(stages.get(name, 0.0) + seconds, 6)
+    manifest = {
+        'input_dir': os.path.abspath(input_dir),
+        'profile': options['profile'],
+        'output_format': options['output_format'],
+        'total': len(records),
+        'counts': counts,
+        'elapsed_seconds': round(elapsed, 3),
+        'stage_seconds': stages,
+        'files': [{key: value for key, value in record.items() if key not in ('identity', 'traceback')}
+                  for record in records]
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def run_batch(input_dir, output_dir, workers=None, profile='tags+geometry', output_format='xlsx',
+              cache_dir=None, cache_mb=None, retry_failed=False, quiet=True):
+    """Process every PDF under `input_dir`; returns the manifest dict"""
+    if not os.path.isdir(input_dir):
+        raise ValueError(f"Not a directory: {input_dir}")
+    if profile not in EXTRACTION_PROFILES:
+        raise ValueError(f"Unknown extraction profile: {profile}")
+    if output_format not in available_formats():
+        raise ValueError(f"Unsupported output format: {output_format}")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if cache_dir is None:
+        cache_dir = os.path.join(output_dir, '.cache')
+    cache_bytes = cache_mb * 1024 * 1024 if cache_mb else DEFAULT_MAX_BYTES
+    options = {'profile': profile, 'output_format': output_format}
+
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+    checkpoint = load_checkpoint(checkpoint_path)
+    paths = find_pdfs(input_dir)
+    pending = []
+    for rel_path in paths:
+        if not is_finished(checkpoint.get(rel_path), file_identity(os.path.join(input_dir, rel_path)),
+                           output_dir, retry_failed):
+            pending.append(rel_path)
+    print(f"Found {len(paths)} PDF(s); {len(paths) - len(pending)} already processed, "
+          f"{len(pending)} to go with {workers} worker(s)")
+
+    started = time.time()
+    finished = 0
+    # Spawned workers, as in job_queue
+    pool = multiprocessing.get_context('spawn').Pool(
+        workers, initializer=_init_worker, initargs=(quiet, cache_dir, cache_bytes),
+        maxtasksperchild=FILES_PER_WORKER
+    )
+    jobs = ((input_dir, rel_path, output_dir, options) for rel_path in pending)
+    try:
+        with open(checkpoint_path, 'a', encoding='utf-8') as log:
+            for record in pool.imap_unordered(process_one, jobs):
+                checkpoint[record['path']] = record
+                log.write(json.dumps(record) + '\n')
+                log.flush()
+                finished += 1
+                detail = record.get('error') or record['output']
+                print(f"[{finished}/{len(pending)}] {record['status']}: {record['path']} -> "
+                      f"{detail} ({record['seconds']}s)")
+        pool.close()
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            print("Interrupted; finished files are checkpointed, rerun to resume")
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    records = [checkpoint[p] for p in paths if p in checkpoint]
+    manifest = write_manifest(os.path.join(output_dir, MANIFEST_NAME), records, input_dir, options,
+                              time.time() - started)
+    print(f"Processed {finished} file(s) in {time.time() - started:.1f}s: {manifest['counts']}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pdf_extractor',
+                                     description='Offline P&ID PDF extraction')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser('batch', help='Process every PDF under a directory')
+    batch.add_argument('input_dir', help='Directory searched recursively for PDFs')
+    batch.add_argument('-o', '--output', default='pid_output',
+                       help='Output directory (workbooks, checkpoint and manifest)')
+    batch.add_argument('-j', '--workers', type=int, default=None,
+                       help='Worker processes (default: CPU count)')
+    batch.add_argument('--profile', default='tags+geometry', choices=list(EXTRACTION_PROFILES),
+                       help='Extraction profile')
+    batch.add_argument('--format', dest='output_format', default='xlsx', choices=list(FORMATS),
+                       help='Output format')
+    batch.add_argument('--cache-dir', default=None,
+                       help="Result cache directory (default: OUTPUT/.cache; '' disables caching)")
+    batch.add_argument('--cache-mb', type=int, default=None, help='Size bound of the result cache')
+    batch.add_argument('--retry-failed', action='store_true',
+                       help='Process files that failed in an earlier run again')
+    batch.add_argument('--tag-patterns', default=None,
+                       help=f'JSON file of site tag patterns (sets {SITE_PATTERNS_ENV} for the workers)')
+    batch.add_argument('-v', '--verbose', action='store_true',
+                       help='Show per-page output from the workers')
+
+    args = parser.parse_args(argv)
+    if args.command == 'batch':
+        if args.tag_patterns:
+            # Checked here, then loaded by every spawned worker on import
+            try:
+                load_site_patterns(args.tag_patterns, TagClassifier())
+            except (OSError, ValueError, KeyError, re.error) as e:
+                parser.error(f"Bad --tag-patterns file: {e}")
+            os.environ[SITE_PATTERNS_ENV] = os.path.abspath(args.tag_patterns)
+        try:
+            manifest = run_batch(
+                args.input_dir, args.output, workers=args.workers, profile=args.profile,
+                output_format=args.output_format, cache_dir=args.cache_dir, cache_mb=args.cache_mb,
+                retry_failed=args.retry_failed, quiet=not args.verbose
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        except KeyboardInterrupt:
+            return 130
+        return 1 if manifest['counts'].get(FAILED) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import os
+from pathlib import Path
+
+from pdf_data_extractor import (
+    extract_pdf_data, analyze_piping_data, save_binary_results, save_json_results, save_extracted_excel,
+    iter_pdf_pages, PipingAnalyzer, resolve_profile, DEFAULT_PROFILE, EXTRACTOR_VERSION
+)
+from create_pid_structure import (
+    create_pid_scrape_format, create_detailed_components_sheet, save_to_excel,
+    new_categories, add_to_categories, clean_line_numbers, new_layout, page_layout, merge_layout,
+    drawing_layout, STRUCTURE_VERSION
+)
+from tag_patterns import default_classifier
+from output_writers import FORMATS
+from workspace import file_digest
+from metrics import stage, cache_lookup
+
+# Optional intermediate outputs that can be requested from process_pdf:
+#   'binary' -> pdf_extraction_results.bin (results and analysis, see binary_results)
+#   'json' -> pdf_extraction_results.json + piping_analysis.json (export format)
+#   'xlsx' -> piping_data_extracted.xlsx (raw extraction workbook, in the run's output format)
+ARTIFACTS = ('binary', 'json', 'xlsx')
+
+
+def structure_results(results, piping_analysis, categories=None, layout=None):
+    """Build the PID workbook frames straight from in-memory extraction output.
+
+    'line_runs' (the Line_Connectivity rows) is None when no page had line geometry.
+    """
+    if layout is None:
+        with stage('layout'):
+            layout = drawing_layout(results)
+    line_runs = layout['runs'] if layout['pages'] else None
+    with stage('structure'):
+        return {
+            'results': results,
+            'piping_analysis': piping_analysis,
+            'pid_df': create_pid_scrape_format(piping_analysis, results, categories),
+            'detailed_df': create_detailed_components_sheet(piping_analysis, results, layout),
+            'line_runs': line_runs
+        }
+
+
+def results_key(cache, digest, profile):
+    """Cache key for extraction results: PDF bytes, extractor version and extracted layers"""
+    return cache.key(digest, 'results', EXTRACTOR_VERSION, resolve_profile(profile))
+
+
+def workbook_key(cache, digest, profile, output_format='xlsx'):
+    """Cache key for the PID workbook; also covers the structuring code and tag pattern table"""
+    return cache.key(digest, 'workbook', EXTRACTOR_VERSION, STRUCTURE_VERSION,
+                     resolve_profile(profile), default_classifier.fingerprint, output_format)
+
+
+def extract_cached(pdf_path, cache=None, digest=None, progress=None, page_workers=1,
+                   profile=DEFAULT_PROFILE):
+    """extract_pdf_data, served from `cache` when these bytes (or some of their pages) were already extracted"""
+    if cache is None:
+        with stage('extract'):
+            return extract_pdf_data(pdf_path, progress=progress, workers=page_workers, profile=profile)
+    key = results_key(cache, digest or file_digest(pdf_path), profile)
+    with stage('cache'):
+        results = cache.load(key)
+    cache_lookup('results', results is not None)
+    if results is not None:
+        print(f"Extraction results served from cache: {pdf_path}")
+        return results
+    # Unchanged sheets of a revised package still come from the per-page cache
+    with stage('extract'):
+        results = extract_pdf_data(pdf_path, progress=progress, workers=page_workers, profile=profile,
+                                   page_cache=cache)
+    with stage('cache'):
+        cache.store(key, results)
+    return results
+
+
+def run_pipeline(pdf_path, progress=None, page_workers=1, profile=DEFAULT_PROFILE,
+                 cache=None, digest=None):
+    """Extract, analyze and structure a PDF without writing any outputs"""
+    results = extract_cached(
+        pdf_path, cache, digest, progress=progress, page_workers=page_workers, profile=profile
+    )
+    with stage('analyze'):
+        piping_analysis = analyze_piping_data(results)
+    return structure_results(results, piping_analysis)
+
+
+def stream_pipeline(pdf_path, progress=None, profile=DEFAULT_PROFILE, page_cache=None):
+    """run_pipeline with memory bounded by one page.
+
+    Pages from iter_pdf_pages are analyzed and their annotations classified as
+    they are extracted, and their tags placed against the page's symbols and
+    pipe runs, then the page's geometry is released. The returned 'results' keep
+    only page text and annotations (no tables, geometry or metadata), which is
+    all the PID workbook needs.
+    """
+    analyzer = PipingAnalyzer()
+    categories = new_categories()
+    layout = new_layout()
+    for page_data in iter_pdf_pages(pdf_path, profile=profile, progress=progress,
+                                    page_cache=page_cache):
+        # Tags are placed while the page's geometry is still at hand
+        with stage('layout'):
+            merge_layout(layout, page_layout(
+                page_data['page'], page_data['characters'], page_data['lines'], page_data['rectangles']
+            ))
+        with stage('analyze'):
+            add_to_categories(categories, analyzer.add_page(page_data))
+    return structure_results(
+        analyzer.results, analyzer.piping_analysis, clean_line_numbers(categories), layout
+    )
+
+
+def save_artifacts(structured, output_dir, artifacts, name_prefix='', output_format='xlsx'):
+    """Write the requested intermediate artifacts for a pipeline run"""
+    unknown = set(artifacts) - set(ARTIFACTS)
+    if unknown:
+        raise ValueError(f"Unknown artifact(s): {', '.join(sorted(unknown))}")
+    if not artifacts:
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    if 'binary' in artifacts:
+        with stage('artifacts.binary'):
+            save_binary_results(structured['results'], structured['piping_analysis'], output_dir, name_prefix)
+    if 'json' in artifacts:
+        with stage('artifacts.json'):
+            save_json_results(structured['results'], structured['piping_analysis'], output_dir, name_prefix)
+    if 'xlsx' in artifacts:
+        with stage('artifacts.xlsx'):
+            save_extracted_excel(structured['results'], structured['piping_analysis'], output_dir,
+                                 name_prefix, output_format)
+    print(f"Artifacts ({', '.join(artifacts)}) saved to {output_dir}")
+
+
+def process_pdf(pdf_path, output_excel, artifacts=(), artifacts_dir=None,
+                name_prefix='', progress=None, page_workers=1, profile=DEFAULT_PROFILE,
+                cache=None, digest=None, output_format='xlsx'):
+    """Run the full pipeline for one PDF and write the PID workbook.
+
+    JSON dumps and the raw extraction workbook are only written when listed in
+    `artifacts`; they go to `artifacts_dir` (default: next to the workbook) with
+    `name_prefix` prepended to their file names. `page_workers` > 1 extracts
+    page ranges in parallel processes; `profile` selects the extraction layers.
+    When only the workbook is wanted and pages are extracted sequentially, the
+    PDF is streamed through stream_pipeline one page at a time.
+    `output_format` is an output_writers format ('xlsx', 'csv' or 'parquet').
+
+    With a result_cache.ResultCache, a PDF seen before (same bytes, versions,
+    profile and tag patterns) gets its workbook copied from the cache and None
+    is returned; otherwise cached extraction results are reused when present.
+    `digest` is the PDF's SHA-256 if the caller already computed it.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if cache is not None:
+        digest = digest or file_digest(pdf_path)
+        cached_workbook = workbook_key(cache, digest, profile, output_format)
+        if not artifacts:
+            with stage('cache'):
+                fetched = cache.fetch_file(cached_workbook, output_excel, FORMATS[output_format])
+            cache_lookup('workbook', fetched)
+            if fetched:
+                print(f"Workbook served from cache: {output_excel}")
+                return None
+
+    if artifacts or page_workers > 1:
+        structured = run_pipeline(
+            pdf_path, progress=progress, page_workers=page_workers, profile=profile,
+            cache=cache, digest=digest
+        )
+    else:
+        # Only the workbook is wanted: stream pages instead of holding the whole document
+        structured = stream_pipeline(pdf_path, progress=progress, profile=profile, page_cache=cache)
+    with stage('write'):
+        save_to_excel(
+            structured['pid_df'], structured['detailed_df'],
+            structured['piping_analysis'], output_excel, output_format, structured['line_runs']
+        )
+    if cache is not None:
+        with stage('cache'):
+            cache.store_file(cached_workbook, output_excel, FORMATS[output_format])
+    if artifacts:
+        save_artifacts(
+            structured, artifacts_dir or Path(output_excel).parent, artifacts, name_prefix,
+            output_format
+        )
+    return structured
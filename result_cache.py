@@ -0,0 +1,154 @@
+import os
+import pickle
+import shutil
+import hashlib
+import tempfile
+
+# Default size bound for the on-disk cache
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Writes between full scans, which also pick up entries stored by other processes
+RESCAN_WRITES = 256
+
+
+class ResultCache:
+    """Content-addressed on-disk cache for extraction results and finished workbooks.
+
+    Entries live under `root` as <key>.pickle (Python objects) or <key>.<ext>
+    (files). Writes go through a temp file and os.replace, so worker processes
+    can share one cache directory. Reads refresh an entry's mtime, and
+    `evict()` deletes the least recently used entries once the cache grows
+    past `max_bytes`. Writes don't scan the cache: each instance keeps a
+    running size estimate (its last scan plus what it wrote since) and only
+    scans and evicts when that passes `max_bytes`, or every RESCAN_WRITES
+    writes. The object is a path, a limit and that estimate, so it can be
+    passed to spawned worker processes.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._estimated_bytes = None  # Unknown until the first scan
+        self._writes_since_scan = 0
+
+    @staticmethod
+    def key(*parts):
+        """Stable key for a tuple of parts (file digest, versions, options)"""
+        return hashlib.sha256('\0'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.root, key[:2], f"{key}{suffix}")
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write(self, path, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._account(os.path.getsize(path))
+
+    def _account(self, size):
+        """Add a written entry to the size estimate; evict once it passes the bound"""
+        self._writes_since_scan += 1
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += size
+        if (self._estimated_bytes is None or self._estimated_bytes > self.max_bytes
+                or self._writes_since_scan >= RESCAN_WRITES):
+            self.evict()
+
+    def load(self, key):
+        """Cached object for `key`, or None on a miss (or an unreadable entry)"""
+        path = self._path(key, '.pickle')
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Discarding unreadable cache entry {key[:16]}: {e}")
+            self._remove(path)
+            return None
+        self._touch(path)
+        return value
+
+    def store(self, key, value):
+        self._write(self._path(key, '.pickle'),
+                    lambda f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def fetch_file(self, key, destination, suffix=''):
+        """Copy the cached file for `key` to `destination`; False on a miss"""
+        path = self._path(key, suffix)
+        try:
+            shutil.copyfile(path, destination)
+        except FileNotFoundError:
+            return False
+        self._touch(path)
+        return True
+
+    def store_file(self, key, source, suffix=''):
+        def copy(f):
+            with open(source, 'rb') as src:
+                shutil.copyfileobj(src, f)
+        self._write(self._path(key, suffix), copy)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def entries(self):
+        """(mtime, size, path) for every cache entry"""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in `max_bytes`"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        self._estimated_bytes = total
+        self._writes_since_scan = 0
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self._estimated_bytes = 0
+        self._writes_since_scan = 0
+
+
+def open_cache(root, max_bytes=DEFAULT_MAX_BYTES):
+    """ResultCache at `root`, or None when caching is disabled (empty root)"""
+    if not root:
+        return None
+    os.makedirs(root, exist_ok=True)
+    return ResultCache(root, max_bytes)
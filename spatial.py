@@ -0,0 +1,272 @@
+import numpy as np
+
+from geometry import (
+    as_table, reconstruct_words, segment_endpoints, CHAR_FIELDS, LINE_FIELDS, RECT_FIELDS
+)
+
+# Average number of items per grid cell the default cell size aims for
+ITEMS_PER_CELL = 4
+
+
+class GridIndex:
+    """Uniform-grid spatial index over the boxes or line segments of one page.
+
+    Every item is registered in each cell its bounding box overlaps, and the
+    (cell, item) pairs are kept sorted by cell key. The cells a query touches
+    in one grid row have consecutive keys, so each row is a single
+    searchsorted slice. Candidates are then filtered on exact distance:
+    point-to-box for boxes, point-to-segment for segments. Queries cost
+    roughly the number of items near the query point, not the number on the
+    page.
+    """
+
+    def __init__(self, x0, y0, x1, y1, segments=None, cell_size=None):
+        self.x0, self.y0, self.x1, self.y1 = (np.asarray(a, dtype=np.float64) for a in (x0, y0, x1, y1))
+        # Segment endpoints (ax, ay, bx, by); None for boxes
+        self.segments = None if segments is None else tuple(np.asarray(a, dtype=np.float64) for a in segments)
+        n = len(self.x0)
+        if not n:
+            self.cell_size = cell_size or 1.0
+            self._keys = np.zeros(0, dtype=np.int64)
+            self._items = np.zeros(0, dtype=np.int64)
+            self._origin = (0.0, 0.0)
+            self._shape = (1, 1)
+            return
+
+        left, bottom = float(self.x0.min()), float(self.y0.min())
+        width = float(self.x1.max()) - left
+        height = float(self.y1.max()) - bottom
+        if cell_size is None:
+            cell_size = max(1.0, (max(width, 1.0) * max(height, 1.0) * ITEMS_PER_CELL / n) ** 0.5)
+        self.cell_size = float(cell_size)
+        self._origin = (left, bottom)
+        self._shape = (int(width // self.cell_size) + 1, int(height // self.cell_size) + 1)
+
+        cx0, cy0 = self._cell(self.x0, self.y0)
+        cx1, cy1 = self._cell(self.x1, self.y1)
+        spans_x = cx1 - cx0 + 1
+        counts = spans_x * (cy1 - cy0 + 1)
+        # One (cell key, item) pair per covered cell, built without a Python loop
+        items = np.repeat(np.arange(n), counts)
+        within = np.arange(len(items)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = cx0[items] + within % spans_x[items]
+        cell_y = cy0[items] + within // spans_x[items]
+        keys = cell_y * self._shape[0] + cell_x
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._items = items[order]
+
+    @classmethod
+    def from_boxes(cls, boxes, cell_size=None):
+        """Index an (n, 4) array of x0, y0, x1, y1 boxes"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        return cls(boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3], cell_size=cell_size)
+
+    @classmethod
+    def from_segments(cls, ax, ay, bx, by, cell_size=None):
+        """Index line segments from (ax, ay) to (bx, by)"""
+        ax, ay, bx, by = (np.asarray(a, dtype=np.float64) for a in (ax, ay, bx, by))
+        return cls(np.minimum(ax, bx), np.minimum(ay, by), np.maximum(ax, bx), np.maximum(ay, by),
+                   segments=(ax, ay, bx, by), cell_size=cell_size)
+
+    def __len__(self):
+        return len(self.x0)
+
+    def _cell(self, x, y):
+        columns, rows = self._shape
+        cx = np.clip(((np.asarray(x) - self._origin[0]) // self.cell_size).astype(np.int64), 0, columns - 1)
+        cy = np.clip(((np.asarray(y) - self._origin[1]) // self.cell_size).astype(np.int64), 0, rows - 1)
+        return cx, cy
+
+    def candidates(self, x0, y0, x1, y1):
+        """Indices of items registered in any cell overlapping the box (a superset of the hits)"""
+        if not len(self):
+            return self._items
+        (cx0, cx1), (cy0, cy1) = zip(self._cell(x0, y0), self._cell(x1, y1))
+        columns = self._shape[0]
+        row_keys = np.arange(int(cy0), int(cy1) + 1) * columns
+        starts = np.searchsorted(self._keys, row_keys + int(cx0), side='left')
+        ends = np.searchsorted(self._keys, row_keys + int(cx1), side='right')
+        if len(starts) == 1:
+            return np.unique(self._items[starts[0]:ends[0]])
+        return np.unique(np.concatenate([self._items[s:e] for s, e in zip(starts, ends)]))
+
+    def distances(self, x, y, indices):
+        """Distance from (x, y) to each item in `indices` (0 inside a box)"""
+        if self.segments is None:
+            dx = np.maximum(np.maximum(self.x0[indices] - x, 0.0), x - self.x1[indices])
+            dy = np.maximum(np.maximum(self.y0[indices] - y, 0.0), y - self.y1[indices])
+            return np.hypot(dx, dy)
+        ax, ay, bx, by = (a[indices] for a in self.segments)
+        vx, vy = bx - ax, by - ay
+        length2 = vx * vx + vy * vy
+        t = np.where(length2 > 0, ((x - ax) * vx + (y - ay) * vy) / np.where(length2 > 0, length2, 1.0), 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        return np.hypot(ax + t * vx - x, ay + t * vy - y)
+
+    def within(self, x, y, radius):
+        """(indices, distances) of items within `radius` of (x, y), nearest first"""
+        indices = self.candidates(x - radius, y - radius, x + radius, y + radius)
+        if not len(indices):
+            return indices, np.zeros(0)
+        distances = self.distances(x, y, indices)
+        hit = distances <= radius
+        indices, distances = indices[hit], distances[hit]
+        order = np.argsort(distances, kind='stable')
+        return indices[order], distances[order]
+
+    def query_pairs(self, x, y, radius):
+        """(point, item) index pairs with the item within `radius` of point (x[i], y[i]), for arrays of points.
+
+        The bulk form of within(): every point's cell rows are expanded and
+        joined against the sorted cell keys in a few array passes, so
+        querying all endpoints of a page costs no Python-level loop.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(self) or not len(x):
+            return empty, empty
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        rows = cy1 - cy0 + 1
+        point = np.repeat(np.arange(len(x)), rows)
+        row = cy0[point] + np.arange(len(point)) - np.repeat(np.cumsum(rows) - rows, rows)
+        starts = np.searchsorted(self._keys, row * self._shape[0] + cx0[point], side='left')
+        ends = np.searchsorted(self._keys, row * self._shape[0] + cx1[point], side='right')
+        counts = ends - starts
+        pair_point = np.repeat(point, counts)
+        position = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+        # Items spanning several cells show up once per cell
+        pairs = np.sort(pair_point * len(self) + self._items[position])
+        if len(pairs):
+            pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+        pair_point, pair_item = pairs // len(self), pairs % len(self)
+        hit = self.distances(x[pair_point], y[pair_point], pair_item) <= radius
+        return pair_point[hit], pair_item[hit]
+
+    def touching(self, x0, y0, x1, y1):
+        """Indices of items that intersect the box (segments are clipped against it exactly)"""
+        indices = self.candidates(x0, y0, x1, y1)
+        if not len(indices):
+            return indices
+        overlaps = ((self.x0[indices] <= x1) & (self.x1[indices] >= x0)
+                    & (self.y0[indices] <= y1) & (self.y1[indices] >= y0))
+        indices = indices[overlaps]
+        if self.segments is None or not len(indices):
+            return indices
+        # Liang-Barsky: the parameter range of the segment inside each slab must stay non-empty
+        ax, ay, bx, by = (a[indices] for a in self.segments)
+        start = np.zeros(len(indices))
+        end = np.ones(len(indices))
+        inside = np.ones(len(indices), dtype=bool)
+        for p, q in ((ax - bx, ax - x0), (bx - ax, x1 - ax), (ay - by, ay - y0), (by - ay, y1 - ay)):
+            parallel = p == 0
+            inside &= ~(parallel & (q < 0))
+            t = np.where(parallel, 0.0, q / np.where(parallel, 1.0, p))
+            start = np.where(~parallel & (p < 0), np.maximum(start, t), start)
+            end = np.where(~parallel & (p > 0), np.minimum(end, t), end)
+        return indices[inside & (start <= end)]
+
+    def nearest(self, x, y, max_distance=np.inf):
+        """(index, distance) of the item nearest (x, y), or None if none is within `max_distance`.
+
+        The search radius starts at one cell and doubles, so only the
+        neighbourhood of the query is examined unless the page is empty
+        around it.
+        """
+        if not len(self):
+            return None
+        columns, rows = self._shape
+        reach = self.cell_size * max(columns, rows) + abs(x - self._origin[0]) + abs(y - self._origin[1])
+        radius = self.cell_size
+        while True:
+            indices, distances = self.within(x, y, min(radius, max_distance))
+            if len(indices):
+                return int(indices[0]), float(distances[0])
+            if radius >= max_distance or radius >= reach:
+                return None
+            radius *= 2
+
+
+class PageGeometry:
+    """Spatial indexes over one page's words, rectangles and line segments.
+
+    Built from the page's GeometryTables or legacy lists of dicts (any of
+    which may be empty); each index is created on first use.
+    """
+
+    def __init__(self, chars=None, lines=None, rects=None):
+        self.chars = as_table(chars, CHAR_FIELDS, with_text=True) if chars is not None and len(chars) else None
+        self.lines = as_table(lines, LINE_FIELDS) if lines is not None and len(lines) else None
+        self.rects = as_table(rects, RECT_FIELDS) if rects is not None and len(rects) else None
+        self._words = self._word_index = self._rect_index = self._line_index = None
+
+    @property
+    def words(self):
+        """(texts, boxes) of the page's reconstructed words"""
+        if self._words is None:
+            if self.chars is None:
+                self._words = ([], np.zeros((0, 4), dtype=np.float32))
+            else:
+                self._words = reconstruct_words(self.chars)
+        return self._words
+
+    @property
+    def word_index(self):
+        if self._word_index is None:
+            self._word_index = GridIndex.from_boxes(self.words[1])
+        return self._word_index
+
+    @property
+    def rect_index(self):
+        if self._rect_index is None:
+            rects = self.rects
+            self._rect_index = GridIndex.from_boxes(
+                np.zeros((0, 4)) if rects is None
+                else np.column_stack([rects['x0'], rects['y0'], rects['x1'], rects['y1']])
+            )
+        return self._rect_index
+
+    @property
+    def line_index(self):
+        if self._line_index is None:
+            if self.lines is None:
+                self._line_index = GridIndex.from_segments(*(np.zeros(0),) * 4)
+            else:
+                self._line_index = GridIndex.from_segments(*segment_endpoints(self.lines))
+        return self._line_index
+
+    @property
+    def extent(self):
+        """(x0, y0, x1, y1) around everything drawn on the page, or None for an empty page"""
+        tables = [table for table in (self.chars, self.lines, self.rects) if table is not None]
+        if not tables:
+            return None
+        return (min(float(table['x0'].min()) for table in tables),
+                min(float(table['y0'].min()) for table in tables),
+                max(float(table['x1'].max()) for table in tables),
+                max(float(table['y1'].max()) for table in tables))
+
+    def large_rects(self, min_size):
+        """(n, 4) x0, y0, x1, y1 of the rectangles with a side of `min_size` or more (frames, title blocks)"""
+        index = self.rect_index
+        large = (index.x1 - index.x0 >= min_size) | (index.y1 - index.y0 >= min_size)
+        return np.column_stack([index.x0[large], index.y0[large], index.x1[large], index.y1[large]])
+
+    def symbol_rect(self, x, y, radius, max_size=np.inf):
+        """Rectangle for a symbol at (x, y): the smallest one containing it, else the nearest
+        within `radius`; rectangles with a side of `max_size` or more (frames, title blocks) are
+        skipped. Returns an index or None.
+        """
+        index = self.rect_index
+        indices, distances = index.within(x, y, radius)
+        if not len(indices):
+            return None
+        widths = index.x1[indices] - index.x0[indices]
+        heights = index.y1[indices] - index.y0[indices]
+        fits = (widths < max_size) & (heights < max_size)
+        if not fits.any():
+            return None
+        indices, distances, areas = indices[fits], distances[fits], (widths * heights)[fits]
+        return int(indices[np.lexsort((areas, distances))[0]])
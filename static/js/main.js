@@ -1,3 +1,7 @@
+// Files above this go through the resumable chunked upload (single requests are capped at 16MB)
+const CHUNKED_THRESHOLD = 15 * 1024 * 1024;
+const CHUNK_RETRIES = 3;
+
 document.getElementById('uploadForm').addEventListener('submit', function (e) {
     e.preventDefault();
     const files = document.getElementById('files').files;
@@ -10,6 +14,8 @@ document.getElementById('uploadForm').addEventListener('submit', function (e) {
     for (let file of files) {
         formData.append('files', file);
     }
+    formData.append('profile', document.getElementById('profile').value);
+    formData.append('output_format', document.getElementById('outputFormat').value);
 
     // UI Elements
     const progressBar = document.getElementById('progressBar');
@@ -26,6 +32,21 @@ document.getElementById('uploadForm').addEventListener('submit', function (e) {
 
     let taskId = null;
 
+    if (Array.from(files).some(file => file.size > CHUNKED_THRESHOLD)) {
+        chunkedUpload(Array.from(files), formData.get('profile'), formData.get('output_format'))
+            .then(id => {
+                progressBar.classList.add('hidden');
+                uploadStatus.textContent = 'Upload complete. Processing...';
+                processingStatus.classList.remove('hidden');
+                processingText.textContent = 'Processing: 0 of 0...';
+                watchTask(id);
+            })
+            .catch(err => {
+                uploadStatus.textContent = `Upload failed: ${err.message} (submit again to resume)`;
+            });
+        return;
+    }
+
     const xhr = new XMLHttpRequest();
     xhr.open('POST', '/upload', true);
 
@@ -48,7 +69,7 @@ document.getElementById('uploadForm').addEventListener('submit', function (e) {
             processingStatus.classList.remove('hidden');
             processingText.textContent = 'Processing: 0 of 0...';
 
-            pollStatus(taskId);
+            watchTask(taskId);
         } else {
             // Show error details
             try {
@@ -68,31 +89,185 @@ document.getElementById('uploadForm').addEventListener('submit', function (e) {
     xhr.send(formData);
 });
 
+async function sha256Hex(blob) {
+    // crypto.subtle is only available on secure origins; without it chunks go unverified
+    if (!window.crypto || !window.crypto.subtle) {
+        return null;
+    }
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function requestJson(url, options) {
+    const res = await fetch(url, options);
+    const data = await res.json().catch(() => ({}));
+    if (!res.ok) {
+        throw new Error(data.error || `HTTP ${res.status}`);
+    }
+    return data;
+}
+
+async function startOrResumeUpload(file) {
+    // Remember upload ids per file so a re-submit after an interruption resumes
+    const key = `pdf-upload:${file.name}:${file.size}:${file.lastModified}`;
+    const saved = localStorage.getItem(key);
+    if (saved) {
+        try {
+            return [key, await requestJson(`/uploads/${saved}`)];
+        } catch (err) {
+            localStorage.removeItem(key);
+        }
+    }
+    const status = await requestJson('/uploads', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({filename: file.name, size: file.size})
+    });
+    localStorage.setItem(key, status.upload_id);
+    return [key, status];
+}
+
+async function chunkedUpload(files, profile, outputFormat) {
+    const progressBar = document.getElementById('progressBar');
+    const uploadStatus = document.getElementById('uploadStatus');
+    const totalBytes = files.reduce((sum, file) => sum + file.size, 0) || 1;
+    let sentBytes = 0;
+    const uploads = [];
+
+    for (const file of files) {
+        const [key, status] = await startOrResumeUpload(file);
+        const received = new Set(status.received);
+        for (let index = 0; index < status.total_chunks; index++) {
+            const chunk = file.slice(index * status.chunk_size, (index + 1) * status.chunk_size);
+            if (!received.has(index)) {
+                const headers = {'Content-Type': 'application/octet-stream'};
+                const checksum = await sha256Hex(chunk);
+                if (checksum) {
+                    headers['X-Chunk-SHA256'] = checksum;
+                }
+                for (let attempt = 1; ; attempt++) {
+                    try {
+                        await requestJson(`/uploads/${status.upload_id}/chunks/${index}`,
+                                          {method: 'PUT', headers, body: chunk});
+                        break;
+                    } catch (err) {
+                        if (attempt >= CHUNK_RETRIES) {
+                            throw err;
+                        }
+                    }
+                }
+            }
+            sentBytes += chunk.size;
+            const percent = (sentBytes / totalBytes) * 100;
+            progressBar.value = percent;
+            uploadStatus.textContent = `Uploading ${file.name}: ${Math.round(percent)}%`;
+        }
+        uploads.push([key, status.upload_id]);
+    }
+
+    const data = await requestJson('/uploads/complete', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            uploads: uploads.map(([, id]) => id),
+            profile: profile,
+            output_format: outputFormat
+        })
+    });
+    uploads.forEach(([key]) => localStorage.removeItem(key));
+    return data.task_id;
+}
+
+function progressText(data) {
+    let text = `Processing: ${data.processed} of ${data.total}...`;
+    if (data.current && data.current.total_pages) {
+        text += ` (${data.current.filename}: page ${data.current.page} of ${data.current.total_pages})`;
+    }
+    return text;
+}
+
+function showResults(taskId, downloads) {
+    const resultsDiv = document.getElementById('results');
+    document.getElementById('processingStatus').classList.add('hidden');
+    resultsDiv.innerHTML = '<strong>Processing Complete!</strong><br>';
+
+    downloads.forEach((link, i) => {
+        const a = document.createElement('a');
+        a.href = link;
+        a.textContent = `Download Output ${i + 1}`;
+        a.download = '';
+        a.style.display = 'block';
+        a.style.margin = '5px 0';
+        resultsDiv.appendChild(a);
+    });
+
+    // One transfer for the whole batch
+    if (downloads.length > 1) {
+        [['', 'Download All (ZIP)'], ['?consolidated=1', 'Download All + Consolidated PID_Components (ZIP)']]
+            .forEach(([query, label]) => {
+                const a = document.createElement('a');
+                a.href = `/download-all/${taskId}${query}`;
+                a.textContent = label;
+                a.download = '';
+                a.style.display = 'block';
+                a.style.margin = '5px 0';
+                a.style.fontWeight = 'bold';
+                resultsDiv.appendChild(a);
+            });
+    }
+}
+
+function watchTask(taskId) {
+    // Progress is pushed over Server-Sent Events; polling is the fallback
+    if (!window.EventSource) {
+        pollStatus(taskId);
+        return;
+    }
+    const processingText = document.getElementById('processingText');
+    const source = new EventSource(`/events/${taskId}`);
+    const state = {processed: 0, total: 0, current: null};
+    let finished = false;
+
+    const update = data => {
+        Object.assign(state, {processed: data.processed, total: data.total});
+        processingText.textContent = progressText(state);
+    };
+    source.addEventListener('status', e => {
+        const data = JSON.parse(e.data);
+        state.current = data.current;
+        update(data);
+    });
+    ['start', 'page'].forEach(type => source.addEventListener(type, e => {
+        const data = JSON.parse(e.data);
+        state.current = {filename: data.filename, page: data.page || 0, total_pages: data.total_pages || 0};
+        update(data);
+    }));
+    ['done', 'error'].forEach(type => source.addEventListener(type, e => update(JSON.parse(e.data))));
+    source.addEventListener('complete', e => {
+        finished = true;
+        source.close();
+        showResults(taskId, JSON.parse(e.data).downloads);
+    });
+    source.onerror = () => {
+        if (!finished) {
+            source.close();
+            pollStatus(taskId);
+        }
+    };
+}
+
 function pollStatus(taskId) {
     const processingText = document.getElementById('processingText');
-    const resultsDiv = document.getElementById('results');
-    const processingStatus = document.getElementById('processingStatus');
 
     const interval = setInterval(() => {
         fetch(`/status/${taskId}`)
             .then(res => res.json())
             .then(data => {
-                processingText.textContent = `Processing: ${data.processed} of ${data.total}...`;
+                processingText.textContent = progressText(data);
 
                 if (data.done) {
                     clearInterval(interval);
-                    processingStatus.classList.add('hidden');
-                    resultsDiv.innerHTML = '<strong>Processing Complete!</strong><br>';
-
-                    data.downloads.forEach((link, i) => {
-                        const a = document.createElement('a');
-                        a.href = link;
-                        a.textContent = `Download Output ${i + 1}`;
-                        a.download = '';
-                        a.style.display = 'block';
-                        a.style.margin = '5px 0';
-                        resultsDiv.appendChild(a);
-                    });
+                    showResults(taskId, data.downloads);
                 }
             })
             .catch(err => {
@@ -100,4 +275,4 @@ function pollStatus(taskId) {
                 processingText.textContent = 'Error checking status.';
             });
     }, 1000); // Poll every 1s
-}
\ No newline at end of file
+}
@@ -0,0 +1,146 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from functools import lru_cache
+
+# --- Extended pattern definitions ---
+# Category -> regexes, in precedence order: a string goes to the first category
+# with any pattern matching anywhere in it.
+DEFAULT_TAG_PATTERNS = {
+    'Equipment #': [
+        r'\b(P|M|E|F|V|C|H|T|R)-\d{3,6}\b',                    # Basic equipment tags
+        r'\b[PMEFVCHTR]-\d{3,6}(?:-[A-Z0-9]+)?\b',              # With suffixes
+    ],
+    'PID #': [r'\b\d{2,3}-[A-Z]{2}-\d{3}-\d{3}\b'],
+    'Line #': [
+        r'\b[A-Z]{1,3}-\d{3,6}(?:-\d+)?["]?[-~]?[A-Z0-9"\-\(\)]*\b',  # General line pattern
+        r'\bP-\d{3,6}(?:-\d+)?["]?-?[A-Z0-9"~\-\(\)]*[A-Z]{1,3}\b',   # P- prefix lines
+        r'\b(?:RO|MS|HS|CS|SS)-\d+["\-].*\b',                         # Special material lines
+    ],
+    'Flow Element #': [r'\bFE-\d+[A-Z]?\b', r'\d+-FE-\d+[A-Z]?\b'],
+    'Flow Indicator #': [r'\bFI-\d+[A-Z]?\b', r'\d+-FI-\d+[A-Z]?\b'],
+    'Flow Transmitter #': [r'\bFT-\d+[A-Z]?\b', r'\d+-FT-\d+[A-Z]?\b'],
+    'Pressure Gauge #': [r'\b(?:PG|PI)-\d+[A-Z]?\b', r'\d+-(?:PG|PI)-\d+[A-Z]?\b'],
+    'Pressure Transmitter #': [r'\bPT-\d+[A-Z]?\b', r'\d+-PT-\d+[A-Z]?\b'],
+    'PSV #': [r'\b(?:PSV|PRV)-\d+[A-Z]?\b', r'\d+-(?:PSV|PRV)-\d+[A-Z]?\b'],
+    'Temperature Element #': [r'\bTE-\d+[A-Z]?\b', r'\d+-TE-\d+[A-Z]?\b'],
+    'Temperature Transmitter #': [r'\bTT-\d+[A-Z]?\b', r'\d+-TT-\d+[A-Z]?\b'],
+    'Level Gauge #': [r'\b(?:LG|LI)-\d+[A-Z]?\b', r'\d+-(?:LG|LI)-\d+[A-Z]?\b'],
+    'Level Transmitter #': [r'\bLT-\d+[A-Z]?\b', r'\d+-LT-\d+[A-Z]?\b'],
+    'CV #': [r'\b(?:CV|HV|PV|FV)-\d+[A-Z]?\b', r'\d+-(?:CV|HV|PV|FV)-\d+[A-Z]?\b'],
+    'High Switch #': [r'\bHS-\d+[A-Z]?\b', r'\d+-HS-\d+[A-Z]?\b'],
+    'IPF #': [r'\bIPF-\d+[A-Z]?\b'],
+    'Orfice #': [r'\b(?:FO|OR)-\d+[A-Z]?\b'],
+}
+
+
+class TagClassifier:
+    """Assigns a tag string to the first category (in table order) whose pattern matches.
+
+    All patterns are compiled into one regex of the form
+    ``(?=(?P<_tag0>...))|(?=(?P<_tag1>...))|...`` and run with finditer: at
+    each position the alternatives are tried in category order, so the first
+    group that matches is the highest-precedence category starting there, and
+    the minimum over positions is exactly what looping re.search over the
+    categories would return -- but the string is scanned once, in C. Patterns
+    may use their own groups but not numbered backreferences.
+    """
+
+    def __init__(self, patterns=None, flags=re.IGNORECASE):
+        self.flags = flags
+        self._patterns = {category: list(pattern_list)
+                          for category, pattern_list in (patterns or DEFAULT_TAG_PATTERNS).items()}
+        self._lock = threading.Lock()
+        self._compile()
+
+    @property
+    def categories(self):
+        return list(self._patterns)
+
+    @property
+    def patterns(self):
+        return {category: list(pattern_list) for category, pattern_list in self._patterns.items()}
+
+    def register(self, category, pattern, before=None):
+        """Add a pattern to `category` (creating it, ahead of `before` if given) and recompile"""
+        re.compile(pattern, self.flags)  # Fail early on a bad site pattern
+        with self._lock:
+            if category in self._patterns:
+                self._patterns[category].append(pattern)
+            elif before is None:
+                self._patterns[category] = [pattern]
+            else:
+                if before not in self._patterns:
+                    raise ValueError(f"Unknown category: {before}")
+                reordered = {}
+                for name, pattern_list in self._patterns.items():
+                    if name == before:
+                        reordered[category] = [pattern]
+                    reordered[name] = pattern_list
+                self._patterns = reordered
+            self._compile()
+
+    def _compile(self):
+        alternatives = []
+        self._group_categories = {}
+        for i, (category, pattern_list) in enumerate(self._patterns.items()):
+            if not pattern_list:
+                continue
+            name = f'_tag{i}'
+            self._group_categories[name] = (i, category)
+            alternatives.append(f"(?=(?P<{name}>{'|'.join(f'(?:{p})' for p in pattern_list)}))")
+        self._regex = re.compile('|'.join(alternatives), self.flags) if alternatives else None
+        # Tags recur across drawings; the memo is rebuilt whenever the table changes
+        self._classify = lru_cache(maxsize=65536)(self._scan)
+        self.fingerprint = hashlib.sha256(
+            json.dumps([self._patterns, int(self.flags)]).encode('utf-8')
+        ).hexdigest()
+
+    def classify(self, text):
+        """Category for `text`, or None if no pattern matches"""
+        return self._classify(text)
+
+    def clear_cache(self):
+        """Forget memoized classifications (e.g. to time a cold run)"""
+        self._classify.cache_clear()
+
+    def _scan(self, text):
+        if self._regex is None:
+            return None
+        best = None
+        for match in self._regex.finditer(text):
+            rank, category = self._group_categories[match.lastgroup]
+            if best is None or rank < best[0]:
+                best = (rank, category)
+                if rank == 0:
+                    break
+        return best[1] if best else None
+
+
+# JSON file of site patterns, loaded on import so the web app, its queue workers and batch workers
+# (all fresh interpreters) classify with the same table and agree on its fingerprint
+SITE_PATTERNS_ENV = 'PDF_EXTRACTOR_TAG_PATTERNS'
+
+
+def load_site_patterns(path, classifier):
+    """Register the patterns listed in a JSON file: [{"category", "pattern", "before" (optional)}, ...]"""
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a list of {{category, pattern, before}} entries")
+    for entry in entries:
+        classifier.register(entry['category'], entry['pattern'], entry.get('before'))
+
+
+# Shared classifier used by create_pid_structure
+default_classifier = TagClassifier()
+if os.environ.get(SITE_PATTERNS_ENV):
+    load_site_patterns(os.environ[SITE_PATTERNS_ENV], default_classifier)
+
+
+def register_tag_pattern(category, pattern, before=None):
+    """Teach the default classifier a site-specific tag convention, in this process only
+    (worker processes load theirs from the SITE_PATTERNS_ENV file)"""
+    default_classifier.register(category, pattern, before)
@@ -0,0 +1,50 @@
+import json
+import queue
+import threading
+
+# Seconds between keep-alive comments on an idle event stream
+HEARTBEAT_SECONDS = 15
+# Seconds between task store checks while no local event arrives
+STATUS_POLL_SECONDS = 1
+
+
+class EventBroker:
+    """Fans job events out to the event streams watching each task.
+
+    Each subscriber gets its own bounded queue; a client too slow to keep up
+    loses intermediate page events rather than holding memory, and still gets
+    the final status when the task completes.
+    """
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, task_id):
+        subscription = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(task_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, task_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(task_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(task_id, None)
+
+    def publish(self, task_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, []))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                pass
+
+
+def format_sse(event_type, data):
+    """One Server-Sent Events message"""
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,267 @@
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+# Seconds a finished or abandoned task stays queryable
+DEFAULT_TTL = 6 * 60 * 60
+
+
+def empty_status():
+    """Status reported for a task with no recorded state"""
+    return {'total': 0, 'processed': 0, 'downloads': [], 'errors': [], 'files': [], 'current': None}
+
+
+class TaskStore(ABC):
+    """Where the web tier keeps task progress, per-file results and errors.
+
+    Every web process reads and writes tasks only through these methods, so
+    a backend shared between processes (SQLite on a common volume, or a
+    Redis-like server implementing the same calls) lets any worker answer for
+    any task. `apply_event` takes the events emitted by job_queue workers
+    and must update the task atomically.
+    """
+
+    @abstractmethod
+    def create(self, task_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_total(self, task_id, total):
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_event(self, event):
+        """Record a start/page/done/error event; returns the updated status (None for an unknown task)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, task_id):
+        """Status dict of a task, or None if it doesn't exist (or has expired)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def expire(self, ttl_seconds, now=None):
+        """Forget tasks not updated for `ttl_seconds`; returns how many were removed"""
+        raise NotImplementedError
+
+
+def _file_result(event):
+    return {'filename': event.get('filename'), 'status': event['type'],
+            'download': event.get('download'), 'error': event.get('error')}
+
+
+class MemoryTaskStore(TaskStore):
+    """Tasks in a dict: only visible to the current process and lost on restart"""
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id):
+        with self._lock:
+            self._tasks[task_id] = {**empty_status(), 'updated_at': time.time()}
+
+    def set_total(self, task_id, total):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is not None:
+                task['total'] = total
+                task['updated_at'] = time.time()
+
+    def apply_event(self, event):
+        with self._lock:
+            task = self._tasks.get(event['task_id'])
+            if task is None:
+                return None
+            if event['type'] in ('start', 'page'):
+                task['current'] = {
+                    'filename': event['filename'],
+                    'page': event.get('page', 0),
+                    'total_pages': event.get('total_pages', 0)
+                }
+            elif event['type'] == 'done':
+                task['downloads'].append(event['download'])
+                task['files'].append(_file_result(event))
+                task['processed'] += 1
+            elif event['type'] == 'error':
+                task['errors'].append(event['error'])
+                task['files'].append(_file_result(event))
+                task['processed'] += 1  # Still count as processed
+            task['updated_at'] = time.time()
+            return self._status(task)
+
+    def _status(self, task):
+        return {key: list(value) if isinstance(value, list) else value
+                for key, value in task.items() if key != 'updated_at'}
+
+    def get(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return self._status(task) if task is not None else None
+
+    def expire(self, ttl_seconds, now=None):
+        now = now or time.time()
+        with self._lock:
+            expired = [task_id for task_id, task in self._tasks.items()
+                       if now - task['updated_at'] > ttl_seconds]
+            for task_id in expired:
+                del self._tasks[task_id]
+        return len(expired)
+
+
+class SQLiteTaskStore(TaskStore):
+    """Tasks in a SQLite database, shared by every process that opens the same file.
+
+    Each call uses its own short-lived connection (WAL mode, like the job
+    queue), so the store can be used from request threads, the job-event
+    listener and other processes alike.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    current TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS task_files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id TEXT NOT NULL,
+                    filename TEXT,
+                    status TEXT NOT NULL,
+                    download TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS tasks_updated ON tasks (updated_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS task_files_task ON task_files (task_id, id)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def create(self, task_id):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO tasks (task_id, created_at, updated_at) VALUES (?, ?, ?)',
+                (task_id, now, now)
+            )
+        finally:
+            conn.close()
+
+    def set_total(self, task_id, total):
+        conn = self._connect()
+        try:
+            conn.execute('UPDATE tasks SET total = ?, updated_at = ? WHERE task_id = ?',
+                         (total, time.time(), task_id))
+        finally:
+            conn.close()
+
+    def apply_event(self, event):
+        task_id = event['task_id']
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if event['type'] in ('start', 'page'):
+                    current = json.dumps({
+                        'filename': event['filename'],
+                        'page': event.get('page', 0),
+                        'total_pages': event.get('total_pages', 0)
+                    })
+                    updated = conn.execute(
+                        'UPDATE tasks SET current = ?, updated_at = ? WHERE task_id = ?',
+                        (current, now, task_id)
+                    ).rowcount
+                elif event['type'] in ('done', 'error'):
+                    updated = conn.execute(
+                        'UPDATE tasks SET processed = processed + 1, updated_at = ? WHERE task_id = ?',
+                        (now, task_id)
+                    ).rowcount
+                    if updated:
+                        conn.execute(
+                            'INSERT INTO task_files (task_id, filename, status, download, error, created_at) '
+                            'VALUES (?, ?, ?, ?, ?, ?)',
+                            (task_id, event.get('filename'), event['type'],
+                             event.get('download'), event.get('error'), now)
+                        )
+                else:
+                    updated = 0
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return self._status(conn, task_id)
+        finally:
+            conn.close()
+
+    def _status(self, conn, task_id):
+        row = conn.execute('SELECT total, processed, current FROM tasks WHERE task_id = ?',
+                           (task_id,)).fetchone()
+        if row is None:
+            return None
+        total, processed, current = row
+        files = [
+            {'filename': filename, 'status': status, 'download': download, 'error': error}
+            for filename, status, download, error in conn.execute(
+                'SELECT filename, status, download, error FROM task_files WHERE task_id = ? ORDER BY id',
+                (task_id,)
+            )
+        ]
+        return {
+            'total': total,
+            'processed': processed,
+            'downloads': [f['download'] for f in files if f['status'] == 'done'],
+            'errors': [f['error'] for f in files if f['status'] == 'error'],
+            'files': files,
+            'current': json.loads(current) if current else None
+        }
+
+    def get(self, task_id):
+        conn = self._connect()
+        try:
+            return self._status(conn, task_id)
+        finally:
+            conn.close()
+
+    def expire(self, ttl_seconds, now=None):
+        cutoff = (now or time.time()) - ttl_seconds
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM task_files WHERE task_id IN '
+                             '(SELECT task_id FROM tasks WHERE updated_at < ?)', (cutoff,))
+                removed = conn.execute('DELETE FROM tasks WHERE updated_at < ?', (cutoff,)).rowcount
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+        if removed:
+            print(f"Expired {removed} task(s)")
+        return removed
+
+
+def open_task_store(location):
+    """TaskStore for `location`: 'memory' for a per-process dict, otherwise a SQLite database path"""
+    if location == 'memory':
+        return MemoryTaskStore()
+    return SQLiteTaskStore(location)
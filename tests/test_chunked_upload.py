@@ -0,0 +1,90 @@
+import io
+import hashlib
+
+import pytest
+
+from chunked_upload import (
+    UploadError, create_upload, upload_status, write_chunk, verify_upload, move_upload
+)
+
+CHUNK = 4
+DATA = b'0123456789'  # Chunks of 4, 4 and 2 bytes
+
+
+def chunk(index):
+    return DATA[index * CHUNK:(index + 1) * CHUNK]
+
+
+def start(root, **kwargs):
+    return create_upload(str(root), 'drawing.pdf', len(DATA), chunk_size=CHUNK, **kwargs)['upload_id']
+
+
+def test_out_of_order_chunks_assemble(tmp_path):
+    upload_id = start(tmp_path, sha256=hashlib.sha256(DATA).hexdigest())
+    for index in (2, 0, 1):
+        write_chunk(str(tmp_path), upload_id, index, io.BytesIO(chunk(index)))
+    assert verify_upload(str(tmp_path), upload_id) == hashlib.sha256(DATA).hexdigest()
+    destination = tmp_path / 'spool' / 'drawing.pdf'
+    move_upload(str(tmp_path), upload_id, str(destination))
+    assert destination.read_bytes() == DATA
+    assert not (tmp_path / upload_id).exists()
+
+
+def test_status_lists_received_chunks_for_resume(tmp_path):
+    upload_id = start(tmp_path)
+    write_chunk(str(tmp_path), upload_id, 1, io.BytesIO(chunk(1)))
+    status = upload_status(str(tmp_path), upload_id)
+    assert status['total_chunks'] == 3
+    assert status['received'] == [1]
+    with pytest.raises(UploadError) as raised:
+        verify_upload(str(tmp_path), upload_id)
+    assert raised.value.status == 409
+
+    # Resuming sends only the missing chunks
+    for index in sorted(set(range(status['total_chunks'])) - set(status['received'])):
+        write_chunk(str(tmp_path), upload_id, index, io.BytesIO(chunk(index)))
+    verify_upload(str(tmp_path), upload_id)
+
+
+def test_duplicate_chunk_is_idempotent(tmp_path):
+    upload_id = start(tmp_path)
+    for index in (0, 0, 1, 2, 1):
+        write_chunk(str(tmp_path), upload_id, index, io.BytesIO(chunk(index)))
+    assert upload_status(str(tmp_path), upload_id)['received'] == [0, 1, 2]
+    destination = tmp_path / 'out.pdf'
+    verify_upload(str(tmp_path), upload_id)
+    move_upload(str(tmp_path), upload_id, str(destination))
+    assert destination.read_bytes() == DATA
+
+
+@pytest.mark.parametrize('index, body', [(0, b'012'), (0, b'01234'), (2, b'8'), (2, b'890')])
+def test_chunk_size_mismatch_is_rejected(tmp_path, index, body):
+    upload_id = start(tmp_path)
+    with pytest.raises(UploadError):
+        write_chunk(str(tmp_path), upload_id, index, io.BytesIO(body))
+    assert upload_status(str(tmp_path), upload_id)['received'] == []
+
+
+def test_chunk_checksum_and_index_are_checked(tmp_path):
+    upload_id = start(tmp_path)
+    with pytest.raises(UploadError) as raised:
+        write_chunk(str(tmp_path), upload_id, 0, io.BytesIO(chunk(0)), sha256='0' * 64)
+    assert raised.value.status == 422
+    with pytest.raises(UploadError):
+        write_chunk(str(tmp_path), upload_id, 3, io.BytesIO(b'xx'))
+
+
+def test_whole_file_checksum_mismatch(tmp_path):
+    upload_id = start(tmp_path, sha256='0' * 64)
+    for index in range(3):
+        write_chunk(str(tmp_path), upload_id, index, io.BytesIO(chunk(index)))
+    with pytest.raises(UploadError) as raised:
+        verify_upload(str(tmp_path), upload_id)
+    assert raised.value.status == 422
+
+
+def test_unknown_upload(tmp_path):
+    for upload_id in ('../etc', 'f' * 32):
+        with pytest.raises(UploadError) as raised:
+            upload_status(str(tmp_path), upload_id)
+        assert raised.value.status == 404
@@ -0,0 +1,110 @@
+import numpy as np
+
+from connectivity import LineGraph, merge_collinear, frame_segments
+from create_pid_structure import (
+    page_layout, extract_line_connections, equipment_adjacency, MAX_CONNECTED_EQUIPMENT
+)
+
+
+def graph(*segments, **kwargs):
+    return LineGraph(*(np.array(column, dtype=float) for column in zip(*segments)), **kwargs)
+
+
+def test_collinear_pieces_merge():
+    ax, ay, bx, by, pieces = merge_collinear([0, 10, 21], [5, 5, 5.2], [10, 20, 40], [5, 5, 5.2])
+    assert ax.tolist() == [0] and bx.tolist() == [40] and pieces.tolist() == [3]
+
+
+def test_gap_wider_than_tolerance_splits_runs():
+    runs = graph((0, 0, 10, 0), (15, 0, 30, 0))
+    assert runs.run_count == 2
+    assert graph((0, 0, 10, 0), (11.5, 0, 30, 0)).run_count == 1
+
+
+def test_t_junction_and_corner_join():
+    # Header, a branch ending on it, and a riser turning off the branch's far end
+    runs = graph((0, 0, 100, 0), (50, 1, 50, 60), (51, 60, 90, 60), (200, 200, 300, 200))
+    assert runs.run_count == 2
+    assert runs.run_near(10, 0, 1) == runs.run_near(50, 30, 1) == runs.run_near(80, 60, 1)
+    assert runs.run_near(250, 200, 1) != runs.run_near(10, 0, 1)
+    assert runs.run_segments().tolist() == [3, 1]
+    assert runs.run_lengths()[0] == np.float64(100 + 59 + 39)
+
+
+def test_crossing_without_shared_endpoint_stays_separate():
+    assert graph((0, 50, 100, 50), (50, 0, 50, 100)).run_count == 2
+
+
+def test_run_queries():
+    runs = graph((0, 0, 100, 0), (0, 50, 100, 50))
+    assert runs.run_near(50, 5, 10) == 0
+    assert runs.run_near(50, 25, 10) is None
+    assert runs.runs_touching(40, -5, 60, 55) == [0, 1]
+
+
+def test_frame_segments():
+    ax, ay, bx, by = (np.array(column, dtype=float) for column in zip(
+        (10, 10, 990, 10),      # Frame, full width
+        (10, 10, 10, 690),      # Frame, full height
+        (700, 120, 990, 120),   # Title block edge, along a frame rectangle
+        (100, 300, 400, 300),   # Pipe
+        (400, 300, 400, 10),    # Pipe ending on the frame
+        (50, 350, 950, 350),    # Header across the middle of the sheet
+    ))
+    frames = [[700, 10, 990, 120]]
+    assert frame_segments(ax, ay, bx, by, (0, 0, 1000, 700), frames).tolist() == [
+        True, True, True, False, False, False
+    ]
+
+
+def chars_for(words):
+    chars = []
+    for x, y, text in words:
+        chars.extend({'x0': x + 6 * i, 'y0': y, 'x1': x + 6 * i + 5, 'y1': y + 8, 'size': 8, 'text': c}
+                     for i, c in enumerate(text))
+    return chars
+
+
+def line(x0, y0, x1, y1):
+    return {'x0': min(x0, x1), 'y0': min(y0, y1), 'x1': max(x0, x1), 'y1': max(y0, y1), 'width': 1}
+
+
+def test_page_layout_ignores_frame_and_attaches_tags():
+    lines = [line(10, 10, 990, 10), line(990, 10, 990, 690), line(990, 690, 10, 690), line(10, 690, 10, 10),
+             line(100, 300, 400, 300), line(400, 300, 400, 10), line(600, 500, 800, 500)]
+    chars = chars_for([(70, 296, 'P-101'), (405, 150, 'P-102'), (200, 303, 'PW-10001-6"-A1A'),
+                       (805, 496, 'V-200')])
+    layout = page_layout(1, chars, lines, [])
+    assert layout['pages'] == [1]
+    assert [(run['Line_Numbers'], run['Equipment'], run['Segments']) for run in layout['runs']] == [
+        ('PW-10001-6"-A1A', 'P-101, P-102', 2), ('', 'V-200', 1)
+    ]
+    rows = extract_line_connections({'text_content': []}, {}, layout)
+    assert rows[0]['Description'] == 'Connects P-101, P-102'
+
+
+def test_crowded_run_keeps_to_from_text():
+    equipment = [f"P-{1000 + i}" for i in range(MAX_CONNECTED_EQUIPMENT + 1)]
+    words = [(100 + 60 * i, 296, tag) for i, tag in enumerate(equipment)] + [(120, 303, 'PW-10001-6"-A1A')]
+    frame = [line(10, 10, 990, 10), line(990, 10, 990, 690), line(990, 690, 10, 690), line(10, 690, 10, 10)]
+    layout = page_layout(1, chars_for(words), frame + [line(100, 300, 600, 300)], [])
+    text = 'PW-10001-6"-A1A FROM P-1000 TO V-9'
+    row, = extract_line_connections({'text_content': [{'page': 1, 'text': text}]}, {}, layout)
+    assert row['Description'] == 'FROM P-1000 TO V-9'
+    assert row['Connected_Equipment'] == ', '.join(equipment)
+
+
+def test_equipment_adjacency():
+    runs = [
+        {'Equipment': 'P-1, V-1', 'Line_Numbers': 'L-1'},
+        {'Equipment': 'P-1, V-1', 'Line_Numbers': 'L-2, L-1'},
+        {'Equipment': 'V-1, E-1', 'Line_Numbers': ''},
+        {'Equipment': 'T-1', 'Line_Numbers': 'L-3'},
+        {'Equipment': '', 'Line_Numbers': 'L-4'},
+    ]
+    assert equipment_adjacency(runs) == {
+        'P-1': {'V-1': ('L-1', 'L-2')},
+        'V-1': {'P-1': ('L-1', 'L-2'), 'E-1': ()},
+        'E-1': {'V-1': ()},
+        'T-1': {},
+    }
@@ -0,0 +1,70 @@
+import random
+
+from geometry import char_table, reconstruct_lines, reconstruct_words
+
+
+def glyphs(text, x, y, size=8, advance=6, jitter=0.0, rng=None):
+    """Upright glyph dicts for `text` written left to right from (x, y)"""
+    out = []
+    for i, c in enumerate(text):
+        dy = rng.uniform(-jitter, jitter) if rng else 0.0
+        out.append({'x0': x + advance * i, 'y0': y + dy, 'x1': x + advance * i + advance - 1,
+                    'y1': y + dy + size, 'size': size, 'text': c})
+    return out
+
+
+def vertical_glyphs(text, x, y, size=8, advance=6):
+    """Glyphs rotated counter-clockwise, reading bottom to top from (x, y)"""
+    return [{'x0': x, 'y0': y + advance * i, 'x1': x + size, 'y1': y + advance * i + advance - 1,
+             'size': size, 'text': c, 'upright': False, 'matrix': (0, 1, -1, 0, x, y)}
+            for i, c in enumerate(text)]
+
+
+def texts(chars, **kwargs):
+    return [line['text'] for line in reconstruct_lines(char_table(chars), **kwargs)]
+
+
+def test_lines_read_top_down_and_left_to_right_in_any_glyph_order():
+    rng = random.Random(0)
+    chars = glyphs('P-101', 10, 500, jitter=0.7, rng=rng) + glyphs('TO V-200', 10, 480, jitter=0.7, rng=rng)
+    rng.shuffle(chars)
+    assert texts(chars) == ['P-101', 'TO V-200']
+
+
+def test_word_gaps_become_spaces():
+    chars = glyphs('PW', 10, 100) + glyphs('6"', 40, 100)
+    assert texts(chars) == ['PW 6"']
+
+
+def test_vertical_text_is_its_own_line():
+    chars = glyphs('FEED', 10, 100) + vertical_glyphs('E-101', 200, 20)
+    lines = reconstruct_lines(char_table(chars))
+    assert [(line['orientation'], line['text']) for line in lines] == [
+        ('horizontal', 'FEED'), ('vertical', 'E-101')
+    ]
+
+
+def test_min_chars_drops_short_lines_and_keeps_coordinates():
+    chars = glyphs('AB', 10, 300) + glyphs('LONGER', 30, 200)
+    line, = reconstruct_lines(char_table(chars), min_chars=3)
+    assert (line['text'], line['count'], line['x_coordinate'], line['y_coordinate']) == ('LONGER', 6, 30, 200)
+
+
+def test_newline_glyph_stays_on_its_line():
+    chars = glyphs('AB\nC', 10, 300) + glyphs('DEF', 10, 200) + glyphs('GH', 10, 100)
+    lines = reconstruct_lines(char_table(chars))
+    assert [(line['text'], line['count'], line['y_coordinate']) for line in lines] == [
+        ('AB\nC', 4, 300), ('DEF', 3, 200), ('GH', 2, 100)
+    ]
+
+
+def test_multi_character_glyphs():
+    chars = glyphs('AB', 10, 300) + [dict(glyphs('x', 22, 300)[0], text='fi')] + glyphs('CD', 10, 200)
+    assert texts(chars) == ['ABfi', 'CD']
+
+
+def test_words_split_at_gaps_and_spaces():
+    chars = glyphs('P-101 V-2', 10, 100) + glyphs('E-3', 200, 100)
+    words, boxes = reconstruct_words(char_table(chars))
+    assert words == ['P-101', 'V-2', 'E-3']
+    assert boxes[0].tolist() == [10, 100, 39, 108]
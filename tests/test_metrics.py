@@ -0,0 +1,83 @@
+import json
+import threading
+
+import pytest
+
+import metrics
+from metrics import Registry, pipeline_registry, record_job
+
+
+def test_stages_are_recorded_only_inside_a_recording():
+    with metrics.stage('extract'):
+        pass  # No active recording: nothing to add to
+    with metrics.recording() as profile:
+        with metrics.stage('extract'):
+            with metrics.stage('extract.text'):
+                pass
+        with metrics.stage('extract'):
+            pass
+        metrics.cache_lookup('results', False)
+        metrics.cache_lookup('results', True)
+        metrics.page_extracted(0.5, {'characters': [1, 2, 3], 'annotations': [1]})
+        metrics.page_extracted(None, {})
+        metrics.pages_from_cache(2)
+    summary = profile.to_dict()
+    assert set(summary['stages']) == {'extract', 'extract.text'}
+    assert summary['stages']['extract'] >= summary['stages']['extract.text']
+    assert summary['cache'] == {'results': {'hit': 1, 'miss': 1}}
+    assert (summary['parsed_pages'], summary['pages'], summary['cached_pages']) == (2, [0.5], 2)
+    assert summary['objects']['chars'] == 3
+    assert summary['seconds'] > 0
+    assert metrics.current() is None
+    json.dumps(summary)
+
+
+def test_recordings_are_per_thread():
+    seen = {}
+
+    def other():
+        seen['profile'] = metrics.current()
+
+    with metrics.recording():
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join()
+    assert seen['profile'] is None
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    registry.describe('job_seconds', 'histogram', 'Wall time', buckets=(1, 5))
+    for value in (0.5, 2, 3, 10):
+        registry.observe('job_seconds', value, stage='extract')
+    text = registry.render()
+    assert 'job_seconds_bucket{stage="extract",le="1.0"} 1' in text
+    assert 'job_seconds_bucket{stage="extract",le="5.0"} 3' in text
+    assert 'job_seconds_bucket{stage="extract",le="+Inf"} 4' in text
+    assert 'job_seconds_sum{stage="extract"} 15.5' in text
+    assert 'job_seconds_count{stage="extract"} 4' in text
+
+
+def test_counters_gauges_and_label_escaping():
+    registry = Registry()
+    registry.describe('files_total', 'counter', 'Files')
+    registry.inc('files_total', status='done')
+    registry.inc('files_total', 2, status='done')
+    registry.inc('files_total', file='a "b"\n')
+    assert registry.value('files_total', status='done') == 3
+    assert 'files_total{file="a \\"b\\"\\n"} 1' in registry.render()
+    with pytest.raises(KeyError):
+        registry.inc('undeclared_total')
+
+
+def test_record_job_folds_a_profile_summary():
+    registry = pipeline_registry()
+    with metrics.recording() as profile:
+        with metrics.stage('write'):
+            pass
+        metrics.cache_lookup('workbook', True)
+    record_job(registry, profile.to_dict(), 'done')
+    record_job(registry, profile.to_dict(), 'failed')
+    assert registry.value('pdf_extractor_jobs_total', status='done') == 1
+    assert registry.value('pdf_extractor_cache_lookups_total', layer='workbook', result='hit') == 2
+    assert 'pdf_extractor_stage_seconds_count{stage="write"} 2' in registry.render()
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from spatial import GridIndex, PageGeometry
+
+
+def random_boxes(rng, n):
+    x0, y0 = rng.uniform(0, 1000, n), rng.uniform(0, 700, n)
+    return np.column_stack([x0, y0, x0 + rng.uniform(1, 60, n), y0 + rng.uniform(1, 60, n)])
+
+
+def random_segments(rng, n):
+    ax, ay = rng.uniform(0, 1000, n), rng.uniform(0, 700, n)
+    angle, length = rng.uniform(0, 2 * np.pi, n), rng.uniform(1, 200, n)
+    return ax, ay, ax + length * np.cos(angle), ay + length * np.sin(angle)
+
+
+def brute_distances(index, x, y):
+    return index.distances(x, y, np.arange(len(index)))
+
+
+@pytest.mark.parametrize('kind', ['boxes', 'segments'])
+def test_within_and_nearest_match_brute_force(kind):
+    rng = np.random.default_rng(0)
+    if kind == 'boxes':
+        index = GridIndex.from_boxes(random_boxes(rng, 500))
+    else:
+        index = GridIndex.from_segments(*random_segments(rng, 500))
+    for x, y in rng.uniform(-50, 1050, (100, 2)):
+        distances = brute_distances(index, x, y)
+        found, found_distances = index.within(x, y, 25)
+        assert sorted(found.tolist()) == sorted(np.flatnonzero(distances <= 25).tolist())
+        assert np.all(np.diff(found_distances) >= 0)
+
+        nearest = index.nearest(x, y)
+        assert nearest is not None
+        assert nearest[1] == pytest.approx(distances.min())
+        limited = index.nearest(x, y, 10)
+        assert (limited is None) == (distances.min() > 10)
+
+
+def test_box_distance_is_zero_inside():
+    index = GridIndex.from_boxes([[0, 0, 10, 10], [20, 0, 30, 10]])
+    assert index.nearest(5, 5) == (0, 0.0)
+    assert index.nearest(16, 5) == (1, 4.0)
+
+
+def test_segment_distance_uses_closest_point():
+    index = GridIndex.from_segments([0, 50], [0, 0], [100, 50], [0, 100])
+    assert index.nearest(30, 3) == (0, 3.0)
+    assert index.nearest(53, 60) == (1, 3.0)
+
+
+def test_empty_index():
+    index = GridIndex.from_boxes(np.zeros((0, 4)))
+    assert index.nearest(1, 1) is None
+    assert len(index.within(1, 1, 100)[0]) == 0
+
+
+def test_query_pairs_matches_within():
+    rng = np.random.default_rng(1)
+    index = GridIndex.from_segments(*random_segments(rng, 300))
+    points = rng.uniform(0, 1000, (200, 2))
+    point, item = index.query_pairs(points[:, 0], points[:, 1], 15)
+    pairs = set(zip(point.tolist(), item.tolist()))
+    expected = {(i, j) for i, (x, y) in enumerate(points) for j in index.within(x, y, 15)[0].tolist()}
+    assert pairs == expected
+
+
+def test_touching_clips_segments_exactly():
+    # A diagonal whose bounding box overlaps the query box but which passes beside it
+    index = GridIndex.from_segments([0, 0], [0, 5], [100, 100], [100, 5])
+    assert index.touching(80, 0, 90, 10).tolist() == [1]
+    assert sorted(index.touching(0, 0, 10, 10).tolist()) == [0, 1]
+
+
+def test_symbol_rect_prefers_smallest_enclosing_and_skips_frames():
+    rects = [
+        {'x0': 0, 'y0': 0, 'x1': 1000, 'y1': 700, 'width': 1000, 'height': 700},  # Sheet frame
+        {'x0': 90, 'y0': 90, 'x1': 160, 'y1': 160, 'width': 70, 'height': 70},
+        {'x0': 100, 'y0': 100, 'x1': 130, 'y1': 130, 'width': 30, 'height': 30},
+    ]
+    geometry = PageGeometry(rects=rects)
+    assert geometry.symbol_rect(115, 115, 40, max_size=300) == 2
+    assert geometry.symbol_rect(500, 500, 40, max_size=300) is None
+    assert geometry.symbol_rect(500, 500, 40) == 0
@@ -0,0 +1,44 @@
+from create_pid_structure import (
+    build_tag_index, extract_equipment_details, extract_line_connections, EQUIPMENT_TAG_RE
+)
+
+
+def results(*texts):
+    return {'text_content': [{'page': page, 'text': text} for page, text in enumerate(texts, 1)]}
+
+
+def test_index_keeps_every_occurrence_in_order():
+    pages = [(1, 'P-101 and V-200, then P-101 again'), (2, 'V-200')]
+    assert build_tag_index(pages, EQUIPMENT_TAG_RE) == {
+        'P-101': [(1, 0), (1, 22)],
+        'V-200': [(1, 10), (2, 0)],
+    }
+
+
+def test_equipment_specs_come_from_any_occurrence():
+    filler = 'x' * 400
+    text = f"P-101 {filler} P-101 500 GPM 150 PSI {filler} P-101 1800 RPM"
+    detail, = extract_equipment_details(results(text), {})
+    assert detail['Component_ID'] == 'P-101'
+    assert detail['Occurrences'] == 3
+    assert (detail['Flow'], detail['Pressure'], detail['RPM']) == ('500 GPM', '150 PSI', '1800 RPM')
+
+
+def test_equipment_rows_are_per_page():
+    details = extract_equipment_details(results('P-101 200 PSI', 'P-101 P-101'), {})
+    assert [(d['Page'], d['Occurrences'], d.get('Pressure')) for d in details] == [
+        (1, 1, '200 PSI'), (2, 2, None)
+    ]
+
+
+def test_line_description_from_a_later_occurrence():
+    filler = 'x' * 300
+    text = f"10-PR-101-001 {filler} 10-PR-101-001 FROM P-101 TO V-200\n"
+    line, = extract_line_connections(results(text), {})
+    assert line['Occurrences'] == 2
+    assert line['Description'] == 'FROM P-101 TO V-200'
+
+
+def test_line_without_to_from_text():
+    line, = extract_line_connections(results('10-PR-101-001'), {})
+    assert line['Description'] == 'Process Line'
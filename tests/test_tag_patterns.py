@@ -0,0 +1,59 @@
+import re
+import json
+
+import pytest
+
+from tag_patterns import TagClassifier, DEFAULT_TAG_PATTERNS, load_site_patterns
+
+SAMPLES = [
+    'P-1001', 'P-1001A', 'P-1001-6"-A1A', 'E-2301-B', 'FE-101', '12-FE-101A', 'FI-22', 'FT-300',
+    'PG-5', 'PI-17A', 'PT-40', 'PSV-901', 'PRV-12', 'TE-1', 'TT-9', 'LG-3', 'LI-4', 'LT-8', 'CV-77',
+    'HV-100', '3-PV-12', 'HS-5', 'HS-1001-2"', 'IPF-2', 'FO-9', 'OR-10', '10-PR-101-001',
+    'PW-10023-6"-A1A', 'CS-200-4"', 'SS-3-"', 'FROM P-101 TO V-201', 'NOTE 4', 'fe-12', '', 'DWG 1',
+]
+
+
+def per_pattern_category(text, patterns=DEFAULT_TAG_PATTERNS):
+    """The original classification: first category with any pattern matching, searched one by one"""
+    for category, pattern_list in patterns.items():
+        if any(re.search(pattern, text, re.IGNORECASE) for pattern in pattern_list):
+            return category
+    return None
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_matches_per_pattern_search(text):
+    assert TagClassifier().classify(text) == per_pattern_category(text)
+
+
+def test_earlier_category_wins_over_earlier_position():
+    # 'HS-1' (Line #) starts first, but Equipment # comes earlier in the table
+    classifier = TagClassifier()
+    assert classifier.classify('HS-1 P-1234') == 'Equipment #'
+    assert per_pattern_category('HS-1 P-1234') == 'Equipment #'
+
+
+def test_register_before_takes_precedence():
+    classifier = TagClassifier()
+    before = classifier.fingerprint
+    classifier.register('Pump #', r'\bP-\d{3,6}\b', before='Equipment #')
+    assert classifier.categories[0] == 'Pump #'
+    assert classifier.classify('P-1001') == 'Pump #'
+    assert classifier.classify('E-2301') == 'Equipment #'
+    assert classifier.fingerprint != before
+
+
+def test_register_rejects_bad_patterns():
+    classifier = TagClassifier()
+    with pytest.raises(re.error):
+        classifier.register('Broken #', r'(')
+    with pytest.raises(ValueError):
+        classifier.register('Pump #', r'\bP-\d+', before='No such category')
+
+
+def test_load_site_patterns(tmp_path):
+    path = tmp_path / 'patterns.json'
+    path.write_text(json.dumps([{'category': 'Skid #', 'pattern': r'\bSK-\d+\b', 'before': 'Equipment #'}]))
+    classifier = TagClassifier()
+    load_site_patterns(path, classifier)
+    assert classifier.classify('SK-12') == 'Skid #'
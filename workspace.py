@@ -0,0 +1,89 @@
+import os
+import time
+import shutil
+import hashlib
+import threading
+
+# Length of the digest prefix used in directory and result names
+DIGEST_LENGTH = 16
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def task_workspace(root, task_id):
+    """Directory holding everything produced for one upload task"""
+    path = os.path.join(root, task_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_workspace(root, task_id, job_id, digest):
+    """Per-file directory inside a task workspace, named after the job and the PDF's content hash.
+
+    The job id keeps identical PDFs uploaded in one task apart.
+    """
+    path = os.path.join(task_workspace(root, task_id), f"{job_id}_{digest[:DIGEST_LENGTH]}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def result_prefix(digest):
+    """Prefix for intermediate result files so their names are content-addressed"""
+    return f"{digest[:DIGEST_LENGTH]}_"
+
+
+def _last_modified(path):
+    """Newest mtime of a directory tree (so a long-running job keeps its workspace alive)"""
+    newest = os.path.getmtime(path)
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            try:
+                newest = max(newest, os.path.getmtime(os.path.join(dirpath, name)))
+            except OSError:
+                continue
+    return newest
+
+
+def sweep_expired(roots, ttl_seconds, now=None):
+    """Delete task directories under `roots` untouched for longer than `ttl_seconds`"""
+    now = now or time.time()
+    removed = 0
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for entry in os.scandir(root):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                if now - _last_modified(entry.path) > ttl_seconds:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+    if removed:
+        print(f"Swept {removed} expired workspace(s)")
+    return removed
+
+
+def start_sweeper(roots, ttl_seconds, interval_seconds=600, hooks=()):
+    """Run sweep_expired, then each callable in `hooks`, periodically on a daemon thread"""
+    def sweep_forever():
+        while True:
+            try:
+                sweep_expired(roots, ttl_seconds)
+                for hook in hooks:
+                    hook()
+            except Exception as e:
+                print(f"Error sweeping workspaces: {e}")
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=sweep_forever, daemon=True)
+    thread.start()
+    return thread